@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+from menu.events import sse_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Route the change event stream past Django, the rest to Django."""
+    if scope['type'] == 'http' and scope['path'] == settings.EVENTS_PATH:
+        await sse_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
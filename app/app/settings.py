@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -31,8 +33,14 @@ ALLOWED_HOSTS = []
 
 # Application definition
 
+# Deployment role of this process: 'api', 'worker' or 'beat'.
+# Only the API role loads the admin site and the schema/docs machinery.
+APP_ROLE = os.environ.get('APP_ROLE', 'api')
+SERVE_ADMIN = APP_ROLE == 'api'
+SERVE_API_DOCS = APP_ROLE == 'api' \
+    and os.environ.get('SERVE_API_DOCS', '1') == '1'
+
 INSTALLED_APPS = [
-    'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -41,14 +49,19 @@ INSTALLED_APPS = [
     'core',
     'rest_framework',
     'rest_framework.authtoken',
-    'drf_spectacular',
     'user',
     'menu',
     'django_filters',
 ]
+if SERVE_ADMIN:
+    INSTALLED_APPS.insert(0, 'django.contrib.admin')
+if SERVE_API_DOCS:
+    INSTALLED_APPS.append('drf_spectacular')
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -57,7 +70,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'app.urls'
+API_URLCONF = 'app.urls'
+# Workers never serve HTTP, so they skip importing the API views at boot.
+ROOT_URLCONF = API_URLCONF if APP_ROLE == 'api' else 'app.worker_urls'
 
 TEMPLATES = [
     {
@@ -92,6 +107,71 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+if os.environ.get('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_CACHE_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a cached menu/dish API response stays valid.
+MENU_CACHE_TIMEOUT = int(os.environ.get('MENU_CACHE_TIMEOUT', 300))
+# List endpoints serialize values() rows instead of model instances.
+FAST_READ_SERIALIZERS = os.environ.get('FAST_READ_SERIALIZERS', '1') == '1'
+# Cached GET requests counted in memory before writing access statistics.
+ACCESS_STATS_FLUSH_EVERY = 100
+# Responses of these types are compressed when at least this large.
+COMPRESSION_MEDIA_TYPES = [
+    'application/json',
+    'application/msgpack',
+    'application/vnd.oai.openapi',
+]
+COMPRESSION_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Change feed entries older than this collapse to one entry per object.
+CHANGE_FEED_COMPACT_AFTER_DAYS = 7
+# Change feed entries younger than this many seconds are not served yet,
+# so transactions that took lower ids can commit first.
+CHANGE_FEED_SAFETY_SECONDS = 5
+# Months ahead for which dish price history partitions are created.
+PRICE_HISTORY_PARTITIONS_AHEAD = 3
+# Days of price history returned when no range is requested.
+PRICE_HISTORY_DEFAULT_DAYS = 90
+
+TESTING = sys.argv[1:2] == ['test']
+# Query counts over the budget of a view raise in tests, exceeded budgets
+# log a warning otherwise.
+QUERY_BUDGET_RAISE = TESTING
+# Rotating JSON lines store of plans of requests over their query budget.
+QUERY_PLAN_LOG = None if TESTING else os.environ.get(
+    'QUERY_PLAN_LOG', '/vol/web/query_plans/plans.jsonl')
+QUERY_PLAN_LOG_MAX_BYTES = 5 * 1024 * 1024
+QUERY_PLAN_LOG_BACKUPS = 5
+# Queries explained per request, those with the most total time.
+QUERY_PLAN_MAX_QUERIES = 3
+
+# Most sub-requests accepted by /api/batch/.
+BATCH_MAX_REQUESTS = 50
+
+# Server-Sent Events of menu changes, fanned out through Redis pub/sub
+# when configured, in-process otherwise.
+EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL')
+EVENTS_PATH = '/api/menu/events/'
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_REPLAY_LIMIT = 1000
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -134,6 +214,14 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Front proxy serving media after the access check: 'x-accel-redirect'
+# (nginx, internal location at MEDIA_ACCEL_PREFIX) or 'x-sendfile'.
+# Empty streams files from Django.
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# Uploaded file names are unique, so they are cached for a year.
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
@@ -141,19 +229,64 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'user.User'
 
+AUTHENTICATION_BACKENDS = ['user.backends.EmailBackend']
+
+# Auth tokens expire this long after issue or their last refresh.
+TOKEN_TTL = timedelta(days=int(os.environ.get('TOKEN_TTL_DAYS', 7)))
+# A used token is refreshed at most once per interval.
+TOKEN_REFRESH_INTERVAL = timedelta(hours=1)
+# Rows deleted per statement when cleaning up tokens and sessions.
+TOKEN_CLEANUP_BATCH_SIZE = 1000
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'core.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'core.parsers.MessagePackParser',
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
+# Precomputed schema served at /api/schema/, see "manage.py build_schema".
+API_SCHEMA_FILE = BASE_DIR / 'schema.yml'
 
 # CELERY SETTINGS
 CELERY_BROKER_URL = 'redis://redis:6379'
 CELERY_RESULT_BACKEND = 'redis://redis:6379'
 CELERY_TIMEZONE = 'Europe/Warsaw'
-CELERY_IMPORTS = ['menu.celery']
+CELERY_IMPORTS = ['core.celery', 'menu.celery', 'user.celery']
+# Locks and completion records of periodic tasks, in memory when unset.
+TASK_LOCK_REDIS_URL = os.environ.get(
+    'TASK_LOCK_REDIS_URL', os.environ.get('REDIS_CACHE_URL'))
+# Seconds a completed periodic task slot is remembered.
+TASK_COMPLETION_TTL = 7 * 24 * 60 * 60
+# Outbox messages claimed per dispatcher transaction.
+OUTBOX_BATCH_SIZE = 100
+# Attempts before an outbox message is marked failed.
+OUTBOX_MAX_ATTEMPTS = 5
+# Seconds before the first retry, doubled for every further attempt.
+OUTBOX_RETRY_DELAY = 60
+# Seconds a claimed message stays with its dispatcher before it is due
+# again, e.g. after the worker died mid-delivery.
+OUTBOX_CLAIM_LEASE = 300
+# Days sent outbox messages are kept before they are purged.
+OUTBOX_SENT_RETENTION_DAYS = 7
+if os.environ.get('CACHE_WARM_INTERVAL'):
+    CELERY_BEAT_SCHEDULE = {
+        'warm-cache': {
+            'task': 'warm_cache',
+            'schedule': float(os.environ.get('CACHE_WARM_INTERVAL')),
+        },
+    }
 
 # SMTP SETTINGS
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
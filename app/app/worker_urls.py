@@ -0,0 +1,6 @@
+"""Worker URL Configuration
+
+Celery worker and beat processes do not serve HTTP. Keeping their URLconf
+empty avoids importing views, serializers and schema machinery at boot.
+"""
+urlpatterns = []
@@ -0,0 +1,134 @@
+"""
+Batch execution of API requests.
+
+Sub-requests run in-process through the URL resolver and their views, in
+order, authenticated as the user of the batch request. A string
+"{{name.field}}" in a path or body is replaced with the field of the
+response of the earlier sub-request with id "name", e.g. "{{soup.id}}".
+"""
+import json
+import re
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.internal import InternalRequest
+
+REFERENCE_RE = re.compile(r'\{\{\s*([\w-]+)((?:\.[\w-]+)*)\s*\}\}')
+
+
+class BackReferenceError(Exception):
+    """A back-reference can not be resolved."""
+
+
+class RollBack(Exception):
+    """A sub-request failed in a transactional batch."""
+
+
+def _lookup(results, match):
+    name, path = match.group(1), match.group(2)
+    if name not in results:
+        raise BackReferenceError(f'Unknown request id "{name}".')
+    value = results[name]
+    for key in path.split('.')[1:]:
+        try:
+            value = value[int(key) if isinstance(value, list) else key]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise BackReferenceError(f'"{match.group(0)}" does not exist.')
+
+    return value
+
+
+def resolve_references(value, results):
+    """Return value with back-references replaced by response fields.
+
+    A string that is a single reference takes the type of the field.
+    """
+    if isinstance(value, dict):
+        return {key: resolve_references(item, results)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(item, results) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    match = REFERENCE_RE.fullmatch(value.strip())
+    if match:
+        return _lookup(results, match)
+
+    return REFERENCE_RE.sub(lambda m: str(_lookup(results, m)), value)
+
+
+def _response_body(response):
+    data = getattr(response, 'data', None)
+    if data is not None or not response.content:
+        return data
+    if 'json' in response.get('Content-Type', ''):
+        return json.loads(response.content)
+
+    return response.content.decode(response.charset)
+
+
+def execute(request, method, path, body=None):
+    """Run a sub-request through its view, return (status, body)."""
+    try:
+        match = resolve(urlsplit(path).path, urlconf=settings.API_URLCONF)
+    except Resolver404:
+        return 404, {'detail': 'Not found.'}
+    if match.url_name == 'batch':
+        return 400, {'detail': 'Batches can not be nested.'}
+
+    content = b'' if body is None \
+        else json.dumps(body, cls=JSONEncoder).encode()
+    sub_request = InternalRequest(
+        method, request.build_absolute_uri(path), content,
+        content_type='application/json',
+        HTTP_ACCEPT='application/json',
+    )
+    # Authenticated once for the whole batch, see
+    # ExpiringTokenAuthentication.
+    sub_request.batch_auth = (request.user, request.auth)
+    response = match.func(sub_request, *match.args, **match.kwargs)
+
+    return response.status_code, _response_body(response)
+
+
+def run_batch(request, items, atomic=False):
+    """Run sub-requests in order, return (results, committed).
+
+    With `atomic` all of them run in one transaction, which is rolled
+    back and the batch stopped at the first failing sub-request.
+    """
+    results = []
+    bodies = {}
+
+    def run():
+        for item in items:
+            try:
+                path = resolve_references(item['path'], bodies)
+                body = resolve_references(item.get('body'), bodies)
+            except BackReferenceError as exc:
+                status, body = 424, {'detail': str(exc)}
+            else:
+                status, body = execute(request, item['method'], path, body)
+            results.append({'id': item.get('id'), 'status': status,
+                            'body': body})
+            if item.get('id') and status < 400:
+                bodies[item['id']] = body
+            if atomic and status >= 400:
+                raise RollBack
+
+    if not atomic:
+        run()
+        return results, True
+
+    try:
+        with transaction.atomic():
+            run()
+    except RollBack:
+        return results, False
+
+    return results, True
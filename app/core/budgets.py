@@ -0,0 +1,168 @@
+"""
+Per-view query budgets and capture of query plans of slow requests.
+
+Views declare a `query_budget`. QueryBudgetMiddleware counts the queries
+and database time of each request and, when a budget is exceeded, raises
+QueryBudgetExceeded in tests or logs a warning otherwise. Plans of the
+most expensive queries of such requests are appended to a rotating JSON
+lines file for operators to inspect.
+"""
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MAX_RECORDED_QUERIES = 500
+
+
+class QueryBudgetExceeded(Exception):
+    """A request used more queries or database time than its budget."""
+
+
+class QueryBudget:
+    """Most queries and milliseconds of database time of a request.
+
+    `per_action` maps viewset actions to their own budgets.
+    """
+
+    def __init__(self, queries, time_ms, per_action=None):
+        self.queries = queries
+        self.time_ms = time_ms
+        self.per_action = per_action or {}
+
+    def __repr__(self):
+        return f'QueryBudget(queries={self.queries}, time_ms={self.time_ms})'
+
+    def for_action(self, action):
+        return self.per_action.get(action, self)
+
+
+def view_budget(view_func, method):
+    """Return (budget, name) of the view handling a request, if any."""
+    view_class = getattr(view_func, 'cls', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if budget is None:
+        return None, None
+    name = view_class.__name__
+    action = getattr(view_func, 'actions', {}).get(method.lower())
+    if action:
+        budget = budget.for_action(action)
+        name = f'{name}.{action}'
+
+    return budget, name
+
+
+class QueryRecorder:
+    """Execute wrapper counting queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.time += duration
+            if not many and len(self.queries) < MAX_RECORDED_QUERIES:
+                self.queries.append((sql, params, duration))
+
+    @property
+    def time_ms(self):
+        return self.time * 1000
+
+
+def explain(sql, params):
+    """Return the plan of a query, executing it on PostgreSQL."""
+    if connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) '
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        rows = cursor.fetchall()
+
+    return rows[0][0] if connection.vendor == 'postgresql' else rows
+
+
+def costly_queries(queries, limit):
+    """Return the read queries with the most total time, repeats summed.
+
+    Locking reads are left out, explaining them runs them again.
+    """
+    totals = defaultdict(lambda: [0, 0.0, None])
+    for sql, params, duration in queries:
+        statement = sql.lstrip().upper()
+        if not statement.startswith('SELECT') or ' FOR UPDATE' in statement \
+                or ' FOR SHARE' in statement:
+            continue
+        total = totals[sql]
+        total[0] += 1
+        total[1] += duration
+        total[2] = params
+    ranked = sorted(totals.items(), key=lambda item: -item[1][1])
+
+    return [(sql, params, count, duration)
+            for sql, (count, duration, params) in ranked[:limit]]
+
+
+_plan_logger = None
+
+
+def _get_plan_logger():
+    global _plan_logger
+    if _plan_logger is None:
+        os.makedirs(os.path.dirname(settings.QUERY_PLAN_LOG), exist_ok=True)
+        plan_logger = logging.getLogger('core.budgets.plans')
+        plan_logger.propagate = False
+        plan_logger.setLevel(logging.INFO)
+        plan_logger.addHandler(RotatingFileHandler(
+            settings.QUERY_PLAN_LOG,
+            maxBytes=settings.QUERY_PLAN_LOG_MAX_BYTES,
+            backupCount=settings.QUERY_PLAN_LOG_BACKUPS))
+        _plan_logger = plan_logger
+
+    return _plan_logger
+
+
+def capture_plans(request, name, budget, recorder):
+    """Append plans of the costliest queries of a request to the store.
+
+    Query parameters are not stored, they hold token keys and emails.
+    """
+    plans = []
+    for sql, params, count, duration in costly_queries(
+            recorder.queries, settings.QUERY_PLAN_MAX_QUERIES):
+        try:
+            plan = explain(sql, params)
+        except Exception as exc:
+            plan = f'EXPLAIN failed: {exc!r}'
+        plans.append({
+            'sql': sql, 'params': len(params or ()), 'count': count,
+            'time_ms': round(duration * 1000, 3), 'plan': plan,
+        })
+    record = {
+        'time': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': name,
+        'queries': recorder.count,
+        'time_ms': round(recorder.time_ms, 3),
+        'budget': {'queries': budget.queries, 'time_ms': budget.time_ms},
+        'plans': plans,
+    }
+    _get_plan_logger().info(json.dumps(record, default=str))
@@ -0,0 +1,27 @@
+from celery.schedules import crontab
+from celery.task import periodic_task
+
+from django.conf import settings
+from django.utils.timezone import now, timedelta
+
+from core.locks import single_run
+from core.outbox import dispatch, purge_sent
+
+
+@periodic_task(run_every=(
+    crontab()),
+    name="dispatch_outbox",
+    ignore_result=True)
+def dispatch_outbox():
+    """Deliver pending and retried outbox messages."""
+    dispatch()
+
+
+@periodic_task(run_every=(
+    crontab(minute=0, hour=5)),
+    name="purge_outbox",
+    ignore_result=True)
+@single_run(name="purge_outbox")
+def purge_outbox():
+    """Delete outbox messages sent longer ago than the retention."""
+    purge_sent(now() - timedelta(days=settings.OUTBOX_SENT_RETENTION_DAYS))
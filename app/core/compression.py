@@ -0,0 +1,50 @@
+"""
+Response compression helpers.
+"""
+import gzip
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+ENCODINGS = ['br', 'gzip'] if brotli else ['gzip']
+
+
+def choose_encoding(accept_encoding):
+    """Return the preferred supported encoding, None for identity."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _sep, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+
+    return None
+
+
+def compress(content, encoding):
+    """Return content compressed with the given encoding."""
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.BROTLI_QUALITY)
+
+    return gzip.compress(content, compresslevel=settings.GZIP_LEVEL, mtime=0)
+
+
+def is_compressible(response):
+    """Return True for complete API responses worth compressing."""
+    if response.streaming or response.status_code != 200:
+        return False
+    media_type = response.get('Content-Type', '').split(';')[0].strip()
+
+    return media_type in settings.COMPRESSION_MEDIA_TYPES
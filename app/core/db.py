@@ -0,0 +1,18 @@
+"""
+Database helpers shared by the apps.
+"""
+
+
+def delete_in_batches(queryset, batch_size):
+    """Delete rows in short statements, return number of deleted rows.
+
+    Each batch commits on its own, so locks are held only briefly.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        count, _rows = model.objects.filter(pk__in=pks).delete()
+        deleted += count
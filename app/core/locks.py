@@ -0,0 +1,151 @@
+"""
+Lease locks and completion records for periodic tasks.
+
+With several beat instances, or a task redelivered after a worker
+restart, a periodic job can start more than once for the same schedule
+slot. `single_run` lets only one run through per slot and records its
+completion, so later duplicates are skipped with a single key lookup.
+"""
+import functools
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLockBackend:
+    """Lease locks on Redis or any server speaking its protocol."""
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self._release = self.client.register_script(RELEASE_SCRIPT)
+
+    def acquire(self, key, lease):
+        """Return a token if the lock was free, None otherwise."""
+        token = uuid.uuid4().hex
+        if self.client.set(key, token, nx=True, px=int(lease * 1000)):
+            return token
+
+        return None
+
+    def release(self, key, token):
+        """Release the lock only if it is still held with `token`."""
+        self._release(keys=[key], args=[token])
+
+    def is_done(self, key):
+        return bool(self.client.exists(key))
+
+    def mark_done(self, key, ttl):
+        self.client.set(key, 1, ex=int(ttl))
+
+
+class MemoryLockBackend:
+    """Process-local stand-in for RedisLockBackend."""
+
+    def __init__(self):
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        value, expires = self._keys.get(key, (None, 0))
+        if expires <= time.monotonic():
+            self._keys.pop(key, None)
+            return None
+
+        return value
+
+    def acquire(self, key, lease):
+        token = uuid.uuid4().hex
+        with self._lock:
+            if self._get(key) is not None:
+                return None
+            self._keys[key] = (token, time.monotonic() + lease)
+
+        return token
+
+    def release(self, key, token):
+        with self._lock:
+            if self._get(key) == token:
+                del self._keys[key]
+
+    def is_done(self, key):
+        with self._lock:
+            return self._get(key) is not None
+
+    def mark_done(self, key, ttl):
+        with self._lock:
+            self._keys[key] = (1, time.monotonic() + ttl)
+
+
+_backend = None
+
+
+def get_backend():
+    """Return the lock backend configured by TASK_LOCK_REDIS_URL."""
+    global _backend
+    if _backend is None:
+        if settings.TASK_LOCK_REDIS_URL:
+            _backend = RedisLockBackend(settings.TASK_LOCK_REDIS_URL)
+        else:
+            _backend = MemoryLockBackend()
+
+    return _backend
+
+
+def daily_slot():
+    return timezone.localdate().isoformat()
+
+
+def hourly_slot():
+    return timezone.localtime().strftime('%Y-%m-%dT%H')
+
+
+def single_run(slot=daily_slot, lease=600, name=None):
+    """Run the decorated task at most once per schedule slot.
+
+    `slot` returns the key of the current schedule slot. The lock lease
+    (seconds) bounds how long a crashed run blocks a retry. Skipped runs
+    return None.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            backend = get_backend()
+            key = f'task:{task_name}:{slot()}'
+            if backend.is_done(f'{key}:done'):
+                logger.info('Skipping %s, already completed.', key)
+                return None
+            token = backend.acquire(f'{key}:lock', lease)
+            if token is None:
+                logger.info('Skipping %s, running elsewhere.', key)
+                return None
+            try:
+                # Completed between the first check and taking the lock.
+                if backend.is_done(f'{key}:done'):
+                    return None
+                result = func(*args, **kwargs)
+                backend.mark_done(
+                    f'{key}:done', settings.TASK_COMPLETION_TTL)
+                return result
+            finally:
+                backend.release(f'{key}:lock', token)
+
+        return wrapper
+
+    return decorator
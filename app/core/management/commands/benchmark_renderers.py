@@ -0,0 +1,52 @@
+"""
+Django command to compare response size and CPU cost per renderer.
+"""
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+from menu.models import Dish
+from menu.serializers import DishSerializer
+
+RENDERERS = [
+    ('json (DRF)', JSONRenderer),
+    ('json (orjson)', ORJSONRenderer),
+    ('msgpack', MessagePackRenderer),
+]
+
+
+class Command(BaseCommand):
+    """Django command to benchmark renderers on a dish list response."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=1000,
+            help='Number of dishes in the rendered list.')
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Number of renders per renderer.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        dishes = [
+            Dish(id=i, title=f'Dish {i}', description='Some description',
+                 price=Decimal(i % 100) + Decimal('0.99'),
+                 time_minutes=i % 60, vegetarian=i % 2 == 0,
+                 created_date=date.today(), modified_date=date.today())
+            for i in range(options['rows'])
+        ]
+        data = DishSerializer(dishes, many=True).data
+
+        self.stdout.write(f"{options['rows']} dishes per response")
+        for name, renderer_class in RENDERERS:
+            renderer = renderer_class()
+            start = time.process_time()
+            for _ in range(options['repeat']):
+                content = renderer.render(data)
+            cpu_ms = (time.process_time() - start) * 1000 / options['repeat']
+            self.stdout.write(
+                f'{name:14} {len(content):10d} bytes {cpu_ms:8.2f} ms CPU')
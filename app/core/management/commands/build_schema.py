@@ -0,0 +1,31 @@
+"""
+Django command to build the precomputed OpenAPI schema.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.schema import generate_schema, read_schema_file, write_schema_file
+
+
+class Command(BaseCommand):
+    """Django command to write the OpenAPI schema to a file."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Fail if the stored schema differs from the code.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        content = generate_schema()
+        if options['check']:
+            if read_schema_file() != content:
+                raise CommandError(
+                    f'{settings.API_SCHEMA_FILE} is out of date, '
+                    'run "python manage.py build_schema".')
+            self.stdout.write(self.style.SUCCESS('Schema is up to date.'))
+            return
+
+        write_schema_file(content)
+        self.stdout.write(self.style.SUCCESS(
+            f'Schema written to {settings.API_SCHEMA_FILE}.'))
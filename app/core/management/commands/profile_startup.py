@@ -0,0 +1,39 @@
+"""
+Django command to show import time breakdown of process startup.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.startup import BOOT_CODE, profile_startup
+
+
+class Command(BaseCommand):
+    """Django command to profile startup imports per deployment role."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--role', choices=sorted(BOOT_CODE), default='api',
+            help='Deployment role to boot.')
+        parser.add_argument(
+            '--top', type=int, default=15,
+            help='Number of most expensive packages to show.')
+        parser.add_argument(
+            '--budget-ms', type=float,
+            help='Fail when imports take longer, for benchmark runs.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        profile = profile_startup(options['role'])
+        packages = sorted(profile['packages'].items(),
+                          key=lambda item: item[1], reverse=True)
+
+        self.stdout.write(f"Role: {profile['role']}")
+        for name, ms in packages[:options['top']]:
+            self.stdout.write(f'{ms:10.1f} ms  {name}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Total imports: {profile['total_ms']:.1f} ms, "
+            f"peak RSS: {profile['max_rss_kb'] / 1024:.1f} MiB"))
+        budget = options['budget_ms']
+        if budget is not None and profile['total_ms'] > budget:
+            raise CommandError(
+                f"Imports took {profile['total_ms']:.1f} ms, "
+                f'over the budget of {budget:.1f} ms.')
@@ -0,0 +1,100 @@
+"""
+Middleware for the app.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+
+from core.budgets import (
+    QueryBudgetExceeded,
+    QueryRecorder,
+    capture_plans,
+    view_budget,
+)
+from core.compression import choose_encoding, compress, is_compressible
+
+logger = logging.getLogger(__name__)
+
+
+class CompressionMiddleware:
+    """Compress API responses with brotli or gzip.
+
+    Responses carrying `variant_cache_key` are stored after compression,
+    so later hits can be served as they are, without encoding again.
+    A strong ETag of a compressed response is weakened, since the bytes
+    differ from the identity representation it was computed for.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.has_header('Content-Encoding'):
+            return response
+
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding and len(response.content) >= settings.COMPRESSION_MIN_SIZE:
+            response.content = compress(response.content, encoding)
+            response['Content-Encoding'] = encoding
+            response['Content-Length'] = str(len(response.content))
+            etag = response.get('ETag')
+            if etag and not etag.startswith('W/'):
+                response['ETag'] = f'W/{etag}'
+        else:
+            encoding = None
+
+        variant_key = getattr(response, 'variant_cache_key', None)
+        if variant_key:
+            cache.set(variant_key, {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'content_encoding': encoding,
+            }, response.variant_cache_timeout)
+
+        return response
+
+
+class QueryBudgetMiddleware:
+    """Enforce the query budget declared on the view of a request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        budget, name = getattr(request, '_query_budget', (None, None))
+        too_many = budget is not None and recorder.count > budget.queries
+        too_slow = budget is not None and recorder.time_ms > budget.time_ms
+        if not too_many and not too_slow:
+            return response
+
+        message = (
+            f'{name} used {recorder.count} queries in '
+            f'{recorder.time_ms:.1f} ms for {request.method} {request.path}, '
+            f'budget is {budget.queries} queries in {budget.time_ms} ms')
+        if settings.QUERY_PLAN_LOG:
+            try:
+                capture_plans(request, name, budget, recorder)
+            except Exception:
+                logger.exception('Capturing query plans failed.')
+        # Time depends on the machine, only query counts fail tests.
+        if too_many and settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = view_budget(view_func, request.method)
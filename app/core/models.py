@@ -0,0 +1,48 @@
+"""
+Database models.
+"""
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxMessage(models.Model):
+    """Email or event written with the change that caused it.
+
+    The dispatcher delivers pending messages after commit and retries
+    failed ones later, so nothing is lost or sent by a rolled back
+    transaction.
+    """
+    EMAIL = 'email'
+    EVENT = 'event'
+    KIND_CHOICES = [(EMAIL, _('Email')), (EVENT, _('Event'))]
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, _('Pending')), (SENT, _('Sent')), (FAILED, _('Failed'))]
+
+    kind = models.CharField(_('Kind'), max_length=5, choices=KIND_CHOICES)
+    payload = models.JSONField(_('Payload'))
+    status = models.CharField(
+        _('Status'), max_length=7, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(_('Attempts'), default=0)
+    available_at = models.DateTimeField(
+        _('Available at'), default=timezone.now)
+    last_error = models.TextField(_('Last error'), blank=True)
+    created = models.DateTimeField(_('Created'), auto_now_add=True)
+    sent_at = models.DateTimeField(_('Sent at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Outbox message")
+        verbose_name_plural = _("Outbox messages")
+        indexes = [
+            models.Index(fields=['kind', 'available_at', 'id'],
+                         condition=Q(status='pending'),
+                         name='core_outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.id} {self.kind} {self.status}'
@@ -0,0 +1,176 @@
+"""
+Transactional outbox for emails and events.
+
+Messages are inserted in the transaction of the change that caused them.
+The dispatcher claims pending messages in batches with
+SELECT ... FOR UPDATE SKIP LOCKED and leases them for
+OUTBOX_CLAIM_LEASE seconds, so several workers never deliver the same
+message. Delivery happens outside of any transaction, then the outcome
+of every message is recorded.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from core.db import delete_in_batches
+from core.models import OutboxMessage
+from menu import events
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_emails(subject, body, recipients, from_email=None):
+    """Add one email per recipient to the outbox."""
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+
+    return OutboxMessage.objects.bulk_create([
+        OutboxMessage(kind=OutboxMessage.EMAIL, payload={
+            'subject': subject, 'body': body,
+            'from_email': from_email, 'to': [recipient],
+        })
+        for recipient in recipients
+    ])
+
+
+def enqueue_events(event_list):
+    """Add events published together to the outbox."""
+    return OutboxMessage.objects.create(
+        kind=OutboxMessage.EVENT, payload={'events': event_list})
+
+
+def retry_delay(attempts):
+    """Return delay before the next attempt, doubling every attempt."""
+    return timedelta(seconds=settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+class Dispatcher:
+    """Deliver outbox messages, reusing one SMTP connection."""
+
+    def __init__(self):
+        self._connection = None
+
+    def deliver(self, message):
+        if message.kind == OutboxMessage.EMAIL:
+            if self._connection is None:
+                self._connection = get_connection()
+                self._connection.open()
+            EmailMessage(connection=self._connection,
+                         **message.payload).send()
+        else:
+            events.publish_events(message.payload['events'])
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def reset(self):
+        """Drop the SMTP connection, the next email opens a new one."""
+        try:
+            self.close()
+        except Exception:
+            self._connection = None
+
+    def claim(self, kinds, batch_size):
+        """Lease a batch of due messages to this dispatcher."""
+        with transaction.atomic():
+            batch = list(OutboxMessage.objects.select_for_update(
+                skip_locked=True).filter(
+                status=OutboxMessage.PENDING, kind__in=kinds,
+                available_at__lte=timezone.now(),
+            ).order_by('available_at', 'id')[:batch_size])
+            leased_until = timezone.now() + timedelta(
+                seconds=settings.OUTBOX_CLAIM_LEASE)
+            for message in batch:
+                message.attempts += 1
+                message.available_at = leased_until
+            OutboxMessage.objects.bulk_update(
+                batch, ['attempts', 'available_at'])
+
+        return batch
+
+    def run_batch(self, kinds, batch_size):
+        """Deliver one batch of due messages, return their number."""
+        batch = self.claim(kinds, batch_size)
+        for message in batch:
+            self._process(message)
+        OutboxMessage.objects.bulk_update(batch, [
+            'status', 'available_at', 'last_error', 'sent_at'])
+
+        return len(batch)
+
+    def _process(self, message):
+        try:
+            self.deliver(message)
+        except Exception as exc:
+            logger.warning('Outbox message %s failed: %r', message.id, exc)
+            if message.kind == OutboxMessage.EMAIL:
+                self.reset()
+            message.last_error = repr(exc)
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                message.status = OutboxMessage.FAILED
+            else:
+                message.available_at = timezone.now() + retry_delay(
+                    message.attempts)
+        else:
+            message.status = OutboxMessage.SENT
+            message.sent_at = timezone.now()
+            message.last_error = ''
+
+
+def dispatch(kinds=(OutboxMessage.EMAIL, OutboxMessage.EVENT),
+             batch_size=None, max_batches=None):
+    """Deliver due outbox messages, return number of processed messages."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    dispatcher = Dispatcher()
+    processed = batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            count = dispatcher.run_batch(kinds, batch_size)
+            processed += count
+            batches += 1
+            if count < batch_size:
+                break
+    finally:
+        dispatcher.close()
+
+    return processed
+
+
+def dispatch_events():
+    """Publish pending events right after the commit adding them."""
+    dispatch(kinds=[OutboxMessage.EVENT], max_batches=1)
+
+
+def schedule_event_dispatch():
+    """Run dispatch_events once the current transaction commits.
+
+    Every call adds a hook, but only the first hook to run after the
+    commit dispatches, so a transaction recording many changes dispatches
+    once. Hooks of a rolled back transaction or savepoint are dropped
+    with it and leave no state behind. Without a transaction every call
+    dispatches right away. Events left behind go out with the periodic
+    dispatch.
+    """
+    transaction.get_connection().outbox_dispatch_pending = True
+    transaction.on_commit(_dispatch_pending_events)
+
+
+def _dispatch_pending_events():
+    connection = transaction.get_connection()
+    if getattr(connection, 'outbox_dispatch_pending', False):
+        connection.outbox_dispatch_pending = False
+        dispatch_events()
+
+
+def purge_sent(before, batch_size=None):
+    """Delete messages sent before a moment, return their number."""
+    return delete_in_batches(
+        OutboxMessage.objects.filter(
+            status=OutboxMessage.SENT, sent_at__lt=before).order_by(),
+        batch_size or settings.OUTBOX_BATCH_SIZE,
+    )
@@ -0,0 +1,74 @@
+"""
+Fast JSON and MessagePack renderers for the API.
+"""
+import datetime
+import decimal
+
+import msgpack
+import orjson
+from django.db.models.query import QuerySet
+from django.http.multipartparser import parse_header
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+
+def encode_default(obj):
+    """Encode values the fast encoders do not handle natively."""
+    if isinstance(obj, (decimal.Decimal, Promise)):
+        return force_str(obj)
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, QuerySet):
+        return list(obj)
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f'Type {type(obj).__name__} is not serializable')
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Renderer producing the same JSON as DRF's JSONRenderer, faster.
+
+    orjson only indents by two spaces, so any requested indent gives
+    two-space indented output.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        """Return indent of `application/json; indent=4` or the context."""
+        if accepted_media_type:
+            _media_type, params = parse_header(
+                accepted_media_type.encode('ascii'))
+            try:
+                return max(min(int(params['indent']), 8), 0) or None
+            except (KeyError, ValueError, TypeError):
+                pass
+
+        # The browsable API passes an indent for its raw JSON.
+        return (renderer_context or {}).get('indent')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        option = orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context):
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=encode_default, option=option)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renderer for compact binary MessagePack responses."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
@@ -0,0 +1,45 @@
+"""
+Precomputed OpenAPI schema.
+"""
+import hashlib
+
+from django.conf import settings
+
+_schema = None
+
+
+def generate_schema():
+    """Introspect the API and return the rendered YAML schema."""
+    from drf_spectacular.renderers import OpenApiYamlRenderer
+    from drf_spectacular.settings import spectacular_settings
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(
+        urlconf=settings.API_URLCONF)
+    schema = generator.get_schema(request=None, public=True)
+
+    return OpenApiYamlRenderer().render(schema, renderer_context={})
+
+
+def read_schema_file():
+    """Return the stored schema, None if it was not built yet."""
+    try:
+        with open(settings.API_SCHEMA_FILE, 'rb') as schema_file:
+            return schema_file.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_schema_file(content):
+    """Store the schema."""
+    with open(settings.API_SCHEMA_FILE, 'wb') as schema_file:
+        schema_file.write(content)
+
+
+def get_schema():
+    """Return (content, etag) of the schema, loaded once per process."""
+    global _schema
+    if _schema is None:
+        content = read_schema_file() or generate_schema()
+        _schema = (content, hashlib.sha256(content).hexdigest()[:32])
+
+    return _schema
@@ -0,0 +1,47 @@
+"""
+Serializers for the core API.
+"""
+from django.conf import settings
+from django.utils.translation import gettext as _
+from rest_framework import serializers
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Serializer for a sub-request of a batch."""
+    id = serializers.SlugField(required=False, max_length=50)
+    method = serializers.ChoiceField(
+        choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.RegexField(r'^/api/', max_length=2048)
+    body = serializers.JSONField(required=False, allow_null=True)
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for an ordered list of sub-requests."""
+    requests = serializers.ListField(
+        child=BatchItemSerializer(), allow_empty=False)
+    transaction = serializers.BooleanField(default=False)
+
+    def validate_requests(self, items):
+        if len(items) > settings.BATCH_MAX_REQUESTS:
+            msg = _('A batch can contain at most %(limit)d requests.') % {
+                'limit': settings.BATCH_MAX_REQUESTS}
+            raise serializers.ValidationError(msg)
+        ids = [item['id'] for item in items if item.get('id')]
+        if len(ids) != len(set(ids)):
+            msg = _('Request ids must be unique.')
+            raise serializers.ValidationError(msg)
+
+        return items
+
+
+class BatchResultSerializer(serializers.Serializer):
+    """Serializer for the response of a sub-request."""
+    id = serializers.CharField(allow_null=True)
+    status = serializers.IntegerField()
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    """Serializer for the responses of a batch."""
+    committed = serializers.BooleanField()
+    results = BatchResultSerializer(many=True)
@@ -0,0 +1,71 @@
+"""
+Startup import profiling for the different deployment roles.
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# Code run in a fresh interpreter, mimicking what each role loads at boot.
+BOOT_CODE = {
+    'api': (
+        'import django; django.setup(); '
+        'from django.urls import get_resolver; get_resolver().url_patterns'
+    ),
+    'worker': (
+        'import django; django.setup(); '
+        'from app import celery_app; '
+        'celery_app.loader.import_default_modules()'
+    ),
+}
+BOOT_CODE['beat'] = BOOT_CODE['worker']
+RSS_CODE = (
+    'import resource; '
+    'print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)'
+)
+
+
+def parse_importtime(output):
+    """Return {module: (self_us, cumulative_us)} from -X importtime."""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue
+        modules[fields[2].strip()] = (self_us, cumulative_us)
+
+    return modules
+
+
+def profile_startup(role):
+    """Boot a role in a subprocess and return its import profile.
+
+    Result has the total import time in ms, peak RSS in KiB, per
+    top-level package self time in ms and the set of imported modules.
+    """
+    env = dict(os.environ, APP_ROLE=role, PYTHONDONTWRITEBYTECODE='1')
+    env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         f'{BOOT_CODE[role]}; {RSS_CODE}'],
+        cwd=settings.BASE_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    modules = parse_importtime(result.stderr)
+    packages = defaultdict(int)
+    for name, (self_us, _cumulative) in modules.items():
+        packages[name.split('.')[0]] += self_us
+
+    return {
+        'role': role,
+        'total_ms': sum(packages.values()) / 1000,
+        'max_rss_kb': int(result.stdout.split()[-1]),
+        'packages': {name: us / 1000 for name, us in packages.items()},
+        'modules': set(modules),
+    }
@@ -0,0 +1,146 @@
+"""
+Test the batch request endpoint.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.batch import BackReferenceError, resolve_references
+from menu.models import Dish, Menu
+from user import tokens
+
+BATCH_URL = reverse('batch')
+
+SOUP = {'title': 'Soup', 'price': '4.50', 'time_minutes': 10,
+        'vegetarian': True}
+
+
+class ResolveReferencesTests(TestCase):
+    """Test replacing back-references."""
+
+    def test_references(self):
+        """Test whole and embedded references."""
+        results = {'soup': {'id': 7, 'tags': [{'id': 3}]}}
+
+        value = resolve_references({
+            'dish': '{{soup.id}}',
+            'path': '/api/menu/dish/{{ soup.id }}/',
+            'tag': ['{{soup.tags.0.id}}'],
+        }, results)
+
+        self.assertEqual(value, {'dish': 7, 'path': '/api/menu/dish/7/',
+                                 'tag': [3]})
+
+    def test_unknown_reference(self):
+        """Test references to missing requests or fields."""
+        for value in ('{{pie.id}}', '{{soup.title}}'):
+            with self.assertRaises(BackReferenceError):
+                resolve_references(value, {'soup': {'id': 7}})
+
+
+class BatchApiTests(TestCase):
+    """Test batch API requests."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_auth_required(self):
+        """Test authentication is required for batches."""
+        res = APIClient().post(BATCH_URL, {'requests': [
+            {'method': 'GET', 'path': '/api/menu/dish/'},
+        ]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_back_references(self):
+        """Test sub-requests use ids created earlier in the batch."""
+        res = self.client.post(BATCH_URL, {'requests': [
+            {'id': 'soup', 'method': 'POST', 'path': '/api/menu/dish/',
+             'body': SOUP},
+            {'id': 'lunch', 'method': 'POST', 'path': '/api/menu/menu/',
+             'body': {'title': 'Lunch'}},
+            {'method': 'POST', 'path': '/api/menu/menu/{{lunch.id}}/dishes/',
+             'body': {'dish': '{{soup.id}}'}},
+            {'method': 'GET', 'path': '/api/menu/menu/{{lunch.id}}/'},
+        ]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['committed'])
+        self.assertEqual([r['status'] for r in res.data['results']],
+                         [201, 201, 201, 200])
+        soup = Dish.objects.get(title='Soup')
+        self.assertEqual(res.data['results'][0]['id'], 'soup')
+        self.assertEqual(
+            [dish['id'] for dish in res.data['results'][3]['body']['dishes']],
+            [soup.id])
+
+    def test_single_authentication(self):
+        """Test sub-requests run as the user authenticated once."""
+        token = tokens.issue_token(self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = client.post(BATCH_URL, {'requests': [
+            {'method': 'GET', 'path': '/api/user/me/'},
+            {'method': 'GET', 'path': '/api/user/me/'},
+        ]}, format='json')
+
+        for result in res.data['results']:
+            self.assertEqual(result['status'], 200)
+            self.assertEqual(result['body']['email'], 'user@example.com')
+
+    def test_transaction_rolled_back(self):
+        """Test a failing sub-request undoes the whole batch."""
+        res = self.client.post(BATCH_URL, {'transaction': True, 'requests': [
+            {'method': 'POST', 'path': '/api/menu/dish/', 'body': SOUP},
+            {'method': 'POST', 'path': '/api/menu/menu/', 'body': {}},
+            {'method': 'POST', 'path': '/api/menu/menu/',
+             'body': {'title': 'Never'}},
+        ]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(res.data['committed'])
+        self.assertEqual([r['status'] for r in res.data['results']],
+                         [201, 400])
+        self.assertFalse(Dish.objects.exists())
+        self.assertFalse(Menu.objects.exists())
+
+    def test_failures_without_transaction(self):
+        """Test failures do not stop a batch, dependent requests fail."""
+        res = self.client.post(BATCH_URL, {'requests': [
+            {'id': 'bad', 'method': 'POST', 'path': '/api/menu/dish/',
+             'body': {}},
+            {'method': 'GET', 'path': '/api/menu/dish/{{bad.id}}/'},
+            {'method': 'POST', 'path': '/api/menu/dish/', 'body': SOUP},
+            {'method': 'GET', 'path': '/api/missing/'},
+            {'method': 'POST', 'path': '/api/batch/', 'body': {}},
+        ]}, format='json')
+
+        self.assertTrue(res.data['committed'])
+        self.assertEqual([r['status'] for r in res.data['results']],
+                         [400, 424, 201, 404, 400])
+        self.assertTrue(Dish.objects.filter(title='Soup').exists())
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_invalid_batch(self):
+        """Test duplicate ids and other invalid batches are rejected."""
+        duplicate = self.client.post(BATCH_URL, {'requests': [
+            {'id': 'a', 'method': 'GET', 'path': '/api/menu/dish/'},
+            {'id': 'a', 'method': 'GET', 'path': '/api/menu/dish/'},
+        ]}, format='json')
+        outside = self.client.post(BATCH_URL, {'requests': [
+            {'method': 'GET', 'path': '/admin/'},
+        ]}, format='json')
+        too_many = self.client.post(BATCH_URL, {'requests': [
+            {'method': 'GET', 'path': '/api/menu/dish/'},
+        ] * 3}, format='json')
+
+        self.assertEqual(duplicate.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(outside.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(too_many.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('at most 2', str(too_many.data['requests']))
@@ -0,0 +1,91 @@
+"""
+Test response compression and precompressed cache entries.
+"""
+import gzip
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.compression import choose_encoding
+from menu.tests.creates import create_dish
+
+DISHES_URL = reverse('menu:dish-list')
+
+
+class ChooseEncodingTests(TestCase):
+    """Test Accept-Encoding negotiation."""
+
+    def test_choose_encoding(self):
+        """Test preferred encodings and q-values."""
+        self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(choose_encoding('gzip, br;q=0'), 'gzip')
+        self.assertEqual(choose_encoding('*'), 'br')
+        self.assertIsNone(choose_encoding('identity'))
+        self.assertIsNone(choose_encoding(''))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=200)
+class CompressionMiddlewareTests(TestCase):
+    """Test compressing API responses."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for i in range(5):
+            create_dish(title=f'Dish {i}', description='Tasty ' * 20)
+
+    def test_gzip_response(self):
+        """Test response is gzipped when accepted."""
+        res = self.client.get(DISHES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertIn(b'Dish 0', gzip.decompress(res.content))
+
+    def test_compressed_etag_weakened(self):
+        """Test compressed responses carry a weak ETag that still matches."""
+        url = reverse('api-schema')
+        plain = self.client.get(url)
+        res = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertFalse(plain['ETag'].startswith('W/'))
+        self.assertEqual(res['ETag'], f'W/{plain["ETag"]}')
+
+        res = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip',
+                              HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_small_response_not_compressed(self):
+        """Test responses below the threshold are sent as they are."""
+        with override_settings(COMPRESSION_MIN_SIZE=10 ** 6):
+            res = self.client.get(DISHES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_cached_variant_not_compressed_again(self):
+        """Test a repeated request is served from the stored variant."""
+        first = self.client.get(DISHES_URL, HTTP_ACCEPT_ENCODING='br')
+
+        with patch('core.middleware.compress') as mock_compress, \
+                self.assertNumQueries(0):
+            second = self.client.get(DISHES_URL, HTTP_ACCEPT_ENCODING='br')
+
+        mock_compress.assert_not_called()
+        self.assertEqual(second['Content-Encoding'], 'br')
+        self.assertEqual(first.content, second.content)
+        self.assertIn('Accept-Encoding', second['Vary'])
+
+    def test_variants_per_encoding(self):
+        """Test identity and gzip clients get their own variants."""
+        self.client.get(DISHES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        res = self.client.get(DISHES_URL)
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertIn(b'Dish 0', res.content)
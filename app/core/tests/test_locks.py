@@ -0,0 +1,122 @@
+"""
+Test lease locks and single runs of periodic tasks.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core.locks import MemoryLockBackend, single_run
+from core.models import OutboxMessage
+from menu.celery import assemble_email_with_new_dishes
+from menu.models import DigestSubscription
+
+
+class MemoryLockBackendTests(SimpleTestCase):
+    """Test the in-memory lock backend."""
+
+    def setUp(self):
+        self.backend = MemoryLockBackend()
+
+    def test_lock_held_until_released(self):
+        """Test a held lock can not be taken again until released."""
+        token = self.backend.acquire('key', 60)
+
+        self.assertIsNotNone(token)
+        self.assertIsNone(self.backend.acquire('key', 60))
+        self.backend.release('key', token)
+        self.assertIsNotNone(self.backend.acquire('key', 60))
+
+    def test_release_with_other_token(self):
+        """Test a lock is not released by a run not holding it."""
+        self.backend.acquire('key', 60)
+        self.backend.release('key', 'other')
+
+        self.assertIsNone(self.backend.acquire('key', 60))
+
+    def test_lease_expires(self):
+        """Test a lock of a crashed run is free after its lease."""
+        with patch('core.locks.time.monotonic', return_value=100):
+            self.backend.acquire('key', 60)
+        with patch('core.locks.time.monotonic', return_value=161):
+            self.assertIsNotNone(self.backend.acquire('key', 60))
+
+
+class SingleRunTests(SimpleTestCase):
+    """Test the single_run decorator."""
+
+    def setUp(self):
+        self.backend = MemoryLockBackend()
+        patcher = patch('core.locks._backend', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = []
+
+        @single_run(slot=lambda: 'slot', name='job')
+        def job():
+            self.calls.append(1)
+            return 'done'
+
+        self.job = job
+
+    def test_runs_once_per_slot(self):
+        """Test duplicates in the same slot are skipped."""
+        self.assertEqual(self.job(), 'done')
+        self.assertIsNone(self.job())
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertTrue(self.backend.is_done('task:job:slot:done'))
+
+    def test_skipped_while_running_elsewhere(self):
+        """Test a run is skipped while another holds the lock."""
+        self.backend.acquire('task:job:slot:lock', 60)
+
+        self.assertIsNone(self.job())
+        self.assertEqual(self.calls, [])
+
+    def test_failed_run_is_retried(self):
+        """Test a failed run releases the lock without marking completion."""
+        @single_run(slot=lambda: 'slot', name='failing')
+        def failing():
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            failing()
+
+        self.assertFalse(self.backend.is_done('task:failing:slot:done'))
+        self.assertIsNotNone(
+            self.backend.acquire('task:failing:slot:lock', 60))
+
+    def test_new_slot_runs_again(self):
+        """Test the task runs again in the next slot."""
+        self.job()
+        with patch('core.locks.timezone.localdate') as localdate:
+            localdate.return_value.isoformat.return_value = 'next'
+
+            @single_run(name='job')
+            def daily():
+                self.calls.append(1)
+
+            daily()
+
+        self.assertEqual(len(self.calls), 2)
+
+
+class DigestSingleRunTests(TestCase):
+    """Test the new dishes digest is sent once per day."""
+
+    def setUp(self):
+        patcher = patch('core.locks._backend', MemoryLockBackend())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        DigestSubscription.objects.create(user=user, enabled=True)
+
+    def test_duplicate_digest_skipped(self):
+        """Test a second trigger of the digest queues no more mail."""
+        assemble_email_with_new_dishes()
+        assemble_email_with_new_dishes()
+
+        self.assertEqual(OutboxMessage.objects.filter(
+            kind=OutboxMessage.EMAIL).count(), 1)
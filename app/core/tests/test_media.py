@@ -0,0 +1,146 @@
+"""
+Test serving uploaded media files.
+"""
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from core.views import parse_range
+
+CONTENT = bytes(range(256)) * 4
+
+
+def media_url(path):
+    return reverse('media', args=[path])
+
+
+class ParseRangeTests(TestCase):
+    """Test parsing Range headers."""
+
+    def test_parse_range(self):
+        """Test single, open and suffix ranges."""
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+        self.assertEqual(parse_range('bytes=0-1,5-6', 100), (0, 99))
+        self.assertIsNone(parse_range('bytes=100-', 100))
+
+
+class MediaViewTests(TestCase):
+    """Test the media view."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(
+            MEDIA_ROOT=self.media_root, MEDIA_SENDFILE='')
+        self.settings.enable()
+        os.makedirs(os.path.join(self.media_root, 'uploads', 'dish'))
+        os.makedirs(os.path.join(self.media_root, 'private'))
+        for path in ('uploads/dish/a.jpg', 'private/report.csv'):
+            with open(os.path.join(self.media_root, path), 'wb') as file:
+                file.write(CONTENT)
+        self.mtime = os.stat(
+            os.path.join(self.media_root, 'uploads/dish/a.jpg')).st_mtime
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_serve_file(self):
+        """Test whole file is served with cache headers."""
+        res = self.client.get(media_url('uploads/dish/a.jpg'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertEqual(res['Last-Modified'], http_date(self.mtime))
+        self.assertIn('max-age=', res['Cache-Control'])
+
+    def test_range_request(self):
+        """Test a byte range is served as partial content."""
+        res = self.client.get(
+            media_url('uploads/dish/a.jpg'), HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[10:20])
+        self.assertEqual(res['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(res['Content-Length'], '10')
+
+    def test_unsatisfiable_range(self):
+        """Test a range past the end of the file is rejected."""
+        res = self.client.get(
+            media_url('uploads/dish/a.jpg'), HTTP_RANGE='bytes=5000-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_stale_if_range_serves_whole_file(self):
+        """Test Range is ignored when If-Range does not match."""
+        res = self.client.get(
+            media_url('uploads/dish/a.jpg'), HTTP_RANGE='bytes=10-19',
+            HTTP_IF_RANGE=http_date(self.mtime - 60))
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_not_modified(self):
+        """Test If-Modified-Since returns 304 for unchanged files."""
+        res = self.client.get(
+            media_url('uploads/dish/a.jpg'),
+            HTTP_IF_MODIFIED_SINCE=http_date(self.mtime))
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_missing_and_traversal_not_found(self):
+        """Test missing files and paths outside media root are 404."""
+        for path in ('uploads/dish/missing.jpg', '../etc/passwd'):
+            res = self.client.get(media_url(path))
+
+            self.assertEqual(res.status_code, 404)
+
+    def test_private_file_requires_staff(self):
+        """Test files outside public dirs are only served to staff."""
+        url = media_url('private/report.csv')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        user = get_user_model().objects.create_superuser(
+            'admin@example.com', 'testpass123')
+        self.client.force_login(user)
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Cache-Control'], 'private, no-store')
+
+    def test_dot_segments_checked_after_normalizing(self):
+        """Test a public prefix does not grant access to other dirs."""
+        res = self.client.get(
+            media_url('uploads/dish/../../private/report.csv'))
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_x_accel_redirect(self):
+        """Test transfer is handed off to nginx when configured."""
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect'):
+            res = self.client.get(media_url('uploads/dish/a.jpg'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Accel-Redirect'], '/protected-media/uploads/dish/a.jpg')
+        self.assertIn('max-age=', res['Cache-Control'])
+
+    def test_x_sendfile(self):
+        """Test transfer is handed off via X-Sendfile when configured."""
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            res = self.client.get(media_url('uploads/dish/a.jpg'))
+
+        self.assertEqual(
+            res['X-Sendfile'],
+            os.path.join(self.media_root, 'uploads', 'dish', 'a.jpg'))
@@ -0,0 +1,183 @@
+"""
+Test the transactional outbox and its dispatcher.
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import outbox
+from core.models import OutboxMessage
+from menu.models import Change
+
+
+send_messages = EmailBackend.send_messages
+
+
+def send_or_fail(backend, messages):
+    """Send messages with the locmem backend, rejecting bad addresses."""
+    if any('bad' in address for message in messages for address in message.to):
+        raise ValueError('Recipient refused')
+    return send_messages(backend, messages)
+
+
+class OutboxTests(TestCase):
+    """Test queueing and dispatching outbox messages."""
+
+    def test_emails_sent_on_one_connection(self):
+        """Test queued emails are sent reusing a single connection."""
+        outbox.enqueue_emails(
+            'Update', 'Body', ['a@example.com', 'b@example.com'])
+
+        with patch('core.outbox.get_connection',
+                   wraps=outbox.get_connection) as get_connection:
+            processed = outbox.dispatch()
+
+        self.assertEqual(processed, 2)
+        get_connection.assert_called_once()
+        self.assertEqual([m.to for m in mail.outbox],
+                         [['a@example.com'], ['b@example.com']])
+        self.assertFalse(OutboxMessage.objects.exclude(
+            status=OutboxMessage.SENT).exists())
+        self.assertFalse(OutboxMessage.objects.filter(
+            sent_at__isnull=True).exists())
+
+    def test_failed_email_does_not_stop_others(self):
+        """Test a rejected address is scheduled for retry alone."""
+        outbox.enqueue_emails(
+            'Update', 'Body',
+            ['a@example.com', 'bad@example.com', 'c@example.com'])
+
+        with patch.object(EmailBackend, 'send_messages', autospec=True,
+                          side_effect=send_or_fail), \
+                patch('core.outbox.get_connection',
+                      wraps=outbox.get_connection) as get_connection:
+            outbox.dispatch()
+
+        self.assertEqual(len(mail.outbox), 2)
+        # The connection is reset after the failure.
+        self.assertEqual(get_connection.call_count, 2)
+        failed = OutboxMessage.objects.get(payload__to=['bad@example.com'])
+        self.assertEqual(failed.status, OutboxMessage.PENDING)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('Recipient refused', failed.last_error)
+        self.assertGreater(failed.available_at, timezone.now())
+
+        # Not due yet, so a second run leaves it alone.
+        self.assertEqual(outbox.dispatch(), 0)
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_after_max_attempts(self):
+        """Test a message is marked failed after the last attempt."""
+        message, = outbox.enqueue_emails('Update', 'Body', ['bad@x.com'])
+
+        with patch.object(EmailBackend, 'send_messages', autospec=True,
+                          side_effect=send_or_fail):
+            outbox.dispatch()
+            OutboxMessage.objects.update(available_at=timezone.now())
+            outbox.dispatch()
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.FAILED)
+        self.assertEqual(message.attempts, 2)
+
+    def test_retry_delay_doubles(self):
+        """Test the retry schedule backs off exponentially."""
+        with self.settings(OUTBOX_RETRY_DELAY=60):
+            self.assertEqual(outbox.retry_delay(1), timedelta(minutes=1))
+            self.assertEqual(outbox.retry_delay(3), timedelta(minutes=4))
+
+    def test_claim_leases_messages(self):
+        """Test claimed messages are not due again while delivered."""
+        outbox.enqueue_emails('Update', 'Body', ['a@example.com'])
+
+        with self.settings(OUTBOX_CLAIM_LEASE=300):
+            claimed = outbox.Dispatcher().claim([OutboxMessage.EMAIL], 10)
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual([m.id for m in claimed], [message.id])
+        self.assertEqual(message.status, OutboxMessage.PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.available_at,
+                           timezone.now() + timedelta(minutes=4))
+        self.assertEqual(outbox.dispatch(), 0)
+
+    def test_purge_sent(self):
+        """Test only messages sent before the cutoff are deleted."""
+        outbox.enqueue_emails(
+            'Update', 'Body', ['a@example.com', 'b@example.com'])
+        outbox.dispatch()
+        old = OutboxMessage.objects.first()
+        OutboxMessage.objects.filter(id=old.id).update(
+            sent_at=timezone.now() - timedelta(days=10))
+        outbox.enqueue_emails('Update', 'Body', ['c@example.com'])
+
+        deleted = outbox.purge_sent(timezone.now() - timedelta(days=7))
+
+        self.assertEqual(deleted, 1)
+        self.assertFalse(OutboxMessage.objects.filter(id=old.id).exists())
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_batches(self):
+        """Test every due message is processed across batches."""
+        outbox.enqueue_emails(
+            'Update', 'Body', [f'{i}@example.com' for i in range(5)])
+
+        self.assertEqual(outbox.dispatch(batch_size=2), 5)
+        self.assertEqual(len(mail.outbox), 5)
+
+    @patch('core.outbox.events.publish_events')
+    def test_change_events_published_after_commit(self, publish_events):
+        """Test change feed events go through the outbox."""
+        with self.captureOnCommitCallbacks(execute=True):
+            Change.record(Change.DISH, [3])
+
+        message = OutboxMessage.objects.get(kind=OutboxMessage.EVENT)
+        self.assertEqual(message.status, OutboxMessage.SENT)
+        events = publish_events.call_args[0][0]
+        self.assertEqual(events[0]['object_id'], 3)
+        self.assertEqual(events[0]['kind'], Change.DISH)
+
+    @patch('core.outbox.events.publish_events')
+    def test_one_dispatch_per_transaction(self, publish_events):
+        """Test many changes in a transaction are dispatched once."""
+        with patch('core.outbox.dispatch_events',
+                   wraps=outbox.dispatch_events) as dispatch_events:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    Change.record(Change.DISH, [3])
+                    Change.record(Change.MENU, [4])
+
+        dispatch_events.assert_called_once_with()
+        self.assertEqual(publish_events.call_count, 2)
+        self.assertFalse(OutboxMessage.objects.exclude(
+            status=OutboxMessage.SENT).exists())
+
+    @patch('core.outbox.events.publish_events')
+    def test_dispatch_after_rolled_back_savepoint(self, publish_events):
+        """Test a rolled back savepoint does not stop later dispatches."""
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Change.record(Change.DISH, [3])
+                raise RuntimeError
+            Change.record(Change.DISH, [4])
+
+        events = publish_events.call_args[0][0]
+        self.assertEqual(events[0]['object_id'], 4)
+        self.assertFalse(OutboxMessage.objects.exclude(
+            status=OutboxMessage.SENT).exists())
+
+    @patch('core.outbox.events.publish_events')
+    def test_rolled_back_change_not_published(self, publish_events):
+        """Test events of a rolled back transaction are never queued."""
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Change.record(Change.DISH, [3])
+                raise RuntimeError
+
+        self.assertFalse(OutboxMessage.objects.exists())
+        publish_events.assert_not_called()
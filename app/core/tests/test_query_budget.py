@@ -0,0 +1,118 @@
+"""
+Test query budgets of views.
+"""
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import budgets
+from core.budgets import QueryBudget, QueryBudgetExceeded
+from menu.tests.creates import create_dish
+from menu.views import DishViewSet
+from user import tokens
+
+DISHES_URL = reverse('menu:dish-list')
+
+
+class QueryBudgetTests(TestCase):
+    """Test enforcing query budgets."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        create_dish()
+
+    def test_within_budget(self):
+        """Test requests within their budget pass."""
+        res = self.client.get(DISHES_URL)
+
+        self.assertEqual(res.status_code, 200)
+
+    @mock.patch.object(DishViewSet, 'query_budget',
+                       QueryBudget(queries=0, time_ms=1000))
+    def test_exceeded_raises(self):
+        """Test exceeding a budget raises in tests."""
+        with self.assertRaisesMessage(QueryBudgetExceeded,
+                                      'DishViewSet.list used 1 queries'):
+            self.client.get(DISHES_URL)
+
+    @override_settings(QUERY_BUDGET_RAISE=False)
+    @mock.patch.object(DishViewSet, 'query_budget',
+                       QueryBudget(queries=10, time_ms=0))
+    def test_exceeded_warns(self):
+        """Test exceeding a budget logs a warning in production."""
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            res = self.client.get(DISHES_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('budget is 10 queries in 0 ms', logs.output[0])
+
+    @mock.patch.object(DishViewSet, 'query_budget',
+                       QueryBudget(queries=10, time_ms=0))
+    def test_time_budget_never_raises(self):
+        """Test slow requests only warn, also in tests."""
+        with self.assertLogs('core.middleware', 'WARNING'):
+            res = self.client.get(DISHES_URL)
+
+        self.assertEqual(res.status_code, 200)
+
+    @mock.patch.object(DishViewSet, 'query_budget', QueryBudget(
+        queries=0, time_ms=1000,
+        per_action={'retrieve': QueryBudget(queries=5, time_ms=1000)}))
+    def test_per_action_budget(self):
+        """Test actions use their own budget when declared."""
+        dish = create_dish(title='Steak')
+
+        res = self.client.get(reverse('menu:dish-detail', args=[dish.id]))
+
+        self.assertEqual(res.status_code, 200)
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(DISHES_URL)
+
+    @mock.patch.object(DishViewSet, 'query_budget',
+                       QueryBudget(queries=0, time_ms=1000))
+    def test_plans_captured(self):
+        """Test plans of requests over budget are stored without params."""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        token = tokens.issue_token(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(budgets, '_plan_logger', None):
+            path = os.path.join(tmp, 'plans', 'plans.jsonl')
+            with override_settings(QUERY_PLAN_LOG=path):
+                with self.assertRaises(QueryBudgetExceeded):
+                    self.client.get(DISHES_URL)
+            for handler in list(budgets._plan_logger.handlers):
+                handler.close()
+                budgets._plan_logger.removeHandler(handler)
+
+            with open(path) as plans:
+                content = plans.read()
+        record = json.loads(content)
+
+        self.assertEqual(record['view'], 'DishViewSet.list')
+        self.assertEqual(record['budget']['queries'], 0)
+        sql = ' '.join(plan['sql'] for plan in record['plans'])
+        self.assertIn('menu_dish', sql)
+        self.assertIn('authtoken_token', sql)
+        self.assertTrue(all(plan['plan'] for plan in record['plans']))
+        self.assertNotIn(token.key, content)
+
+    def test_locking_queries_not_explained(self):
+        """Test SELECT ... FOR UPDATE is not run again by EXPLAIN."""
+        queries = [
+            ('SELECT * FROM a WHERE id = %s FOR UPDATE', (1,), 0.5),
+            ('UPDATE a SET x = 1', (), 0.4),
+            ('SELECT * FROM b', (), 0.1),
+        ]
+
+        self.assertEqual(budgets.costly_queries(queries, 3),
+                         [('SELECT * FROM b', (), 1, 0.1)])
@@ -0,0 +1,95 @@
+"""
+Test fast JSON and MessagePack renderers and parsers.
+"""
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+import msgpack
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+from menu.models import Dish
+from menu.serializers import DishSerializer
+from menu.tests.creates import create_dish
+
+DISHES_URL = reverse('menu:dish-list')
+
+
+class RendererTests(TestCase):
+    """Test renderers and parsers."""
+
+    def setUp(self):
+        self.client = APIClient()
+        create_dish(title='Soup', price=Decimal('4.50'))
+        create_dish(title='Żurek', description='Sour rye soup')
+
+    def test_orjson_matches_drf_json(self):
+        """Test orjson output is byte-identical to DRF's JSONRenderer."""
+        data = DishSerializer(Dish.objects.all(), many=True).data
+
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_orjson_indent(self):
+        """Test an indent in Accept or the context pretty-prints output."""
+        data = {'title': 'Soup', 'tags': [1]}
+        pretty = b'{\n  "title": "Soup",\n  "tags": [\n    1\n  ]\n}'
+
+        self.assertEqual(ORJSONRenderer().render(
+            data, 'application/json; indent=4', {}), pretty)
+        self.assertEqual(ORJSONRenderer().render(
+            data, 'application/json', {'indent': 4}), pretty)
+        self.assertEqual(ORJSONRenderer().render(
+            data, 'application/json; indent=0', {}),
+            b'{"title":"Soup","tags":[1]}')
+
+        res = self.client.get(
+            DISHES_URL, HTTP_ACCEPT='application/json; indent=4')
+
+        self.assertTrue(res.content.startswith(b'[\n  {\n    "id"'))
+
+    def test_orjson_parser(self):
+        """Test parsing JSON body."""
+        data = ORJSONParser().parse(BytesIO(b'{"price": "4.50", "a": [1]}'))
+
+        self.assertEqual(data, {'price': '4.50', 'a': [1]})
+
+    def test_msgpack_selected_by_accept(self):
+        """Test MessagePack response is negotiated via Accept header."""
+        res = self.client.get(DISHES_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(res.content, raw=False)
+        self.assertEqual(data[0]['title'], 'Soup')
+        self.assertEqual(data[0]['price'], '4.50')
+
+    def test_msgpack_request_body(self):
+        """Test creating a dish from a MessagePack body."""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.client.force_authenticate(user=user)
+        body = msgpack.packb({
+            'title': 'Pie', 'price': '3.00',
+            'time_minutes': 10, 'vegetarian': True,
+        })
+
+        res = self.client.post(
+            DISHES_URL, body, content_type='application/msgpack')
+
+        self.assertEqual(res.status_code, 201)
+        self.assertTrue(Dish.objects.filter(title='Pie').exists())
+
+    def test_benchmark_command(self):
+        """Test benchmark reports every format."""
+        out = StringIO()
+        call_command('benchmark_renderers', rows=10, repeat=1, stdout=out)
+
+        for name in ('json (DRF)', 'json (orjson)', 'msgpack'):
+            self.assertIn(name, out.getvalue())
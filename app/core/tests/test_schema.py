@@ -0,0 +1,34 @@
+"""
+Test the precomputed OpenAPI schema.
+"""
+import os
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaTests(SimpleTestCase):
+    """Test serving and checking the stored schema."""
+
+    def test_stored_schema_is_up_to_date(self):
+        """Test the committed schema matches the code."""
+        call_command('build_schema', check=True)
+
+    def test_schema_generated_without_warnings(self):
+        """Test schema generation reports no warnings or errors."""
+        call_command('spectacular', fail_on_warn=True, file=os.devnull)
+
+    def test_schema_served_with_etag(self):
+        """Test schema is served with an ETag and honours If-None-Match."""
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'openapi:', res.content)
+        self.assertIn('ETag', res)
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, 304)
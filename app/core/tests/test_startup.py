@@ -0,0 +1,49 @@
+"""
+Test startup import profiling and the modules a worker imports.
+"""
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from core.startup import parse_importtime, profile_startup
+
+WORKER_FORBIDDEN_MODULES = [
+    'drf_spectacular',
+    'django.contrib.admin.sites',
+    'rest_framework.views',
+    'menu.views',
+]
+
+
+class StartupTests(SimpleTestCase):
+    """Test startup profiling."""
+
+    def test_parse_importtime(self):
+        """Test parsing -X importtime output."""
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   django.utils\n'
+            'import time:       300 |        420 | django\n'
+            'unrelated line\n'
+        )
+
+        modules = parse_importtime(output)
+
+        self.assertEqual(
+            modules, {'django.utils': (120, 120), 'django': (300, 420)})
+
+    def test_worker_skips_api_modules(self):
+        """Test worker boots without API-only modules."""
+        profile = profile_startup('worker')
+
+        for name in WORKER_FORBIDDEN_MODULES:
+            imported = [module for module in profile['modules']
+                        if module == name or module.startswith(name + '.')]
+            self.assertEqual(imported, [], name)
+
+    def test_command_budget_exceeded(self):
+        """Test the command fails when imports take longer than budget."""
+        with self.assertRaises(CommandError):
+            call_command('profile_startup', role='worker', budget_ms=0.001,
+                         stdout=StringIO())
@@ -0,0 +1,199 @@
+"""
+Views for the core app.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import etag, require_safe
+from django.views.static import was_modified_since
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.batch import run_batch
+from core.schema import get_schema
+from core.serializers import BatchResponseSerializer, BatchSerializer
+from user.authentication import ExpiringTokenAuthentication
+
+PUBLIC_MEDIA_DIRS = ('uploads/dish/',)
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+@require_safe
+@etag(lambda request: get_schema()[1])
+def schema_view(request):
+    """Serve the precomputed OpenAPI schema."""
+    content, _etag = get_schema()
+    response = HttpResponse(
+        content, content_type='application/vnd.oai.openapi')
+    response['Cache-Control'] = 'public, max-age=3600'
+
+    return response
+
+
+def is_public_media(path):
+    """Return True if a path relative to MEDIA_ROOT is public."""
+    return path.startswith(PUBLIC_MEDIA_DIRS)
+
+
+def can_access_media(request, path):
+    """Return True if the user may download the media file.
+
+    `path` must be normalized, e.g. relative to the joined full path.
+    """
+    if is_public_media(path):
+        return True
+
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def parse_range(header, size):
+    """Return (start, end) of a single byte range, None if unsatisfiable.
+
+    Malformed headers and multiple ranges cover the whole file.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return 0, size - 1
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return None
+
+    return start, end
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _sendfile_response(path, fullpath, content_type):
+    """Hand the transfer off to the front proxy."""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + path
+    else:
+        response['X-Sendfile'] = fullpath
+
+    return response
+
+
+def _file_response(request, fullpath, content_type, stat):
+    """Serve the file from Python, honouring a single byte range."""
+    size = stat.st_size
+    byte_range = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range and if_range and \
+            parse_http_date_safe(if_range) != int(stat.st_mtime):
+        byte_range = None
+    bounds = parse_range(byte_range, size) if byte_range else (0, size - 1)
+
+    if bounds is None:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if bounds == (0, size - 1):
+        response = FileResponse(
+            open(fullpath, 'rb'), content_type=content_type)
+    else:
+        start, end = bounds
+        response = StreamingHttpResponse(
+            _read_range(fullpath, start, end),
+            status=206, content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+
+    return response
+
+
+@require_safe
+def media_view(request, path):
+    """Serve an uploaded file after checking access.
+
+    With MEDIA_SENDFILE set the transfer is handed off to the front proxy,
+    otherwise the file is streamed with range and conditional support.
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path.lstrip('/'))
+    except SuspiciousFileOperation:
+        raise Http404
+    path = os.path.relpath(fullpath, settings.MEDIA_ROOT).replace(
+        os.sep, '/')
+    if not os.path.isfile(fullpath) or not can_access_media(request, path):
+        raise Http404
+
+    stat = os.stat(fullpath)
+    if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        content_type = mimetypes.guess_type(fullpath)[0] \
+            or 'application/octet-stream'
+        if settings.MEDIA_SENDFILE:
+            response = _sendfile_response(path, fullpath, content_type)
+        else:
+            response = _file_response(request, fullpath, content_type, stat)
+        response['Accept-Ranges'] = 'bytes'
+    if is_public_media(path):
+        response['Cache-Control'] = \
+            f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = 'private, no-store'
+
+    return response
+
+
+class BatchView(APIView):
+    """Run several API requests in one round trip."""
+    authentication_classes = [ExpiringTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(request=BatchSerializer,
+                   responses=BatchResponseSerializer)
+    def post(self, request):
+        """Run sub-requests in order, optionally in one transaction.
+
+        A rolled back transaction is answered with 400.
+        """
+        serializer = BatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        results, committed = run_batch(
+            request, serializer.validated_data['requests'],
+            atomic=serializer.validated_data['transaction'])
+        data = BatchResponseSerializer(
+            {'committed': committed, 'results': results}).data
+
+        return Response(data, status=(
+            status.HTTP_200_OK if committed
+            else status.HTTP_400_BAD_REQUEST))
@@ -3,13 +3,65 @@ Django admin customization.
 """
 from django.contrib import admin
 
-from menu.models import Menu, Dish
+from menu.models import (
+    Digest,
+    DigestSubscription,
+    Dish,
+    Menu,
+    MenuDish,
+    MenuSchedule,
+)
+
+
+class MenuDishInline(admin.TabularInline):
+    model = MenuDish
+    fields = ['dish', 'position', 'section']
+    ordering = ['position', 'id']
+    autocomplete_fields = ['dish']
+    extra = 1
+
+
+class MenuScheduleInline(admin.TabularInline):
+    model = MenuSchedule
+    extra = 0
 
 
 class MenuAdmin(admin.ModelAdmin):
-    list_filter = ['title', 'created_date', 'modified_date']
-    list_display = ['title']
+    list_filter = ['modified_date']
+    list_display = ['title', 'valid_from', 'valid_to']
+    date_hierarchy = 'created_date'
+    search_fields = ['title']
+    ordering = ['title']
+    list_per_page = 50
+    show_full_result_count = False
+    inlines = [MenuDishInline, MenuScheduleInline]
+
+
+class DishAdmin(admin.ModelAdmin):
+    list_display = ['title', 'price', 'vegetarian', 'available',
+                    'modified_date']
+    list_filter = ['available', 'vegetarian']
+    search_fields = ['title']
+    ordering = ['title']
+    list_per_page = 50
+    show_full_result_count = False
+
+
+class DigestSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'enabled', 'frequency', 'vegetarian_only']
+    list_filter = ['enabled', 'frequency', 'vegetarian_only']
+    autocomplete_fields = ['menus']
+    list_select_related = ['user']
+
+
+class DigestAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'date', 'frequency', 'vegetarian_only',
+                    'menu_ids']
+    list_filter = ['frequency', 'vegetarian_only']
+    date_hierarchy = 'date'
 
 
 admin.site.register(Menu, MenuAdmin)
-admin.site.register(Dish)
+admin.site.register(Dish, DishAdmin)
+admin.site.register(DigestSubscription, DigestSubscriptionAdmin)
+admin.site.register(Digest, DigestAdmin)
@@ -0,0 +1,250 @@
+"""
+Response cache and cache warming for the menu API.
+"""
+import hashlib
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from core.compression import choose_encoding
+from core.internal import InternalRequest
+from menu.models import AccessStat, Menu
+
+GENERATION_KEY = 'menu:generation'
+WARM_HEADER = 'HTTP_X_CACHE_WARM'
+
+_hits = Counter()
+_hits_lock = threading.Lock()
+
+
+def get_generation():
+    """Return the current generation of cached menu responses."""
+    return cache.get_or_set(GENERATION_KEY, 1, timeout=None)
+
+
+def invalidate():
+    """Drop all cached menu responses by moving to a new generation."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, timeout=None)
+
+
+def response_key(uri):
+    """Return cache key of the response for an absolute URI."""
+    digest = hashlib.md5(uri.encode()).hexdigest()
+    return f'menu:response:{get_generation()}:{digest}'
+
+
+def cache_uri(request, params):
+    """Return the absolute URI of a request keeping only `params`, sorted.
+
+    Other query parameters do not change the response, so they split
+    neither the cache nor the access statistics.
+    """
+    query = sorted(
+        (name, value) for name, values in request.GET.lists()
+        if name in params for value in values)
+    uri = request.build_absolute_uri(request.path)
+
+    return f'{uri}?{urlencode(query)}' if query else uri
+
+
+def next_menu_boundary(now):
+    """Return the next moment a menu turns on or off, None if there is none.
+
+    The result is kept for the current generation, so it is only computed
+    again after a write or once the boundary has passed.
+    """
+    key = f'menu:boundary:{get_generation()}'
+    boundary = cache.get(key)
+    if boundary is None or (boundary and boundary <= now):
+        # An empty string caches "no boundary ahead".
+        boundary = Menu.next_boundary(now) or ''
+        cache.set(key, boundary, settings.MENU_CACHE_TIMEOUT)
+
+    return boundary or None
+
+
+def record_access(uri):
+    """Count a request in memory.
+
+    Counts are written by `flush_due_access_stats` once the response is
+    sent. URIs too long for the statistics table are not counted.
+    """
+    if len(uri) > AccessStat._meta.get_field('uri').max_length:
+        return
+    with _hits_lock:
+        _hits[uri] += 1
+
+
+def flush_due_access_stats():
+    """Write request counts once enough requests are counted."""
+    with _hits_lock:
+        if sum(_hits.values()) < settings.ACCESS_STATS_FLUSH_EVERY:
+            return
+    flush_access_stats()
+
+
+def flush_access_stats(batch_size=500):
+    """Write in-memory request counts to the database.
+
+    Counts are added with INSERT ... ON CONFLICT DO UPDATE, so processes
+    flushing the same new URI at once all keep their counts. URIs are
+    sorted so concurrent flushes lock rows in the same order.
+    """
+    with _hits_lock:
+        hits = sorted(_hits.items())
+        _hits.clear()
+
+    qn = connection.ops.quote_name
+    table = qn(AccessStat._meta.db_table)
+    uri, count, last = qn('uri'), qn('hits'), qn('last_access')
+    last_access = connection.ops.adapt_datetimefield_value(timezone.now())
+    for start in range(0, len(hits), batch_size):
+        batch = hits[start:start + batch_size]
+        values = ', '.join(['(%s, %s, %s)'] * len(batch))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({uri}, {count}, {last}) '
+                f'VALUES {values} ON CONFLICT ({uri}) DO UPDATE SET '
+                f'{count} = {table}.{count} + EXCLUDED.{count}, '
+                f'{last} = EXCLUDED.{last}',
+                [value for row in batch for value in (*row, last_access)],
+            )
+
+
+class CachedResponseMixin:
+    """Serve list and retrieve from cache, invalidate on writes."""
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
+
+    def _cached(self, handler, request, *args, **kwargs):
+        uri = cache_uri(request, self.get_cache_params())
+        if WARM_HEADER not in request.META:
+            record_access(uri)
+        key = response_key(uri)
+        variant_key = self._variant_key(request, key)
+        if variant_key:
+            variant = cache.get(variant_key)
+            if variant is not None:
+                return variant_response(variant)
+
+        timeout = self.get_cache_timeout()
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cache.set(key, response.data, timeout)
+
+        if variant_key:
+            response.variant_cache_key = variant_key
+            response.variant_cache_timeout = timeout
+
+        return response
+
+    def get_cache_timeout(self):
+        """Return seconds a freshly computed response may be cached."""
+        return settings.MENU_CACHE_TIMEOUT
+
+    def get_cache_params(self):
+        """Return names of the query parameters that change the response."""
+        params = {api_settings.ORDERING_PARAM,
+                  api_settings.URL_FORMAT_OVERRIDE}
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is not None:
+            params.update(filterset_class.base_filters)
+
+        return params
+
+    def _variant_key(self, request, key):
+        """Return key of the rendered and encoded response, if cacheable.
+
+        Browsable API pages embed per-user content and are not stored.
+        """
+        renderer = getattr(request, 'accepted_renderer', None)
+        if renderer is None or renderer.format == 'api':
+            return None
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')) or 'identity'
+
+        return f'{key}:{request.accepted_media_type}:{encoding}'
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS \
+                and response.status_code < 400:
+            invalidate()
+
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def variant_response(variant):
+    """Build a response from stored rendered and encoded content."""
+    response = HttpResponse(
+        variant['content'], content_type=variant['content_type'])
+    if variant['content_encoding']:
+        response['Content-Encoding'] = variant['content_encoding']
+    patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+
+    return response
+
+
+class WarmRequest(InternalRequest):
+    """Cache warming GET request for an absolute URI."""
+
+    def __init__(self, uri):
+        super().__init__('GET', uri, **{WARM_HEADER: '1'})
+
+
+def _warm_uri(uri):
+    """Run a GET for an absolute URI through its view."""
+    request = WarmRequest(uri)
+    try:
+        match = resolve(request.path, urlconf=settings.API_URLCONF)
+    except Resolver404:
+        return False
+
+    response = match.func(request, *match.args, **match.kwargs)
+
+    return response.status_code == 200
+
+
+def _warm_uri_in_thread(uri):
+    try:
+        return _warm_uri(uri)
+    finally:
+        connection.close()
+
+
+def warm_cache(limit=50, concurrency=2):
+    """Prime cache with the most requested responses.
+
+    At most `concurrency` requests run at the same time so warming
+    does not starve live traffic. Return number of warmed responses.
+    """
+    uris = list(AccessStat.objects.order_by('-hits').values_list(
+        'uri', flat=True)[:limit])
+    if concurrency <= 1:
+        return sum(_warm_uri(uri) for uri in uris)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return sum(pool.map(_warm_uri_in_thread, uris))
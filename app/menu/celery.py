@@ -1,56 +1,48 @@
+from celery import shared_task
 from celery.schedules import crontab
 from celery.task import periodic_task
 
-from django.db.models import Q
-from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
-from django.utils.timezone import datetime, now
+from django.conf import settings
+from django.utils.timezone import localdate, now, timedelta
 
-from app.settings import EMAIL_HOST_USER
-from menu.models import Dish
-
-
-def send_mail_with_new_dishes(user, subject, message):
-    send_mail(
-        subject=subject, message=message, from_email=EMAIL_HOST_USER,
-        recipient_list=[user.email], fail_silently=False
-    )
+from core.locks import single_run
+from menu.cache import warm_cache
+from menu.digests import send_digests
+from menu.models import Change, DishPrice
 
 
 @periodic_task(run_every=(
     crontab(minute=0, hour=10)),
     name="send_email_with_new_dishes",
     ignore_result=True)
+@single_run(name="send_email_with_new_dishes")
 def assemble_email_with_new_dishes():
-    """Assembling email with yesterdays updates."""
-    yesterday = f"{now().day - 1}-{now().month}-{now().year}"
-    subject = f'{yesterday} menu update'
-    message = f"""
-        {yesterday} menu update\n
-        Newly created (or modified) dishes:\n
-        ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~\n
-    """
-
-    new_dishes_from_yesterday = Dish.objects.filter(
-        Q(created_date=datetime(now().year, now().month, now().day - 1))
-        | Q(modified_date=datetime(now().year, now().month, now().day - 1))
-    )
-    if new_dishes_from_yesterday:
-        for dish in new_dishes_from_yesterday:
-            message += f"""
-                Name: {dish.title} \n
-                Description: {dish.description} \n
-                Price: ${dish.price}\n
-                Preparation time: {dish.time_minutes} min\n
-                Is vegetarian: {dish.vegetarian} \n
-                ............................................ \n
-            """
-    else:
-        message += """
-            No new dishes were added (or modified) yesterday. \n
-            Expect next email about todays updates tomorrow. \n
-        """
-
-    active_users = get_user_model().objects.filter(is_active=True)
-    for user in active_users:
-        send_mail_with_new_dishes(user, subject, message)
+    """Queue new dishes digests due today for their subscribers."""
+    send_digests(localdate())
+
+
+@shared_task(name='warm_cache', ignore_result=True)
+def warm_cache_task(limit=50, concurrency=2):
+    """Prime the response cache with the most requested responses."""
+    warm_cache(limit=limit, concurrency=concurrency)
+
+
+@periodic_task(run_every=(
+    crontab(minute=0, hour=3)),
+    name="compact_change_feed",
+    ignore_result=True)
+@single_run(name="compact_change_feed")
+def compact_change_feed():
+    """Collapse old change feed entries to the latest one per object."""
+    Change.compact(
+        now() - timedelta(days=settings.CHANGE_FEED_COMPACT_AFTER_DAYS))
+
+
+@periodic_task(run_every=(
+    crontab(minute=0, hour=4)),
+    name="create_price_partitions",
+    ignore_result=True)
+@single_run(name="create_price_partitions")
+def create_price_partitions():
+    """Create dish price history partitions for the coming months."""
+    DishPrice.create_partitions(settings.PRICE_HISTORY_PARTITIONS_AHEAD)
@@ -0,0 +1,142 @@
+"""
+New dishes digests for subscribers.
+
+Subscribers sharing preferences form a variant. Each variant is rendered
+once per date by the scheduled task, stored, and the same content is
+emailed to all of its recipients and served by the API.
+"""
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+
+from core import outbox
+from menu.models import Digest, DigestSubscription, Dish
+
+DEFAULT_VARIANT = (DigestSubscription.DAILY, False, ())
+
+
+def period(date, frequency):
+    """Return first and last day covered by the digest sent on `date`."""
+    end = date - timedelta(days=1)
+    if frequency == DigestSubscription.WEEKLY:
+        return end - timedelta(days=6), end
+
+    return end, end
+
+
+def due_frequencies(date):
+    """Return frequencies of digests sent on `date`, weekly on Mondays."""
+    if date.weekday() == 0:
+        return [DigestSubscription.DAILY, DigestSubscription.WEEKLY]
+
+    return [DigestSubscription.DAILY]
+
+
+def subscription_variant(subscription):
+    """Return the variant of a subscription."""
+    return (subscription.frequency, subscription.vegetarian_only,
+            tuple(sorted(menu.id for menu in subscription.menus.all())))
+
+
+def _menu_ids_key(menu_ids):
+    return ','.join(str(menu_id) for menu_id in sorted(menu_ids))
+
+
+def _variant_lookup(date, variant):
+    frequency, vegetarian_only, menu_ids = variant
+    menu_ids_hash = hashlib.md5(_menu_ids_key(menu_ids).encode()).hexdigest()
+
+    return {
+        'date': date, 'frequency': frequency,
+        'vegetarian_only': vegetarian_only, 'menu_ids_hash': menu_ids_hash,
+    }
+
+
+def render_digest(date, frequency, vegetarian_only, menu_ids):
+    """Return subject and body of a digest variant."""
+    start, end = period(date, frequency)
+    dishes = Dish.objects.filter(
+        Q(created_date__range=(start, end))
+        | Q(modified_date__range=(start, end)))
+    if vegetarian_only:
+        dishes = dishes.filter(vegetarian=True)
+    if menu_ids:
+        dishes = dishes.filter(menu__in=menu_ids).distinct()
+    if start == end:
+        subject = f'{end:%d-%m-%Y} menu update'
+    else:
+        subject = f'{start:%d-%m-%Y} - {end:%d-%m-%Y} menu update'
+    body = render_to_string('menu/digest.txt', {
+        'subject': subject, 'start': start, 'end': end,
+        'dishes': dishes.order_by('title', 'id'),
+    })
+
+    return subject, body
+
+
+def find_digest(date, variant):
+    """Return the stored digest of a variant, None if it was not sent."""
+    return Digest.objects.filter(**_variant_lookup(date, variant)).first()
+
+
+def get_digest(date, variant):
+    """Return the stored digest of a variant, rendering it if missing."""
+    digest = find_digest(date, variant)
+    if digest is not None:
+        return digest
+
+    lookup = _variant_lookup(date, variant)
+    subject, body = render_digest(date, *variant)
+    try:
+        with transaction.atomic():
+            return Digest.objects.create(
+                subject=subject, body=body,
+                menu_ids=_menu_ids_key(variant[2]), **lookup)
+    except IntegrityError:
+        # Rendered concurrently, both renders are the same.
+        return Digest.objects.get(**lookup)
+
+
+def subscriber_variants(frequencies):
+    """Return emails of active subscribers grouped by variant."""
+    subscriptions = DigestSubscription.objects.filter(
+        enabled=True, frequency__in=frequencies, user__is_active=True)
+    menus = defaultdict(list)
+    for subscription_id, menu_id in DigestSubscription.menus.through.objects \
+            .filter(digestsubscription__in=subscriptions) \
+            .values_list('digestsubscription_id', 'menu_id'):
+        menus[subscription_id].append(menu_id)
+
+    variants = defaultdict(list)
+    for subscription_id, frequency, vegetarian_only, email in \
+            subscriptions.values_list(
+                'id', 'frequency', 'vegetarian_only', 'user__email'):
+        variant = (frequency, vegetarian_only,
+                   tuple(sorted(menus[subscription_id])))
+        variants[variant].append(email)
+
+    return variants
+
+
+def send_digests(date):
+    """Queue digests due on `date` for their subscribers.
+
+    The default variant is stored as well, it is served to users without
+    a subscription. Return number of queued emails.
+    """
+    queued = 0
+    with transaction.atomic():
+        get_digest(date, DEFAULT_VARIANT)
+        for variant, emails in subscriber_variants(
+                due_frequencies(date)).items():
+            digest = get_digest(date, variant)
+            outbox.enqueue_emails(digest.subject, digest.body, emails,
+                                  from_email=settings.EMAIL_HOST_USER)
+            queued += len(emails)
+
+    return queued
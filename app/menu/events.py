@@ -0,0 +1,204 @@
+"""
+Server-Sent Events channel for menu and dish changes.
+
+Every change feed entry is published after commit through the outbox.
+Each ASGI worker keeps a single Redis pub/sub subscription and fans events
+out to its connected clients. Without Redis, events are delivered
+in-process only.
+"""
+import asyncio
+import json
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+CHANNEL = 'menu:events'
+QUEUE_SIZE = 100
+
+
+def _entry_event(entry_id, kind, object_id, deleted):
+    return {'id': entry_id, 'kind': kind, 'object_id': object_id,
+            'deleted': deleted}
+
+
+class Broadcaster:
+    """Fan out events to subscriber queues living in event loops."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscribe(self):
+        """Return a queue receiving events, None marks an overflow."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add((loop, queue))
+        if settings.EVENTS_REDIS_URL and (
+                self._listener is None or self._listener.done()):
+            self._listener = loop.create_task(self._listen())
+
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers = {
+                sub for sub in self._subscribers if sub[1] is not queue}
+
+    def deliver(self, events):
+        """Hand events to every subscriber, safe from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._put, queue, events)
+
+    @staticmethod
+    def _put(queue, events):
+        for event in events:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client: end its stream, it resumes from the feed.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                return
+
+    async def _listen(self):
+        """Relay events from the single Redis subscription of a worker."""
+        import redis.asyncio as redis
+
+        client = redis.Redis.from_url(settings.EVENTS_REDIS_URL)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    self.deliver(json.loads(message['data']))
+        finally:
+            await pubsub.close()
+            await client.close()
+
+
+broadcaster = Broadcaster()
+_redis = None
+
+
+def entry_events(entries):
+    """Return events of change feed entries."""
+    return [_entry_event(entry.id, entry.kind, entry.object_id,
+                         entry.deleted) for entry in entries]
+
+
+def publish(entries):
+    """Publish change feed entries to all workers."""
+    publish_events(entry_events(entries))
+
+
+def publish_events(events):
+    """Publish events to all workers."""
+    global _redis
+    if not settings.EVENTS_REDIS_URL:
+        broadcaster.deliver(events)
+        return
+
+    if _redis is None:
+        import redis
+
+        _redis = redis.Redis.from_url(settings.EVENTS_REDIS_URL)
+    _redis.publish(CHANNEL, json.dumps(events))
+
+
+def _missed_events(last_id, limit):
+    from menu.models import Change
+
+    return [
+        _entry_event(*row) for row in Change.objects.filter(
+            id__gt=last_id).order_by('id').values_list(
+            'id', 'kind', 'object_id', 'deleted')[:limit]
+    ]
+
+
+def format_event(event):
+    """Return an SSE message for an event."""
+    return (f"id: {event['id']}\nevent: change\n"
+            f"data: {json.dumps(event)}\n\n").encode()
+
+
+def _last_event_id(scope):
+    headers = dict(scope['headers'])
+    value = headers.get(b'last-event-id', b'').decode()
+    if not value:
+        query = parse_qs(scope.get('query_string', b'').decode())
+        value = query.get('lastEventId', [''])[0]
+
+    return int(value) if value.isdigit() else None
+
+
+async def _disconnected(receive):
+    """Return once the client disconnects, skipping other messages."""
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def sse_app(scope, receive, send):
+    """ASGI app streaming change events with heartbeat and resume."""
+    queue = broadcaster.subscribe()
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        last_id = _last_event_id(scope)
+        # Replayed events may be published again live, entries committed
+        # out of id order are not skipped.
+        replayed = set()
+        if last_id is not None:
+            missed = await sync_to_async(_missed_events)(
+                last_id, settings.EVENTS_REPLAY_LIMIT + 1)
+            if len(missed) > settings.EVENTS_REPLAY_LIMIT:
+                await send({'type': 'http.response.body',
+                            'body': b'event: reset\ndata: {}\n\n'})
+                return
+            for event in missed:
+                await send({'type': 'http.response.body',
+                            'body': format_event(event), 'more_body': True})
+                replayed.add(event['id'])
+
+        disconnect = asyncio.ensure_future(_disconnected(receive))
+        while True:
+            get_event = asyncio.ensure_future(queue.get())
+            done, _pending = await asyncio.wait(
+                {get_event, disconnect},
+                timeout=settings.EVENTS_HEARTBEAT_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                get_event.cancel()
+                return
+            if get_event not in done:
+                get_event.cancel()
+                body = b': heartbeat\n\n'
+            else:
+                event = get_event.result()
+                if event is None:
+                    break
+                if event['id'] in replayed:
+                    replayed.discard(event['id'])
+                    continue
+                body = format_event(event)
+            await send({'type': 'http.response.body',
+                        'body': body, 'more_body': True})
+        disconnect.cancel()
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        broadcaster.unsubscribe(queue)
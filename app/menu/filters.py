@@ -1,6 +1,30 @@
-from django_filters import CharFilter, DateFilter, FilterSet
+from django.db.models import F
+from django.utils import timezone
+from django_filters import (
+    BooleanFilter,
+    CharFilter,
+    DateFilter,
+    FilterSet,
+    IsoDateTimeFilter,
+    MultipleChoiceFilter,
+    NumberFilter,
+)
 
-from menu.models import Menu
+from menu.models import (
+    ALLERGEN_FLAGS,
+    DIETARY_FLAGS,
+    Dish,
+    DishFlag,
+    Menu,
+)
+
+
+def flag_choices(flags):
+    return [(flag.name.lower(), flag.name.lower()) for flag in flags]
+
+
+def flags_mask(names):
+    return sum(DishFlag[name.upper()] for name in names)
 
 
 class MenuFilter(FilterSet):
@@ -15,6 +39,9 @@ class MenuFilter(FilterSet):
         field_name='modified_date', lookup_expr='gte', distinct=True)
     modified_to = DateFilter(field_name='modified_date',
                              lookup_expr='lte', distinct=True)
+    # format: ISO 8601, e.g. 2023-05-01T12:30:00+02:00
+    active_at = IsoDateTimeFilter(method='filter_active_at')
+    active = BooleanFilter(method='filter_active')
 
     class Meta:
         model = Menu
@@ -24,4 +51,73 @@ class MenuFilter(FilterSet):
             'created_to',
             'modified_from',
             'modified_to',
+            'active_at',
+            'active',
+        ]
+
+    def filter_active_at(self, queryset, name, value):
+        return queryset.active_at(value)
+
+    def filter_active(self, queryset, name, value):
+        active = queryset.active_at(timezone.now())
+        if value:
+            return active
+
+        return queryset.exclude(pk__in=active.values('pk'))
+
+
+class DishFilter(FilterSet):
+    title = CharFilter(field_name='title', lookup_expr='icontains')
+    price_min = NumberFilter(field_name='price', lookup_expr='gte')
+    price_max = NumberFilter(field_name='price', lookup_expr='lte')
+    time_min = NumberFilter(field_name='time_minutes', lookup_expr='gte')
+    time_max = NumberFilter(field_name='time_minutes', lookup_expr='lte')
+    vegetarian = BooleanFilter(field_name='vegetarian')
+    # format: YYYY-MM-DD
+    created_from = DateFilter(field_name='created_date', lookup_expr='gte')
+    created_to = DateFilter(field_name='created_date', lookup_expr='lte')
+    modified_from = DateFilter(
+        field_name='modified_date', lookup_expr='gte')
+    modified_to = DateFilter(field_name='modified_date', lookup_expr='lte')
+    # a dish is linked to a menu at most once, no distinct needed
+    menu = NumberFilter(field_name='menudish__menu')
+    # repeat the parameter for several flags, e.g. ?dietary=vegan&...
+    dietary = MultipleChoiceFilter(
+        choices=flag_choices(DIETARY_FLAGS), method='filter_dietary')
+    allergen_free = MultipleChoiceFilter(
+        choices=flag_choices(ALLERGEN_FLAGS), method='filter_allergen_free')
+
+    class Meta:
+        model = Dish
+        fields = [
+            'title',
+            'price_min',
+            'price_max',
+            'time_min',
+            'time_max',
+            'vegetarian',
+            'created_from',
+            'created_to',
+            'modified_from',
+            'modified_to',
+            'menu',
+            'dietary',
+            'allergen_free',
         ]
+
+    def filter_dietary(self, queryset, name, value):
+        """Keep dishes having all given dietary flags."""
+        mask = flags_mask(value)
+
+        return queryset.alias(
+            dietary_bits=F('flags').bitand(mask)).filter(dietary_bits=mask)
+
+    def filter_allergen_free(self, queryset, name, value):
+        """Keep dishes containing none of the given allergens."""
+        # One condition per allergen, each matches a menu_dish_<name>_idx.
+        bits = {
+            f'{allergen}_bit': F('flags').bitand(DishFlag[allergen.upper()])
+            for allergen in value
+        }
+
+        return queryset.alias(**bits).filter(**dict.fromkeys(bits, 0))
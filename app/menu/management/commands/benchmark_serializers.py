@@ -0,0 +1,76 @@
+"""
+Command to compare ModelSerializer and values() based list serializers.
+"""
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from menu import serializers
+from menu.models import Dish, Menu, MenuDish, POSITION_STEP
+
+DISHES_PER_MENU = 10
+
+
+class Command(BaseCommand):
+    """Command to benchmark list serializers on generated rows."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=10000,
+            help='Number of dishes, a tenth of it is the number of menus.')
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Number of runs per serializer, the best one is reported.')
+
+    def _create_rows(self, rows):
+        dishes = Dish.objects.bulk_create(
+            Dish(title=f'Benchmark dish {i}', description='Description',
+                 price=Decimal(i % 100) + Decimal('0.5'),
+                 time_minutes=i % 60, vegetarian=i % 2 == 0)
+            for i in range(rows))
+        menus = Menu.objects.bulk_create(
+            Menu(title=f'Benchmark menu {i}')
+            for i in range(max(rows // DISHES_PER_MENU, 1)))
+        MenuDish.objects.bulk_create(
+            MenuDish(menu=menus[i // DISHES_PER_MENU], dish=dish,
+                     position=(i % DISHES_PER_MENU + 1) * POSITION_STEP)
+            for i, dish in enumerate(dishes[:len(menus) * DISHES_PER_MENU]))
+
+    def _best(self, repeat, func):
+        best, result = None, None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = JSONRenderer().render(func())
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+
+        return best, result
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with transaction.atomic():
+            self._create_rows(options['rows'])
+            cases = [
+                ('dishes', Dish.objects.order_by('title'),
+                 serializers.DishSerializer,
+                 serializers.DishValuesSerializer),
+                ('menus', Menu.objects.order_by('title'),
+                 serializers.MenuSerializer,
+                 serializers.MenuValuesSerializer),
+            ]
+            for name, queryset, model_class, values_class in cases:
+                model_ms, model_content = self._best(
+                    options['repeat'],
+                    lambda: model_class(queryset, many=True).data)
+                values_ms, values_content = self._best(
+                    options['repeat'], lambda: values_class(queryset).data)
+                identical = 'yes' if model_content == values_content else 'NO'
+                self.stdout.write(
+                    f'{name:7} ModelSerializer {model_ms:9.1f} ms, '
+                    f'values() {values_ms:9.1f} ms, '
+                    f'speedup {model_ms / values_ms:5.1f}x, '
+                    f'identical: {identical}')
+            transaction.set_rollback(True)
@@ -0,0 +1,24 @@
+"""
+Command to compact the menu change feed.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now, timedelta
+
+from menu.models import Change
+
+
+class Command(BaseCommand):
+    """Command to collapse old change feed entries."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            default=settings.CHANGE_FEED_COMPACT_AFTER_DAYS,
+            help='Compact entries older than this many days.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        deleted = Change.compact(now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {deleted} superseded entries.'))
@@ -26,7 +26,7 @@ class Command(BaseCommand):
                                 price=Decimal('3.00'),
                                 time_minutes=1,
                                 vegetarian=True)
-            menu1.dishes.add(dish1, dish2)
+            menu1.append_dishes([dish1, dish2])
             menu1.save()
 
         if not Menu.objects.filter(title='Sweet menu'):
@@ -35,7 +35,7 @@ class Command(BaseCommand):
                                 price=Decimal('8.00'),
                                 time_minutes=20,
                                 vegetarian=True)
-            menu2.dishes.add(dish3)
+            menu2.append_dishes([dish3])
             menu2.save()
 
         if not Menu.objects.filter(title='French cuisine'):
@@ -49,7 +49,7 @@ class Command(BaseCommand):
                                 price=Decimal('3.00'),
                                 time_minutes=2,
                                 vegetarian=True)
-            menu3.dishes.add(dish4, dish5)
+            menu3.append_dishes([dish4, dish5])
             menu3.save()
 
         if not Menu.objects.filter(title='Exclusive menu card'):
@@ -63,5 +63,5 @@ class Command(BaseCommand):
                                 price=Decimal('13.00'),
                                 time_minutes=40,
                                 vegetarian=True)
-            menu4.dishes.add(dish6, dish7)
+            menu4.append_dishes([dish6, dish7])
             menu4.save()
@@ -0,0 +1,21 @@
+"""
+Command to rebuild menu statistics from scratch.
+"""
+from django.core.management.base import BaseCommand
+
+from menu.models import MenuStats
+
+
+class Command(BaseCommand):
+    """Command to recompute statistics of menus."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'menu_ids', nargs='*', type=int,
+            help='Menus to rebuild, all when omitted.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        rebuilt = MenuStats.rebuild(options['menu_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt statistics of {rebuilt} menus.'))
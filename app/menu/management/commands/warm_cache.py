@@ -0,0 +1,25 @@
+"""
+Command to prime the API response cache.
+"""
+from django.core.management.base import BaseCommand
+
+from menu.cache import flush_access_stats, warm_cache
+
+
+class Command(BaseCommand):
+    """Command to prime cache with the most requested responses."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=50,
+            help='Number of most requested URIs to warm.')
+        parser.add_argument(
+            '--concurrency', type=int, default=2,
+            help='Maximum number of requests run at the same time.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        flush_access_stats()
+        warmed = warm_cache(
+            limit=options['limit'], concurrency=options['concurrency'])
+        self.stdout.write(self.style.SUCCESS(f'Warmed {warmed} responses.'))
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-19 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dish',
+            name='available',
+            field=models.BooleanField(default=True, verbose_name='Is available'),
+        ),
+        migrations.AddField(
+            model_name='dish',
+            name='version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Version'),
+        ),
+    ]
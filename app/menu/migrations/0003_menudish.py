@@ -0,0 +1,64 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+POSITION_STEP = 1024
+
+
+def copy_menu_dishes(apps, schema_editor):
+    """Copy links from the implicit m2m table, keeping insertion order."""
+    Menu = apps.get_model('menu', 'Menu')
+    MenuDish = apps.get_model('menu', 'MenuDish')
+    links = Menu.dishes.through.objects.order_by('menu_id', 'id')
+
+    new_links = []
+    position = 0
+    menu_id = None
+    for link in links.iterator():
+        if link.menu_id != menu_id:
+            menu_id = link.menu_id
+            position = 0
+        position += POSITION_STEP
+        new_links.append(MenuDish(
+            menu_id=link.menu_id, dish_id=link.dish_id, position=position))
+    MenuDish.objects.bulk_create(new_links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_dish_available_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuDish',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.IntegerField(default=0, verbose_name='Position')),
+                ('section', models.CharField(blank=True, max_length=255, verbose_name='Section')),
+                ('dish', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='menu.dish')),
+                ('menu', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='menu.menu')),
+            ],
+            options={
+                'verbose_name': 'Menu dish',
+                'verbose_name_plural': 'Menu dishes',
+                'unique_together': {('menu', 'dish')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='menudish',
+            index=models.Index(fields=['menu', 'position'], name='menu_menudish_position_idx'),
+        ),
+        migrations.RunPython(copy_menu_dishes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='menu',
+            name='dishes',
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='dishes',
+            field=models.ManyToManyField(through='menu.MenuDish', to='menu.dish', verbose_name='Dish'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_menudish'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uri', models.CharField(max_length=2048, unique=True, verbose_name='URI')),
+                ('hits', models.PositiveBigIntegerField(default=0, verbose_name='Hits')),
+                ('last_access', models.DateTimeField(auto_now=True, verbose_name='Last access')),
+            ],
+            options={
+                'verbose_name': 'Access statistic',
+                'verbose_name_plural': 'Access statistics',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='accessstat',
+            index=models.Index(fields=['-hits'], name='menu_accessstat_hits_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_accessstat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('menu', 'Menu'), ('dish', 'Dish')], max_length=4, verbose_name='Kind')),
+                ('object_id', models.BigIntegerField(verbose_name='Object id')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Deleted')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Created')),
+            ],
+            options={
+                'verbose_name': 'Change',
+                'verbose_name_plural': 'Changes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['kind', 'object_id', 'id'], name='menu_change_object_idx'),
+        ),
+    ]
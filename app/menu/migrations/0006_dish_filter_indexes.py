@@ -0,0 +1,56 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+TITLE_TRGM_INDEX = 'menu_dish_title_trgm_idx'
+
+
+def create_title_trgm_index(apps, schema_editor):
+    """Index UPPER(title) with trigrams so icontains can use it."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {TITLE_TRGM_INDEX} ON menu_dish '
+        'USING gin (UPPER(title) gin_trgm_ops)')
+
+
+def drop_title_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {TITLE_TRGM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_change'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['title'], name='menu_dish_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['price'], name='menu_dish_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['time_minutes', 'price'], name='menu_dish_time_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(condition=models.Q(('vegetarian', True)), fields=['price'], name='menu_dish_veg_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['created_date'], name='menu_dish_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['modified_date'], name='menu_dish_modified_idx'),
+        ),
+        migrations.RunPython(create_title_trgm_index, drop_title_trgm_index),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0006_dish_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], verbose_name='Weekday')),
+                ('start_time', models.TimeField(verbose_name='Start time')),
+                ('end_time', models.TimeField(verbose_name='End time')),
+            ],
+            options={
+                'verbose_name': 'Menu schedule',
+                'verbose_name_plural': 'Menu schedules',
+                'ordering': ['weekday', 'start_time'],
+            },
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='valid_from',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Valid from'),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='valid_to',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Valid to'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['valid_from', 'valid_to'], name='menu_menu_validity_idx'),
+        ),
+        migrations.AddField(
+            model_name='menuschedule',
+            name='menu',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='menu.menu'),
+        ),
+        migrations.AddIndex(
+            model_name='menuschedule',
+            index=models.Index(fields=['menu', 'weekday', 'start_time', 'end_time'], name='menu_schedule_slot_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='menuschedule',
+            constraint=models.CheckConstraint(check=models.Q(('end_time__gt', django.db.models.expressions.F('start_time'))), name='menu_schedule_end_after_start'),
+        ),
+    ]
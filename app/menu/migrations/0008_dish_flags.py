@@ -0,0 +1,31 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:27
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+def copy_vegetarian_flag(apps, schema_editor):
+    """Set the VEGETARIAN bit of dishes marked vegetarian."""
+    Dish = apps.get_model('menu', 'Dish')
+    Dish.objects.filter(vegetarian=True).update(
+        flags=models.F('flags').bitor(1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0007_menu_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dish',
+            name='flags',
+            field=models.PositiveIntegerField(default=0, verbose_name='Dietary and allergen flags'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(4194048)), name='menu_dish_allergens_idx'),
+        ),
+        migrations.RunPython(copy_vegetarian_flag, migrations.RunPython.noop),
+    ]
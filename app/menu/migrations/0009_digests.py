@@ -0,0 +1,56 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('menu', '0008_dish_flags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Digest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly')], max_length=6, verbose_name='Frequency')),
+                ('vegetarian_only', models.BooleanField(verbose_name='Vegetarian only')),
+                ('menu_ids', models.CharField(blank=True, max_length=255, verbose_name='Menu ids')),
+                ('subject', models.CharField(max_length=255, verbose_name='Subject')),
+                ('body', models.TextField(verbose_name='Body')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Created')),
+            ],
+            options={
+                'verbose_name': 'Digest',
+                'verbose_name_plural': 'Digests',
+            },
+        ),
+        migrations.CreateModel(
+            name='DigestSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enabled', models.BooleanField(default=False, verbose_name='Enabled')),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly')], default='daily', max_length=6, verbose_name='Frequency')),
+                ('vegetarian_only', models.BooleanField(default=False, verbose_name='Vegetarian only')),
+                ('menus', models.ManyToManyField(blank=True, related_name='digest_subscriptions', to='menu.menu', verbose_name='Menus')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='digest_subscription', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Digest subscription',
+                'verbose_name_plural': 'Digest subscriptions',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='digest',
+            constraint=models.UniqueConstraint(fields=('date', 'frequency', 'vegetarian_only', 'menu_ids'), name='menu_digest_variant_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='digestsubscription',
+            index=models.Index(condition=models.Q(('enabled', True)), fields=['frequency', 'vegetarian_only'], name='menu_digestsub_variant_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_menu_stats(apps, schema_editor):
+    """Compute statistics of existing menus."""
+    Menu = apps.get_model('menu', 'Menu')
+    MenuDish = apps.get_model('menu', 'MenuDish')
+    MenuStats = apps.get_model('menu', 'MenuStats')
+    totals = {}
+    for row in MenuDish.objects.order_by().values('menu_id').annotate(
+            dish_count=models.Count('id'),
+            price_sum=models.Sum('dish__price'),
+            min_price=models.Min('dish__price'),
+            max_price=models.Max('dish__price'),
+            time_minutes_sum=models.Sum('dish__time_minutes'),
+            vegetarian_count=models.Count(
+                'id', filter=models.Q(dish__vegetarian=True)),
+    ):
+        totals[row.pop('menu_id')] = row
+    MenuStats.objects.bulk_create([
+        MenuStats(menu_id=menu_id, **totals.get(menu_id, {}))
+        for menu_id in Menu.objects.values_list('id', flat=True)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0009_digests'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuStats',
+            fields=[
+                ('menu', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='menu.menu')),
+                ('dish_count', models.PositiveIntegerField(default=0, verbose_name='Dish count')),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Price sum')),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=5, null=True, verbose_name='Min price')),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=5, null=True, verbose_name='Max price')),
+                ('time_minutes_sum', models.BigIntegerField(default=0, verbose_name='Total preparation time in min')),
+                ('vegetarian_count', models.PositiveIntegerField(default=0, verbose_name='Vegetarian dishes')),
+            ],
+            options={
+                'verbose_name': 'Menu statistics',
+                'verbose_name_plural': 'Menu statistics',
+            },
+        ),
+        migrations.RunPython(build_menu_stats, migrations.RunPython.noop),
+    ]
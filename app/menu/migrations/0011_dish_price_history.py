@@ -0,0 +1,88 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:47
+
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.utils import timezone
+
+PARTITIONED_TABLE = """
+CREATE TABLE menu_dishprice (
+    id bigserial NOT NULL,
+    dish_id bigint NOT NULL REFERENCES menu_dish (id)
+        DEFERRABLE INITIALLY DEFERRED,
+    price numeric(5, 2) NOT NULL,
+    changed_at timestamp with time zone NOT NULL,
+    PRIMARY KEY (id, changed_at)
+) PARTITION BY RANGE (changed_at);
+CREATE INDEX menu_dishprice_dish_time_idx
+    ON menu_dishprice (dish_id, changed_at);
+CREATE TABLE menu_dishprice_default PARTITION OF menu_dishprice DEFAULT;
+"""
+
+
+def create_price_table(apps, schema_editor):
+    """Create the price history table, partitioned by month on PostgreSQL."""
+    DishPrice = apps.get_model('menu', 'DishPrice')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.create_model(DishPrice)
+        return
+
+    schema_editor.execute(PARTITIONED_TABLE)
+    month = timezone.now().date().replace(day=1)
+    for _i in range(4):
+        following = (month + timedelta(days=32)).replace(day=1)
+        schema_editor.execute(
+            f'CREATE TABLE menu_dishprice_{month:%Y_%m} '
+            f'PARTITION OF menu_dishprice '
+            f"FOR VALUES FROM ('{month} 00:00+00') "
+            f"TO ('{following} 00:00+00')")
+        month = following
+
+
+def drop_price_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('menu', 'DishPrice'))
+
+
+def record_current_prices(apps, schema_editor):
+    """Start the history of existing dishes at their current price."""
+    Dish = apps.get_model('menu', 'Dish')
+    DishPrice = apps.get_model('menu', 'DishPrice')
+    now = timezone.now()
+    DishPrice.objects.bulk_create([
+        DishPrice(dish_id=dish_id, price=price, changed_at=now)
+        for dish_id, price in Dish.objects.values_list('id', 'price')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0010_menu_stats'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.CreateModel(
+                name='DishPrice',
+                fields=[
+                    ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                    ('price', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Price')),
+                    ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Changed at')),
+                    ('dish', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prices', to='menu.dish')),
+                ],
+                options={
+                    'verbose_name': 'Dish price',
+                    'verbose_name_plural': 'Dish prices',
+                },
+            ),
+            migrations.AddIndex(
+                model_name='dishprice',
+                index=models.Index(fields=['dish', 'changed_at'], name='menu_dishprice_dish_time_idx'),
+            ),
+        ]),
+        migrations.RunPython(create_price_table, drop_price_table),
+        migrations.RunPython(
+            record_current_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.0.10 on 2026-10-19 16:07
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0011_dish_price_history'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='dish',
+            name='menu_dish_allergens_idx',
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(256)), name='menu_dish_celery_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(512)), name='menu_dish_gluten_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(1024)), name='menu_dish_crustaceans_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(2048)), name='menu_dish_eggs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(4096)), name='menu_dish_fish_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(8192)), name='menu_dish_lupin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(16384)), name='menu_dish_milk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(32768)), name='menu_dish_molluscs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(65536)), name='menu_dish_mustard_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(131072)), name='menu_dish_nuts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(262144)), name='menu_dish_peanuts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(524288)), name='menu_dish_sesame_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(1048576)), name='menu_dish_soybeans_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('flags'), '&', django.db.models.expressions.Value(2097152)), name='menu_dish_sulphites_idx'),
+        ),
+    ]
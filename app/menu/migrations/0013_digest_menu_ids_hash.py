@@ -0,0 +1,45 @@
+# Generated by Django 4.0.10 on 2026-10-19 16:40
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_menu_ids(apps, schema_editor):
+    """Store the hash of the menu ids of existing digests."""
+    Digest = apps.get_model('menu', 'Digest')
+    digests = list(Digest.objects.only('id', 'menu_ids'))
+    for digest in digests:
+        digest.menu_ids_hash = hashlib.md5(
+            digest.menu_ids.encode()).hexdigest()
+    Digest.objects.bulk_update(digests, ['menu_ids_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0012_dish_allergen_bit_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='digest',
+            name='menu_digest_variant_unique',
+        ),
+        migrations.AlterField(
+            model_name='digest',
+            name='menu_ids',
+            field=models.TextField(blank=True, verbose_name='Menu ids'),
+        ),
+        migrations.AddField(
+            model_name='digest',
+            name='menu_ids_hash',
+            field=models.CharField(default='', max_length=32, verbose_name='Menu ids hash'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(hash_menu_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='digest',
+            constraint=models.UniqueConstraint(fields=('date', 'frequency', 'vegetarian_only', 'menu_ids_hash'), name='menu_digest_variant_unique'),
+        ),
+    ]
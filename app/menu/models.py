@@ -1,12 +1,42 @@
 """
 Database models.
 """
+import enum
 import uuid
 import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
 
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    Sum,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import (
+    Coalesce,
+    Greatest,
+    Least,
+    TruncDay,
+    TruncWeek,
+)
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from core import outbox
+from menu import events
+
+POSITION_STEP = 1024
+
 
 def dish_image_file_path(instance, filename):
     """Generate file path for new dish image."""
@@ -16,36 +46,859 @@ def dish_image_file_path(instance, filename):
     return os.path.join('uploads', 'dish', filename)
 
 
+class DishFlag(enum.IntFlag):
+    """Dietary properties and allergens of a dish, bits of `Dish.flags`."""
+    VEGETARIAN = 1 << 0
+    VEGAN = 1 << 1
+    GLUTEN_FREE = 1 << 2
+    NUT_FREE = 1 << 3
+    # The 14 allergens of EU Regulation 1169/2011, Annex II.
+    CELERY = 1 << 8
+    GLUTEN = 1 << 9
+    CRUSTACEANS = 1 << 10
+    EGGS = 1 << 11
+    FISH = 1 << 12
+    LUPIN = 1 << 13
+    MILK = 1 << 14
+    MOLLUSCS = 1 << 15
+    MUSTARD = 1 << 16
+    NUTS = 1 << 17
+    PEANUTS = 1 << 18
+    SESAME = 1 << 19
+    SOYBEANS = 1 << 20
+    SULPHITES = 1 << 21
+
+
+DIETARY_FLAGS = [DishFlag.VEGETARIAN, DishFlag.VEGAN,
+                 DishFlag.GLUTEN_FREE, DishFlag.NUT_FREE]
+ALLERGEN_FLAGS = [flag for flag in DishFlag if flag not in DIETARY_FLAGS]
+DIETARY_MASK = sum(DIETARY_FLAGS)
+ALLERGEN_MASK = sum(ALLERGEN_FLAGS)
+
+
 class Dish(models.Model):
     title = models.CharField(_('Name'), max_length=255)
     description = models.TextField(_('Description'), blank=True)
     price = models.DecimalField(_('Price'), max_digits=5, decimal_places=2)
     time_minutes = models.IntegerField(_('Preparation time in min'))
     vegetarian = models.BooleanField(_('Is vegetarian'))
+    available = models.BooleanField(_('Is available'), default=True)
     created_date = models.DateField(_('Created'), auto_now_add=True)
     modified_date = models.DateField(_('Modified'), auto_now=True, blank=True)
     image = models.ImageField(null=True, blank=True,
                               upload_to=dish_image_file_path)
+    version = models.PositiveIntegerField(_('Version'), default=0)
+    flags = models.PositiveIntegerField(_('Dietary and allergen flags'),
+                                        default=0)
 
     class Meta:
         verbose_name = _("Dish")
         verbose_name_plural = _("Dishes")
+        indexes = [
+            # One index per allergen bit, "free of" filters test each bit
+            # so any set of allergens combines bitmap index scans.
+            *(models.Index(F('flags').bitand(int(flag)),
+                           name=f'menu_dish_{flag.name.lower()}_idx')
+              for flag in ALLERGEN_FLAGS),
+            models.Index(fields=['title'], name='menu_dish_title_idx'),
+            models.Index(fields=['price'], name='menu_dish_price_idx'),
+            models.Index(fields=['time_minutes', 'price'],
+                         name='menu_dish_time_price_idx'),
+            models.Index(fields=['price'], condition=Q(vegetarian=True),
+                         name='menu_dish_veg_price_idx'),
+            models.Index(fields=['created_date'],
+                         name='menu_dish_created_idx'),
+            models.Index(fields=['modified_date'],
+                         name='menu_dish_modified_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'price', 'time_minutes', 'vegetarian'} <= set(field_names):
+            # Loaded values, menu statistics are updated by difference.
+            instance._stats_values = MenuStats.dish_values(instance)
+
+        return instance
+
+    def save(self, *args, **kwargs):
+        # `vegetarian` stays a column for existing lookups, mirror its bit.
+        self._set_flags(
+            DishFlag.VEGETARIAN, DishFlag.VEGETARIAN if self.vegetarian else 0)
+        loaded = getattr(self, '_stats_values', None)
+        update_fields = kwargs.get('update_fields')
+        price_changed = (
+            (update_fields is None or 'price' in update_fields)
+            and (self._state.adding
+                 or (loaded is not None and loaded[0] != Decimal(self.price))))
+        super().save(*args, **kwargs)
+        if price_changed:
+            DishPrice.record([self])
+
+    def _set_flags(self, mask, value):
+        self.flags = (self.flags & ~mask) | (int(value) & mask)
+
+    @property
+    def dietary(self):
+        return DishFlag(self.flags & DIETARY_MASK)
+
+    @dietary.setter
+    def dietary(self, value):
+        self._set_flags(DIETARY_MASK, value)
+        self.vegetarian = bool(self.flags & DishFlag.VEGETARIAN)
+
+    @property
+    def allergens(self):
+        return DishFlag(self.flags & ALLERGEN_MASK)
+
+    @allergens.setter
+    def allergens(self, value):
+        self._set_flags(ALLERGEN_MASK, value)
+
+
+class DishPrice(models.Model):
+    """Append-only entry of the price history of a dish.
+
+    On PostgreSQL the table is partitioned by month of `changed_at`, see
+    `create_partitions`. Rows are never updated.
+    """
+    dish = models.ForeignKey(
+        Dish, on_delete=models.CASCADE, related_name='prices')
+    price = models.DecimalField(_('Price'), max_digits=5, decimal_places=2)
+    changed_at = models.DateTimeField(_('Changed at'), default=timezone.now)
+
+    class Meta:
+        verbose_name = _("Dish price")
+        verbose_name_plural = _("Dish prices")
+        indexes = [
+            models.Index(fields=['dish', 'changed_at'],
+                         name='menu_dishprice_dish_time_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.dish_id} {self.price} {self.changed_at}'
+
+    @classmethod
+    def record(cls, dishes):
+        """Append the current price of dishes."""
+        changed_at = timezone.now()
+        cls.objects.bulk_create([
+            cls(dish_id=dish.id, price=dish.price, changed_at=changed_at)
+            for dish in dishes
+        ])
+
+    @classmethod
+    def history(cls, dish_id, start, end, bucket):
+        """Return price at `start` and price points of buckets in range.
+
+        A point has the minimum, maximum and last price of a day or week
+        and its number of changes, aggregated in the database.
+        """
+        trunc = TruncWeek if bucket == 'week' else TruncDay
+        prices = cls.objects.filter(dish_id=dish_id)
+        initial = prices.filter(changed_at__lt=start).order_by(
+            '-changed_at').values_list('price', flat=True).first()
+        in_range = prices.filter(changed_at__gte=start, changed_at__lt=end)
+        # The last change of a bucket by time, ties broken by insert order.
+        closing = in_range.annotate(time=trunc('changed_at')).filter(
+            time=OuterRef('time')).order_by('-changed_at', '-id')
+        points = list(in_range.annotate(
+            time=trunc('changed_at')).values('time').annotate(
+            min_price=Min('price'),
+            max_price=Max('price'),
+            changes=Count('id'),
+            close_price=Subquery(closing.values('price')[:1]),
+        ).order_by('time'))
+
+        return initial, points
+
+    @classmethod
+    def create_partitions(cls, months_ahead):
+        """Create monthly partitions up to `months_ahead` months from now.
+
+        Rows outside existing partitions land in the default partition, so
+        partitions are created ahead of time. No-op on other databases.
+        """
+        if connection.vendor != 'postgresql':
+            return
+        table = cls._meta.db_table
+        month = timezone.now().date().replace(day=1)
+        with connection.cursor() as cursor:
+            for _i in range(months_ahead + 1):
+                following = (month + timedelta(days=32)).replace(day=1)
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS '
+                    f'{table}_{month:%Y_%m} PARTITION OF {table} '
+                    f"FOR VALUES FROM ('{month} 00:00+00') "
+                    f"TO ('{following} 00:00+00')")
+                month = following
+
+
+class MenuQuerySet(models.QuerySet):
+
+    def active_at(self, when):
+        """Return menus valid at `when` and, if scheduled, in a time slot.
+
+        Validity is [valid_from, valid_to), empty bounds are open. Menus
+        without schedules are active all day within their validity.
+        """
+        local = timezone.localtime(when)
+        schedules = MenuSchedule.objects.filter(menu=OuterRef('pk'))
+        in_slot = schedules.filter(
+            weekday=local.weekday(),
+            start_time__lte=local.time(),
+            end_time__gt=local.time(),
+        )
+
+        return self.filter(
+            Q(valid_from__isnull=True) | Q(valid_from__lte=when),
+            Q(valid_to__isnull=True) | Q(valid_to__gt=when),
+            ~Exists(schedules) | Exists(in_slot),
+        )
+
 
 class Menu(models.Model):
     """Menu object."""
     title = models.CharField(_('Menu name'), unique=True, max_length=255)
     description = models.TextField(_('Description'), blank=True)
-    dishes = models.ManyToManyField(Dish, verbose_name=_('Dish'))
+    dishes = models.ManyToManyField(Dish, verbose_name=_('Dish'),
+                                    through='MenuDish')
     created_date = models.DateField(_('Created'), auto_now_add=True)
     modified_date = models.DateField(_('Modified'), auto_now=True, blank=True)
+    valid_from = models.DateTimeField(_('Valid from'), null=True, blank=True)
+    valid_to = models.DateTimeField(_('Valid to'), null=True, blank=True)
+
+    objects = MenuQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Menu")
         verbose_name_plural = _("Menus")
+        indexes = [
+            models.Index(fields=['valid_from', 'valid_to'],
+                         name='menu_menu_validity_idx'),
+        ]
+
+    @staticmethod
+    def next_boundary(after):
+        """Return the first moment after `after` a menu can turn on or off.
+
+        None when no validity bound or schedule lies ahead.
+        """
+        bounds = Menu.objects.aggregate(
+            valid_from=Min('valid_from', filter=Q(valid_from__gt=after)),
+            valid_to=Min('valid_to', filter=Q(valid_to__gt=after)),
+        )
+        candidates = [bound for bound in bounds.values() if bound]
+
+        local = timezone.localtime(after)
+        slots = MenuSchedule.objects.order_by().values_list(
+            'weekday', 'start_time', 'end_time').distinct()
+        for weekday, start_time, end_time in slots:
+            days = (weekday - local.weekday()) % 7
+            for slot_time in (start_time, end_time):
+                for extra_days in (days, days + 7):
+                    day = local.date() + timedelta(days=extra_days)
+                    moment = timezone.make_aware(
+                        datetime.combine(day, slot_time), local.tzinfo)
+                    if moment > after:
+                        candidates.append(moment)
+                        break
+
+        return min(candidates, default=None)
 
     def __str__(self):
         return self.title
+
+    def ordered_dishes(self):
+        """Return dishes ordered by their position in the menu."""
+        return self.dishes.annotate(
+            position=F('menudish__position'),
+            section=F('menudish__section'),
+        ).order_by('menudish__position', 'menudish__id')
+
+    def append_dishes(self, dishes):
+        """Add dishes not yet in the menu at its end, in given order."""
+        links = MenuDish.objects.filter(menu=self)
+        existing = set(links.values_list('dish_id', flat=True))
+        last = links.aggregate(last=Max('position'))['last'] or 0
+        new_links = []
+        for dish in dishes:
+            if dish.id in existing:
+                continue
+            existing.add(dish.id)
+            last += POSITION_STEP
+            new_links.append(MenuDish(menu=self, dish=dish, position=last))
+        MenuDish.objects.bulk_create(new_links)
+        if new_links:
+            Change.record(Change.MENU, [self.id])
+            MenuStats.update_dishes([
+                (self.id, MenuStats.dish_values(link.dish), 1)
+                for link in new_links
+            ])
+
+    def set_dishes(self, dishes):
+        """Make dishes the dishes of the menu, in the given order.
+
+        Links of other dishes are deleted with one statement. When kept
+        dishes are already in that order and new ones follow them, new
+        dishes are appended and no kept link is written. Otherwise all
+        links are renumbered with one bulk update. The change is recorded
+        once, whatever the number of dishes.
+        """
+        dishes = list({dish.id: dish for dish in dishes}.values())
+        with transaction.atomic():
+            removed = MenuDish.objects.filter(menu=self).exclude(
+                dish_id__in=[dish.id for dish in dishes]).remove()
+            links = {link.dish_id: link
+                     for link in MenuDish.objects.filter(menu=self)}
+            kept = [links[dish.id] for dish in dishes if dish.id in links]
+            in_order = all(prev.position < link.position
+                           for prev, link in zip(kept, kept[1:]))
+            first_new = next((i for i, dish in enumerate(dishes)
+                              if dish.id not in links), len(dishes))
+            renumber = not in_order or len(kept) != first_new
+            last = max((link.position for link in links.values()), default=0)
+
+            new_links = []
+            for i, dish in enumerate(dishes, 1):
+                link = links.get(dish.id)
+                if link is None:
+                    link = MenuDish(menu=self, dish=dish,
+                                    position=last + i * POSITION_STEP)
+                    new_links.append(link)
+                if renumber:
+                    link.position = i * POSITION_STEP
+            if renumber:
+                MenuDish.objects.bulk_update(kept, ['position'])
+            MenuDish.objects.bulk_create(new_links)
+
+            if not removed and (new_links or renumber):
+                Change.record(Change.MENU, [self.id])
+            MenuStats.update_dishes([
+                (self.id, MenuStats.dish_values(link.dish), 1)
+                for link in new_links
+            ])
+
+    def place_dish(self, dish, after=None, before=None, section=None):
+        """Insert or move a dish, writing only its own link row.
+
+        The dish lands right after the dish with id `after`, right before
+        the dish with id `before`, or at the end of the menu.
+        """
+        rows = [
+            row for row in MenuDish.objects.filter(menu=self).order_by(
+                'position', 'id').values_list('dish_id', 'position')
+            if row[0] != dish.id
+        ]
+        position = self._free_position(rows, after, before)
+        if position is None:
+            self._renumber_dishes(rows)
+            rows = [(dish_id, (i + 1) * POSITION_STEP)
+                    for i, (dish_id, _pos) in enumerate(rows)]
+            position = self._free_position(rows, after, before)
+
+        defaults = {'position': position}
+        if section is not None:
+            defaults['section'] = section
+        link, _created = MenuDish.objects.update_or_create(
+            menu=self, dish=dish, defaults=defaults)
+
+        return link
+
+    def _free_position(self, rows, after, before):
+        """Return position for the gap, None when the gap is exhausted."""
+        ids = [dish_id for dish_id, _pos in rows]
+        anchor = after if after is not None else before
+        if anchor is not None and anchor not in ids:
+            raise ValueError(_('Dish %s is not in the menu.') % anchor)
+
+        if after is not None:
+            index = ids.index(after) + 1
+        elif before is not None:
+            index = ids.index(before)
+        else:
+            index = len(rows)
+
+        prev_pos = rows[index - 1][1] if index > 0 else None
+        next_pos = rows[index][1] if index < len(rows) else None
+        if prev_pos is None and next_pos is None:
+            return POSITION_STEP
+        if next_pos is None:
+            return prev_pos + POSITION_STEP
+        if prev_pos is None:
+            return next_pos - POSITION_STEP
+        if next_pos - prev_pos < 2:
+            return None
+
+        return (prev_pos + next_pos) // 2
+
+    def _renumber_dishes(self, rows):
+        """Spread positions evenly when a gap runs out."""
+        links = {link.dish_id: link
+                 for link in MenuDish.objects.filter(menu=self)}
+        for i, (dish_id, _pos) in enumerate(rows):
+            links[dish_id].position = (i + 1) * POSITION_STEP
+        MenuDish.objects.bulk_update(
+            [links[dish_id] for dish_id, _pos in rows], ['position'])
+        Change.record(Change.MENU, [self.id])
+
+    def clone(self, title, description=None, deep=False):
+        """Copy the menu with its dish links in a constant number of queries.
+
+        Links are copied with a single INSERT ... SELECT. With `deep`, dishes
+        are copied too, with one bulk insert for dishes and one for links.
+        """
+        with transaction.atomic():
+            menu = Menu.objects.create(
+                title=title,
+                description=(self.description if description is None
+                             else description),
+            )
+            if deep:
+                dishes = self._copy_dishes()
+                MenuDish.objects.bulk_create([
+                    MenuDish(menu=menu, dish=dish, position=link.position,
+                             section=link.section)
+                    for link, dish in dishes
+                ])
+                Change.record(Change.DISH, [dish.id for _link, dish in dishes])
+            else:
+                self._copy_links(menu)
+            MenuStats.copy(self.id, menu.id)
+
+        return menu
+
+    def _copy_links(self, menu):
+        """Insert dish links of this menu for another menu in one query."""
+        qn = connection.ops.quote_name
+        table = qn(MenuDish._meta.db_table)
+        copied = ', '.join(qn(column) for column in
+                           ('dish_id', 'position', 'section'))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({qn("menu_id")}, {copied}) '
+                f'SELECT %s, {copied} FROM {table} '
+                f'WHERE {qn("menu_id")} = %s',
+                [menu.id, self.id],
+            )
+
+    def _copy_dishes(self):
+        """Bulk insert copies of menu dishes, return (link, copy) pairs."""
+        links = list(MenuDish.objects.filter(menu=self).select_related(
+            'dish').order_by('position', 'id'))
+        copies = []
+        for link in links:
+            dish = link.dish
+            dish.pk = None
+            dish.version = 0
+            copies.append(dish)
+        Dish.objects.bulk_create(copies)
+        DishPrice.record(copies)
+
+        return list(zip(links, copies))
+
+    def remove_dish(self, dish_id):
+        """Remove a dish from the menu, return True if it was there."""
+        return bool(MenuDish.objects.filter(
+            menu=self, dish_id=dish_id).remove())
+
+
+class MenuSchedule(models.Model):
+    """Weekly time slot in which a menu is active."""
+    MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY = range(7)
+    WEEKDAY_CHOICES = [
+        (MONDAY, _('Monday')),
+        (TUESDAY, _('Tuesday')),
+        (WEDNESDAY, _('Wednesday')),
+        (THURSDAY, _('Thursday')),
+        (FRIDAY, _('Friday')),
+        (SATURDAY, _('Saturday')),
+        (SUNDAY, _('Sunday')),
+    ]
+
+    menu = models.ForeignKey(
+        Menu, on_delete=models.CASCADE, related_name='schedules')
+    weekday = models.PositiveSmallIntegerField(
+        _('Weekday'), choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField(_('Start time'))
+    end_time = models.TimeField(_('End time'))
+
+    class Meta:
+        verbose_name = _("Menu schedule")
+        verbose_name_plural = _("Menu schedules")
+        ordering = ['weekday', 'start_time']
+        indexes = [
+            models.Index(fields=['menu', 'weekday', 'start_time', 'end_time'],
+                         name='menu_schedule_slot_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=Q(end_time__gt=F('start_time')),
+                name='menu_schedule_end_after_start',
+            ),
+        ]
+
+    def __str__(self):
+        return (f'{self.get_weekday_display()} '
+                f'{self.start_time}-{self.end_time}')
+
+
+class MenuDishQuerySet(models.QuerySet):
+
+    def remove(self):
+        """Delete links with one statement, return their number.
+
+        delete() sends a signal per link, each recording a change and
+        updating statistics of its menu. Here every touched menu gets one
+        change and one statistics update, whatever the number of links.
+        """
+        with transaction.atomic():
+            rows = list(self.select_for_update(of=('self',)).values_list(
+                'id', 'menu_id',
+                'dish__price', 'dish__time_minutes', 'dish__vegetarian'))
+            if not rows:
+                return 0
+
+            qn = connection.ops.quote_name
+            placeholders = ', '.join(['%s'] * len(rows))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {qn(MenuDish._meta.db_table)} '
+                    f'WHERE {qn("id")} IN ({placeholders})',
+                    [row[0] for row in rows],
+                )
+            Change.record(
+                Change.MENU, sorted({menu_id for _id, menu_id, *_ in rows}))
+            MenuStats.update_dishes([
+                (menu_id, (Decimal(price), time_minutes, bool(vegetarian)), -1)
+                for _id, menu_id, price, time_minutes, vegetarian in rows
+            ])
+
+        return len(rows)
+
+
+class MenuDish(models.Model):
+    """Position and section of a dish within a menu."""
+    menu = models.ForeignKey(Menu, on_delete=models.CASCADE)
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE)
+    position = models.IntegerField(_('Position'), default=0)
+    section = models.CharField(_('Section'), max_length=255, blank=True)
+
+    objects = MenuDishQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Menu dish")
+        verbose_name_plural = _("Menu dishes")
+        unique_together = [['menu', 'dish']]
+        indexes = [
+            models.Index(fields=['menu', 'position'],
+                         name='menu_menudish_position_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.menu} - {self.dish}'
+
+
+class MenuStats(models.Model):
+    """Price and preparation time aggregates of the dishes of a menu.
+
+    Rows are updated by difference when dishes or menu links change, so
+    reading them costs the same however many dishes menus have.
+    `rebuild` recomputes them from scratch.
+    """
+    menu = models.OneToOneField(
+        Menu, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats')
+    dish_count = models.PositiveIntegerField(_('Dish count'), default=0)
+    price_sum = models.DecimalField(
+        _('Price sum'), max_digits=12, decimal_places=2, default=0)
+    min_price = models.DecimalField(
+        _('Min price'), max_digits=5, decimal_places=2, null=True)
+    max_price = models.DecimalField(
+        _('Max price'), max_digits=5, decimal_places=2, null=True)
+    time_minutes_sum = models.BigIntegerField(
+        _('Total preparation time in min'), default=0)
+    vegetarian_count = models.PositiveIntegerField(
+        _('Vegetarian dishes'), default=0)
+
+    class Meta:
+        verbose_name = _("Menu statistics")
+        verbose_name_plural = _("Menu statistics")
+
+    def __str__(self):
+        return f'{self.menu_id} ({self.dish_count} dishes)'
+
+    @property
+    def avg_price(self):
+        if not self.dish_count:
+            return None
+        return (self.price_sum / self.dish_count).quantize(Decimal('0.01'))
+
+    @property
+    def vegetarian_share(self):
+        if not self.dish_count:
+            return None
+        return round(self.vegetarian_count / self.dish_count, 4)
+
+    @staticmethod
+    def dish_values(dish):
+        """Return the values of a dish the statistics depend on."""
+        return Decimal(dish.price), dish.time_minutes, bool(dish.vegetarian)
+
+    @classmethod
+    def rebuild(cls, menu_ids=None):
+        """Recompute statistics of menus, all by default.
+
+        Return number of rebuilt rows.
+        """
+        menus = Menu.objects.order_by('id')
+        links = MenuDish.objects.order_by()
+        if menu_ids is not None:
+            menus = menus.filter(id__in=menu_ids)
+            links = links.filter(menu_id__in=menu_ids)
+        totals = {}
+        for row in links.values('menu_id').annotate(
+                dish_count=Count('id'),
+                price_sum=Sum('dish__price'),
+                min_price=Min('dish__price'),
+                max_price=Max('dish__price'),
+                time_minutes_sum=Sum('dish__time_minutes'),
+                vegetarian_count=Count('id', filter=Q(dish__vegetarian=True)),
+        ):
+            totals[row.pop('menu_id')] = row
+
+        with transaction.atomic():
+            cls.objects.filter(menu__in=menus).delete()
+            rows = cls.objects.bulk_create([
+                cls(menu_id=menu_id, **totals.get(menu_id, {}))
+                for menu_id in menus.values_list('id', flat=True)
+            ], batch_size=1000)
+
+        return len(rows)
+
+    @classmethod
+    def update_dishes(cls, changes):
+        """Apply added and removed dishes to statistics of their menus.
+
+        `changes` are (menu_id, dish values, sign) triples, sign is 1 for
+        a dish added to the menu and -1 for a removed one. Menus changed
+        the same way share one UPDATE. Minimum and maximum are recomputed
+        only for menus that lost a dish with an extreme price.
+        """
+        deltas = {}
+        for menu_id, (price, time_minutes, vegetarian), sign in changes:
+            delta = deltas.setdefault(menu_id, [0, 0, 0, 0, [], []])
+            delta[0] += sign
+            delta[1] += sign * price
+            delta[2] += sign * time_minutes
+            delta[3] += sign * vegetarian
+            delta[4 if sign > 0 else 5].append(price)
+
+        groups = defaultdict(list)
+        removed = {}
+        for menu_id, (count, price_sum, time_sum, vegetarian_count,
+                      added_prices, removed_prices) in deltas.items():
+            groups[(count, price_sum, time_sum, vegetarian_count,
+                    min(added_prices, default=None),
+                    max(added_prices, default=None))].append(menu_id)
+            if removed_prices:
+                removed[menu_id] = removed_prices
+
+        for (count, price_sum, time_sum, vegetarian_count,
+             low, high), menu_ids in groups.items():
+            fields = {
+                'dish_count': F('dish_count') + count,
+                'price_sum': F('price_sum') + price_sum,
+                'time_minutes_sum': F('time_minutes_sum') + time_sum,
+                'vegetarian_count': F('vegetarian_count') + vegetarian_count,
+            }
+            if low is not None:
+                low = Value(low, output_field=cls._meta.get_field(
+                    'min_price'))
+                high = Value(high, output_field=cls._meta.get_field(
+                    'max_price'))
+                fields['min_price'] = Least(Coalesce('min_price', low), low)
+                fields['max_price'] = Greatest(
+                    Coalesce('max_price', high), high)
+            cls.objects.filter(menu_id__in=menu_ids).update(**fields)
+
+        if removed:
+            stale = [
+                menu_id for menu_id, low, high in cls.objects.filter(
+                    menu_id__in=removed).values_list(
+                    'menu_id', 'min_price', 'max_price')
+                if any(low is None or price <= low or price >= high
+                       for price in removed[menu_id])
+            ]
+            if stale:
+                cls._refresh_extremes(stale)
+
+    @classmethod
+    def _refresh_extremes(cls, menu_ids):
+        """Recompute minimum and maximum prices of menus in one UPDATE."""
+        prices = MenuDish.objects.filter(
+            menu_id=OuterRef('menu_id')).order_by().values('menu_id')
+        cls.objects.filter(menu_id__in=menu_ids).update(
+            min_price=Subquery(prices.annotate(
+                price=Min('dish__price')).values('price')),
+            max_price=Subquery(prices.annotate(
+                price=Max('dish__price')).values('price')),
+        )
+
+    @classmethod
+    def copy(cls, source_id, target_id):
+        """Give a menu the statistics of a menu with the same dishes."""
+        stats = cls.objects.filter(menu_id=source_id).first()
+        if stats is None:
+            cls.rebuild([target_id])
+            return
+        stats.menu_id = target_id
+        stats.save()
+
+
+class DigestSubscription(models.Model):
+    """Preferences of a user opted in to the new dishes digest."""
+    DAILY = 'daily'
+    WEEKLY = 'weekly'
+    FREQUENCY_CHOICES = [(DAILY, _('Daily')), (WEEKLY, _('Weekly'))]
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='digest_subscription')
+    enabled = models.BooleanField(_('Enabled'), default=False)
+    frequency = models.CharField(
+        _('Frequency'), max_length=6, choices=FREQUENCY_CHOICES,
+        default=DAILY)
+    vegetarian_only = models.BooleanField(_('Vegetarian only'), default=False)
+    menus = models.ManyToManyField(
+        Menu, verbose_name=_('Menus'), blank=True,
+        related_name='digest_subscriptions')
+
+    class Meta:
+        verbose_name = _("Digest subscription")
+        verbose_name_plural = _("Digest subscriptions")
+        indexes = [
+            models.Index(fields=['frequency', 'vegetarian_only'],
+                         condition=Q(enabled=True),
+                         name='menu_digestsub_variant_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.frequency}'
+
+
+class Digest(models.Model):
+    """Rendered digest of one variant, shared by all its recipients.
+
+    A variant is the frequency, the vegetarian filter and the sorted,
+    comma separated ids of the menus dishes are limited to, looked up by
+    their MD5 hash.
+    """
+    date = models.DateField(_('Date'))
+    frequency = models.CharField(
+        _('Frequency'), max_length=6,
+        choices=DigestSubscription.FREQUENCY_CHOICES)
+    vegetarian_only = models.BooleanField(_('Vegetarian only'))
+    menu_ids = models.TextField(_('Menu ids'), blank=True)
+    menu_ids_hash = models.CharField(_('Menu ids hash'), max_length=32)
+    subject = models.CharField(_('Subject'), max_length=255)
+    body = models.TextField(_('Body'))
+    created = models.DateTimeField(_('Created'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Digest")
+        verbose_name_plural = _("Digests")
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'frequency', 'vegetarian_only',
+                        'menu_ids_hash'],
+                name='menu_digest_variant_unique'),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+    @property
+    def menus(self):
+        """Return ids of the menus dishes are limited to."""
+        return [int(menu_id)
+                for menu_id in self.menu_ids.split(',') if menu_id]
+
+
+class AccessStat(models.Model):
+    """Number of cached GET requests per absolute URI."""
+    uri = models.CharField(_('URI'), max_length=2048, unique=True)
+    hits = models.PositiveBigIntegerField(_('Hits'), default=0)
+    last_access = models.DateTimeField(_('Last access'), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Access statistic")
+        verbose_name_plural = _("Access statistics")
+        indexes = [
+            models.Index(fields=['-hits'], name='menu_accessstat_hits_idx'),
+        ]
+
+    def __str__(self):
+        return self.uri
+
+
+class Change(models.Model):
+    """Sequenced entry of the menu/dish change feed.
+
+    The id is the feed cursor. Deleted entries are tombstones.
+    """
+    MENU = 'menu'
+    DISH = 'dish'
+    KIND_CHOICES = [(MENU, _('Menu')), (DISH, _('Dish'))]
+
+    kind = models.CharField(_('Kind'), max_length=4, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField(_('Object id'))
+    deleted = models.BooleanField(_('Deleted'), default=False)
+    created = models.DateTimeField(_('Created'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Change")
+        verbose_name_plural = _("Changes")
+        indexes = [
+            models.Index(fields=['kind', 'object_id', 'id'],
+                         name='menu_change_object_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.id} {self.kind} {self.object_id}'
+
+    @classmethod
+    def record(cls, kind, object_ids, deleted=False):
+        """Append entries for changed objects and publish them.
+
+        Events go through the outbox in the same transaction and are
+        dispatched once right after it commits.
+        """
+        entries = cls.objects.bulk_create([
+            cls(kind=kind, object_id=object_id, deleted=deleted)
+            for object_id in object_ids
+        ])
+        if not entries:
+            return
+        outbox.enqueue_events(events.entry_events(entries))
+        outbox.schedule_event_dispatch()
+
+    @classmethod
+    def compact(cls, before):
+        """Keep only the newest entry per object among older entries.
+
+        Clients at any cursor still see the latest state of every
+        object changed after it. Return number of deleted entries.
+        """
+        newer = cls.objects.filter(
+            kind=OuterRef('kind'),
+            object_id=OuterRef('object_id'),
+            id__gt=OuterRef('id'),
+        )
+        deleted, _rows = cls.objects.filter(
+            created__lt=before).filter(Exists(newer)).delete()
+
+        return deleted
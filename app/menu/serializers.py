@@ -1,13 +1,66 @@
 """
 Serializers for menu API.
 """
-from rest_framework import serializers
+from collections import defaultdict
+from operator import methodcaller
 
-from menu.models import Menu, Dish
+from django.conf import settings
+from django.db import models, transaction
+from django.utils.timezone import localdate, now, timedelta
+from django.utils.translation import gettext as _
+from rest_framework import exceptions, serializers, status
+from rest_framework.settings import api_settings
+
+from menu.models import (
+    ALLERGEN_FLAGS,
+    DIETARY_FLAGS,
+    Change,
+    Digest,
+    DigestSubscription,
+    Dish,
+    DishFlag,
+    DishPrice,
+    Menu,
+    MenuDish,
+    MenuSchedule,
+    MenuStats,
+)
+
+
+class FlagsField(serializers.ListField):
+    """Flag names of a DishFlag group, stored as bits of `Dish.flags`."""
+    # Column read by ValuesListSerializer instead of the model property.
+    column = 'flags'
+
+    def __init__(self, flags, **kwargs):
+        self.flags = flags
+        kwargs['child'] = serializers.ChoiceField(
+            choices=[flag.name.lower() for flag in flags])
+        kwargs.setdefault('required', False)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return [flag.name.lower() for flag in self.flags if value & flag]
+
+    def to_internal_value(self, data):
+        value = DishFlag(0)
+        for name in super().to_internal_value(data):
+            value |= DishFlag[name.upper()]
+
+        return value
+
+
+class VersionConflict(exceptions.APIException):
+    """A dish was changed by another request since it was read."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The dish was changed by another request.'
+    default_code = 'version_conflict'
 
 
 class DishSerializer(serializers.ModelSerializer):
     """Serializer for dish."""
+    dietary = FlagsField(DIETARY_FLAGS)
+    allergens = FlagsField(ALLERGEN_FLAGS)
 
     class Meta():
         model = Dish
@@ -17,55 +70,384 @@ class DishSerializer(serializers.ModelSerializer):
                   'price',
                   'time_minutes',
                   'vegetarian',
+                  'dietary',
+                  'allergens',
+                  'available',
                   'image',
                   'created_date',
                   'modified_date',
+                  'version',
                   ]
         read_only_fields = ['id']
 
+    def validate(self, attrs):
+        dietary = attrs.get('dietary')
+        if 'vegetarian' in attrs and dietary is not None \
+                and attrs['vegetarian'] != bool(dietary & DishFlag.VEGETARIAN):
+            msg = _('vegetarian must match the vegetarian flag of dietary.')
+            raise serializers.ValidationError({'vegetarian': msg})
+
+        return attrs
+
+    def create(self, validated_data):
+        """Create a dish, new dishes start at version 0."""
+        validated_data.pop('version', None)
+
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        """Update a dish and bump its version.
+
+        The version is bumped with a conditional UPDATE matching the
+        version the client read, or the stored one when it sent none, so
+        an update of a stale copy fails and of two concurrent updates of
+        the same version only one succeeds.
+        """
+        version = validated_data.pop('version', instance.version)
+        with transaction.atomic():
+            bumped = Dish.objects.filter(
+                id=instance.id, version=version,
+            ).update(version=models.F('version') + 1)
+            if not bumped:
+                raise VersionConflict()
+            instance.version = version + 1
+            return super().update(instance, validated_data)
+
+
+class MenuDishIdsField(serializers.ManyRelatedField):
+    """Related dish ids of a menu, in menu order.
+
+    Prefetched dishes are used as they are, so prefetch them in menu order.
+    """
+
+    def get_attribute(self, instance):
+        if instance.pk is None:
+            return []
+        if 'dishes' in getattr(instance, '_prefetched_objects_cache', {}):
+            return instance.dishes.all()
+
+        return instance.ordered_dishes()
+
 
 class MenuSerializer(serializers.ModelSerializer):
     """Serializer for menu."""
-    dishes = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Dish.objects.all())
+    dishes = MenuDishIdsField(
+        child_relation=serializers.PrimaryKeyRelatedField(
+            queryset=Dish.objects.all()))
 
     class Meta:
         model = Menu
         fields = ['id', 'title', 'description', 'dishes',
-                  'created_date', 'modified_date']
+                  'created_date', 'modified_date', 'valid_from', 'valid_to']
         read_only_fields = ['id']
 
-    def _get_or_create_dishes(self, dishes, menu):
+    def validate(self, attrs):
+        valid_from = attrs.get(
+            'valid_from', getattr(self.instance, 'valid_from', None))
+        valid_to = attrs.get(
+            'valid_to', getattr(self.instance, 'valid_to', None))
+        if valid_from and valid_to and valid_to <= valid_from:
+            msg = _('valid_to must be later than valid_from.')
+            raise serializers.ValidationError({'valid_to': msg})
+
+        return attrs
+
+    def _get_or_create_dishes(self, dishes):
         """Handle getting or creating dishes as needed."""
+        dish_objs = []
         for dish in dishes:
-            dish_obj, created = Dish.objects.get_or_create(**dish)
-            menu.dishes.add(dish_obj)
+            if not isinstance(dish, Dish):
+                dish.pop('version', None)
+                flags = {name: dish.pop(name)
+                         for name in ('dietary', 'allergens') if name in dish}
+                dish, created = Dish.objects.get_or_create(
+                    defaults=flags, **dish)
+            dish_objs.append(dish)
+
+        return dish_objs
 
     def create(self, validated_data):
         """Create a menu."""
         dishes = validated_data.pop('dishes', [])
         menu = Menu.objects.create(**validated_data)
-        self._get_or_create_dishes(dishes, menu)
+        menu.append_dishes(self._get_or_create_dishes(dishes))
 
         return menu
 
     def update(self, instance, validated_data):
-        """Update a menu."""
+        """Update a menu, dishes take the order they are given in."""
         dishes = validated_data.pop('dishes', None)
-        if dishes is not None:
-            instance.dishes.clear()
-            self._get_or_create_dishes(dishes, instance)
+        with transaction.atomic():
+            if dishes is not None:
+                instance.set_dishes(self._get_or_create_dishes(dishes))
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
 
-        instance.save()
+            instance.save()
         return instance
 
 
+class PositionedDishListSerializer(serializers.ListSerializer):
+    """List serializer reading menu dishes in their menu order."""
+
+    def to_representation(self, data):
+        if isinstance(data, models.Manager) and hasattr(data, 'instance'):
+            data = data.instance.ordered_dishes()
+
+        return super().to_representation(data)
+
+
+class PositionedDishSerializer(DishSerializer):
+    """Serializer for dish with its position and section in a menu."""
+    position = serializers.IntegerField(read_only=True, default=None)
+    section = serializers.CharField(read_only=True, default='')
+
+    class Meta(DishSerializer.Meta):
+        fields = DishSerializer.Meta.fields + ['position', 'section']
+        list_serializer_class = PositionedDishListSerializer
+
+
+class MenuScheduleSerializer(serializers.ModelSerializer):
+    """Serializer for a weekly menu time slot."""
+
+    class Meta:
+        model = MenuSchedule
+        fields = ['weekday', 'start_time', 'end_time']
+
+    def validate(self, attrs):
+        if attrs['end_time'] <= attrs['start_time']:
+            msg = _('end_time must be later than start_time.')
+            raise serializers.ValidationError({'end_time': msg})
+
+        return attrs
+
+
 class MenuDetailSerializer(MenuSerializer):
     """Serializer for menu detail view."""
-    dishes = DishSerializer(many=True, required=False)
+    dishes = PositionedDishSerializer(many=True, required=False)
+    schedules = MenuScheduleSerializer(many=True, required=False)
+
+    class Meta(MenuSerializer.Meta):
+        fields = MenuSerializer.Meta.fields + ['schedules']
+
+    def _set_schedules(self, menu, schedules):
+        """Replace weekly time slots of a menu."""
+        MenuSchedule.objects.filter(menu=menu).delete()
+        MenuSchedule.objects.bulk_create(
+            MenuSchedule(menu=menu, **schedule) for schedule in schedules)
+
+    def create(self, validated_data):
+        """Create a menu with its schedules."""
+        schedules = validated_data.pop('schedules', [])
+        menu = super().create(validated_data)
+        self._set_schedules(menu, schedules)
+
+        return menu
+
+    def update(self, instance, validated_data):
+        """Update a menu, replacing schedules if given."""
+        schedules = validated_data.pop('schedules', None)
+        with transaction.atomic():
+            if schedules is not None:
+                self._set_schedules(instance, schedules)
+
+            return super().update(instance, validated_data)
+
+
+class MenuCloneSerializer(serializers.ModelSerializer):
+    """Serializer for cloning a menu."""
+    deep = serializers.BooleanField(write_only=True, default=False)
+
+    class Meta:
+        model = Menu
+        fields = ['title', 'description', 'deep']
+        extra_kwargs = {'description': {'required': False}}
+
+    def create(self, validated_data):
+        """Clone the menu passed to save()."""
+        menu = validated_data.pop('menu')
+
+        return menu.clone(**validated_data)
+
+
+class ValuesListSerializer:
+    """Read-only list serializer building rows from values_list() tuples.
+
+    Output is identical to `serializer_class(queryset, many=True).data`,
+    without model instantiation and per-field dispatch: a converter for
+    each field is picked once per list. Many-to-many fields are filled from
+    `related_ids()`.
+    """
+    serializer_class = None
+
+    def __init__(self, queryset, context=None):
+        self.queryset = queryset
+        self.context = context or {}
+
+    def related_ids(self, field_name, pks):
+        """Return mapping of pk to related ids for a many field.
+
+        Ids are read from the through table of the many-to-many model field
+        the serializer field is sourced from, in through row order.
+        Override for another order or for other kinds of relations.
+        """
+        field = self.serializer_class(context=self.context).fields[field_name]
+        model_field = self.queryset.model._meta.get_field(field.source)
+        from_name = model_field.m2m_field_name()
+        links = model_field.remote_field.through.objects.filter(
+            **{f'{from_name}__in': pks},
+        ).order_by(from_name, 'pk').values_list(
+            from_name, model_field.m2m_reverse_field_name())
+        related = defaultdict(list)
+        for pk, related_id in links:
+            related[pk].append(related_id)
+
+        return related
+
+    def _file_converter(self, field, model_field):
+        use_url = getattr(
+            field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+        storage = model_field.storage
+        request = self.context.get('request')
+
+        def convert(name):
+            if not name:
+                return None
+            if not use_url:
+                return name
+            url = storage.url(name)
+
+            return request.build_absolute_uri(url) if request else url
+
+        return convert
+
+    def _converter(self, field, model):
+        """Return a function turning a column value into its output."""
+        if isinstance(field, (serializers.IntegerField,
+                              serializers.BooleanField,
+                              serializers.CharField)):
+            return None
+        if isinstance(field, serializers.DecimalField):
+            coerce_to_string = getattr(
+                field, 'coerce_to_string',
+                api_settings.COERCE_DECIMAL_TO_STRING)
+            if coerce_to_string and not field.localize:
+                quantize = field.quantize
+                return lambda value: '{:f}'.format(quantize(value))
+        if isinstance(field, serializers.DateField):
+            output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+            if output_format and output_format.lower() == 'iso-8601':
+                return methodcaller('isoformat')
+        if isinstance(field, serializers.FileField):
+            return self._file_converter(
+                field, model._meta.get_field(field.source))
+
+        return field.to_representation
+
+    def _compile(self, model):
+        """Return value_list columns and (name, column, converter) plan."""
+        fields = self.serializer_class(context=self.context)._readable_fields
+        pk_name = model._meta.pk.attname
+        columns = [pk_name]
+        plan, many = [], []
+        for field in fields:
+            if isinstance(field, serializers.ManyRelatedField):
+                many.append(field.field_name)
+                plan.append([field.field_name, 0, None])
+                continue
+            source = getattr(field, 'column', field.source).replace('.', '__')
+            if source not in columns:
+                columns.append(source)
+            plan.append([field.field_name, columns.index(source),
+                         self._converter(field, model)])
+
+        return columns, plan, many
+
+    @property
+    def data(self):
+        columns, plan, many = self._compile(self.queryset.model)
+        rows = list(self.queryset.values_list(*columns))
+        if many:
+            pks = [row[0] for row in rows]
+            for entry in plan:
+                if entry[0] in many:
+                    related = self.related_ids(entry[0], pks)
+                    entry[2] = (
+                        lambda pk, related=related: related.get(pk, []))
+
+        result = []
+        for row in rows:
+            item = {}
+            for name, index, convert in plan:
+                value = row[index]
+                if value is not None and convert is not None:
+                    value = convert(value)
+                item[name] = value
+            result.append(item)
+
+        return result
+
+
+class DishValuesSerializer(ValuesListSerializer):
+    """Fast read-only list serializer for dishes."""
+    serializer_class = DishSerializer
+
+
+class MenuValuesSerializer(ValuesListSerializer):
+    """Fast read-only list serializer for menus."""
+    serializer_class = MenuSerializer
+
+    def related_ids(self, field_name, pks):
+        dish_ids = defaultdict(list)
+        links = MenuDish.objects.filter(menu_id__in=pks).order_by(
+            'menu_id', 'position', 'id').values_list('menu_id', 'dish_id')
+        for menu_id, dish_id in links:
+            dish_ids[menu_id].append(dish_id)
+
+        return dish_ids
+
+
+class MenuDishSerializer(serializers.ModelSerializer):
+    """Serializer for placing a dish within a menu."""
+    after = serializers.IntegerField(
+        write_only=True, required=False, allow_null=True)
+    before = serializers.IntegerField(
+        write_only=True, required=False, allow_null=True)
+
+    class Meta:
+        model = MenuDish
+        fields = ['dish', 'position', 'section', 'after', 'before']
+        read_only_fields = ['position']
+        extra_kwargs = {'section': {'required': False}}
+
+    def validate(self, attrs):
+        if attrs.get('after') is not None \
+                and attrs.get('before') is not None:
+            msg = _('Provide either after or before, not both.')
+            raise serializers.ValidationError(msg)
+
+        return attrs
+
+    def _place(self, menu, dish, validated_data):
+        try:
+            return menu.place_dish(
+                dish,
+                after=validated_data.get('after'),
+                before=validated_data.get('before'),
+                section=validated_data.get('section'),
+            )
+        except ValueError as exc:
+            raise serializers.ValidationError({'detail': str(exc)})
+
+    def create(self, validated_data):
+        """Insert a dish into a menu."""
+        return self._place(
+            validated_data['menu'], validated_data['dish'], validated_data)
+
+    def update(self, instance, validated_data):
+        """Move a dish within its menu."""
+        return self._place(instance.menu, instance.dish, validated_data)
 
 
 class DishImageSerializer(serializers.ModelSerializer):
@@ -76,3 +458,194 @@ class DishImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image']
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': 'True'}}
+
+
+class DishPriceItemSerializer(serializers.Serializer):
+    """Serializer for a single price/availability change."""
+    id = serializers.IntegerField()
+    price = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False)
+    available = serializers.BooleanField(required=False)
+    version = serializers.IntegerField(min_value=0)
+
+    def validate(self, attrs):
+        if 'price' not in attrs and 'available' not in attrs:
+            msg = _('Provide price or available.')
+            raise serializers.ValidationError(msg)
+
+        return attrs
+
+
+class DishBulkPriceSerializer(serializers.Serializer):
+    """Serializer for bulk price/availability update with version check."""
+    items = DishPriceItemSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        ids = [item['id'] for item in items]
+        if len(ids) != len(set(ids)):
+            msg = _('Each dish can appear only once.')
+            raise serializers.ValidationError(msg)
+
+        return items
+
+    def save(self):
+        """Apply changes whose version matches, report the rest."""
+        items = {item['id']: item for item in self.validated_data['items']}
+        updated, conflicts = [], []
+        today = localdate()
+
+        with transaction.atomic():
+            dishes = Dish.objects.select_for_update().filter(
+                id__in=items.keys()).order_by('id')
+            old_values = {}
+            for dish in dishes:
+                item = items.pop(dish.id)
+                if dish.version != item['version']:
+                    conflicts.append({'id': dish.id, 'version': dish.version})
+                    continue
+                old_values[dish.id] = MenuStats.dish_values(dish)
+                dish.price = item.get('price', dish.price)
+                dish.available = item.get('available', dish.available)
+                dish.version += 1
+                dish.modified_date = today
+                updated.append(dish)
+
+            # Rows are locked above, matching on the old version as well
+            # guards backends where select_for_update is a no-op.
+            unchanged = models.Q(pk__in=[])
+            for dish in updated:
+                unchanged |= models.Q(id=dish.id, version=dish.version - 1)
+            rows = Dish.objects.filter(unchanged).bulk_update(
+                updated, ['price', 'available', 'version', 'modified_date'])
+            if rows != len(updated):
+                raise VersionConflict()
+            Change.record(Change.DISH, [dish.id for dish in updated])
+            self._update_menu_stats(updated, old_values)
+            DishPrice.record([
+                dish for dish in updated
+                if dish.price != old_values[dish.id][0]
+            ])
+
+        return {
+            'updated': [
+                {'id': dish.id, 'version': dish.version} for dish in updated
+            ],
+            'conflicts': conflicts,
+            'not_found': sorted(items.keys()),
+        }
+
+    @staticmethod
+    def _update_menu_stats(dishes, old_values):
+        """Apply new prices to menu statistics, bulk_update sends no signal."""
+        new_values = {dish.id: MenuStats.dish_values(dish) for dish in dishes}
+        changed = [dish_id for dish_id, values in new_values.items()
+                   if values != old_values[dish_id]]
+        if not changed:
+            return
+        changes = []
+        for menu_id, dish_id in MenuDish.objects.filter(
+                dish_id__in=changed).values_list('menu_id', 'dish_id'):
+            changes.append((menu_id, old_values[dish_id], -1))
+            changes.append((menu_id, new_values[dish_id], 1))
+        MenuStats.update_dishes(changes)
+
+
+class MenuStatsSerializer(serializers.ModelSerializer):
+    """Serializer for price and preparation time statistics of a menu."""
+    id = serializers.IntegerField(source='menu_id', read_only=True)
+    title = serializers.CharField(source='menu.title', read_only=True)
+    avg_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True)
+    total_time_minutes = serializers.IntegerField(
+        source='time_minutes_sum', read_only=True)
+    vegetarian_share = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = MenuStats
+        fields = ['id', 'title', 'dish_count', 'min_price', 'max_price',
+                  'avg_price', 'total_time_minutes', 'vegetarian_share']
+        read_only_fields = fields
+
+
+class PriceHistoryQuerySerializer(serializers.Serializer):
+    """Serializer for price history query parameters."""
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    bucket = serializers.ChoiceField(choices=['day', 'week'], default='day')
+
+    def validate(self, attrs):
+        attrs['end'] = attrs.get('end') or now()
+        attrs['start'] = attrs.get('start') or attrs['end'] - timedelta(
+            days=settings.PRICE_HISTORY_DEFAULT_DAYS)
+        if attrs['start'] >= attrs['end']:
+            msg = _('Start must be before end.')
+            raise serializers.ValidationError(msg)
+
+        return attrs
+
+
+class PricePointSerializer(serializers.Serializer):
+    """Serializer for the prices of a dish within a bucket."""
+    time = serializers.DateTimeField()
+    min_price = serializers.DecimalField(max_digits=5, decimal_places=2)
+    max_price = serializers.DecimalField(max_digits=5, decimal_places=2)
+    close_price = serializers.DecimalField(max_digits=5, decimal_places=2)
+    changes = serializers.IntegerField()
+
+
+class PriceHistorySerializer(serializers.Serializer):
+    """Serializer for downsampled price history of a dish."""
+    dish = serializers.IntegerField()
+    bucket = serializers.CharField()
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    initial_price = serializers.DecimalField(
+        max_digits=5, decimal_places=2, allow_null=True)
+    points = PricePointSerializer(many=True)
+
+
+class ChangeFeedQuerySerializer(serializers.Serializer):
+    """Serializer for change feed query parameters."""
+    since = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=1000, default=500)
+
+
+class MenuChangesSerializer(serializers.Serializer):
+    """Serializer for changed menus."""
+    upserts = MenuSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+
+
+class DishChangesSerializer(serializers.Serializer):
+    """Serializer for changed dishes."""
+    upserts = DishSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+
+
+class ChangeFeedSerializer(serializers.Serializer):
+    """Serializer for a page of the change feed."""
+    cursor = serializers.IntegerField()
+    more = serializers.BooleanField()
+    menus = MenuChangesSerializer()
+    dishes = DishChangesSerializer()
+
+
+class DigestSubscriptionSerializer(serializers.ModelSerializer):
+    """Serializer for the digest preferences of a user."""
+
+    class Meta:
+        model = DigestSubscription
+        fields = ['enabled', 'frequency', 'vegetarian_only', 'menus']
+
+
+class DigestSerializer(serializers.ModelSerializer):
+    """Serializer for a stored digest."""
+    menus = serializers.ListField(
+        child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = Digest
+        fields = ['date', 'frequency', 'vegetarian_only', 'menus',
+                  'subject', 'body']
+        read_only_fields = fields
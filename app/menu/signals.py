@@ -0,0 +1,143 @@
+"""
+Signal handlers for the menu app.
+"""
+from django.core.signals import request_finished
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from menu import cache
+from menu.models import (
+    Change,
+    Dish,
+    Menu,
+    MenuDish,
+    MenuSchedule,
+    MenuStats,
+)
+
+
+@receiver(post_save, sender=Dish)
+@receiver(post_save, sender=Menu)
+@receiver(post_save, sender=MenuDish)
+@receiver(post_save, sender=MenuSchedule)
+@receiver(post_delete, sender=Dish)
+@receiver(post_delete, sender=Menu)
+@receiver(post_delete, sender=MenuDish)
+@receiver(post_delete, sender=MenuSchedule)
+@receiver(m2m_changed, sender=Menu.dishes.through)
+def invalidate_cached_responses(sender, **kwargs):
+    """Drop cached API responses when menus or dishes change."""
+    cache.invalidate()
+
+
+@receiver(request_finished)
+def flush_access_stats(sender, **kwargs):
+    """Write access statistics after the response, never while serving it."""
+    cache.flush_due_access_stats()
+
+
+@receiver(post_save, sender=Dish)
+@receiver(post_delete, sender=Dish)
+def record_dish_change(sender, instance, **kwargs):
+    """Append a dish entry to the change feed."""
+    deleted = kwargs['signal'] is post_delete
+    Change.record(Change.DISH, [instance.id], deleted=deleted)
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+def record_menu_change(sender, instance, **kwargs):
+    """Append a menu entry to the change feed."""
+    deleted = kwargs['signal'] is post_delete
+    Change.record(Change.MENU, [instance.id], deleted=deleted)
+
+
+@receiver(post_save, sender=MenuDish)
+@receiver(post_save, sender=MenuSchedule)
+@receiver(post_delete, sender=MenuDish)
+@receiver(post_delete, sender=MenuSchedule)
+def record_menu_dish_change(sender, instance, **kwargs):
+    """Append an entry for the menu whose dishes or schedules changed."""
+    Change.record(Change.MENU, [instance.menu_id])
+
+
+@receiver(m2m_changed, sender=Menu.dishes.through)
+def record_menu_dishes_change(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    """Append entries for menus whose dish set changed."""
+    if action == 'pre_clear' and reverse:
+        menu_ids = list(instance.menu_set.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove') and reverse:
+        menu_ids = pk_set
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        menu_ids = [instance.id]
+    else:
+        return
+    Change.record(Change.MENU, menu_ids)
+
+
+@receiver(post_save, sender=Menu)
+def create_menu_stats(sender, instance, created, **kwargs):
+    """Start statistics of a new menu at zero."""
+    if created:
+        MenuStats.objects.create(menu=instance)
+
+
+@receiver(post_save, sender=Dish)
+def update_menu_stats_of_dish(sender, instance, created, **kwargs):
+    """Apply the changed price, time or diet of a dish to its menus."""
+    old = getattr(instance, '_stats_values', None)
+    new = MenuStats.dish_values(instance)
+    instance._stats_values = new
+    if created or old == new:
+        return
+
+    menu_ids = list(MenuDish.objects.filter(
+        dish=instance).values_list('menu_id', flat=True))
+    if old is None:
+        MenuStats.rebuild(menu_ids)
+        return
+    MenuStats.update_dishes(
+        [(menu_id, old, -1) for menu_id in menu_ids]
+        + [(menu_id, new, 1) for menu_id in menu_ids])
+
+
+@receiver(post_save, sender=MenuDish)
+def add_to_menu_stats(sender, instance, created, **kwargs):
+    """Count a dish added to a menu."""
+    if created:
+        MenuStats.update_dishes(
+            [(instance.menu_id, MenuStats.dish_values(instance.dish), 1)])
+
+
+@receiver(post_delete, sender=MenuDish)
+def remove_from_menu_stats(sender, instance, **kwargs):
+    """Discount a dish removed from a menu."""
+    try:
+        values = MenuStats.dish_values(instance.dish)
+    except Dish.DoesNotExist:
+        MenuStats.rebuild([instance.menu_id])
+        return
+    MenuStats.update_dishes([(instance.menu_id, values, -1)])
+
+
+@receiver(m2m_changed, sender=Menu.dishes.through)
+def add_to_menu_stats_in_bulk(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    """Count dishes added through the many-to-many manager.
+
+    Removals through the manager delete links one by one and reach
+    `remove_from_menu_stats`. `MenuDish.objects.remove()` removes links
+    in bulk with one statistics update per menu.
+    """
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        values = MenuStats.dish_values(instance)
+        changes = [(menu_id, values, 1) for menu_id in pk_set]
+    else:
+        changes = [
+            (instance.id, MenuStats.dish_values(dish), 1)
+            for dish in Dish.objects.filter(id__in=pk_set)
+        ]
+    MenuStats.update_dishes(changes)
@@ -0,0 +1,96 @@
+"""
+Tests for the menu admin pages.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from menu.tests.creates import create_dish, create_menu
+
+
+class MenuAdminTests(TestCase):
+    """Test menu and dish admin pages stay cheap with many rows."""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123'
+        )
+        self.client.force_login(self.admin_user)
+        self.count = 0
+
+    def _add_rows(self, count):
+        dishes = [create_dish(title=f'Dish {self.count + i}')
+                  for i in range(count)]
+        menu = create_menu(title=f'Menu {self.count}')
+        menu.append_dishes(dishes[:3])
+        for i in range(count - 1):
+            create_menu(title=f'Menu {self.count} {i}')
+        self.count += count
+
+        return menu
+
+    def _queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 200)
+
+        return len(context)
+
+    def test_changelist_query_counts(self):
+        """Test changelists run the same queries for 5 and 60 rows."""
+        urls = [
+            (reverse('admin:menu_dish_changelist'), None),
+            (reverse('admin:menu_dish_changelist'), {'q': 'Dish'}),
+            (reverse('admin:menu_menu_changelist'), None),
+            (reverse('admin:menu_menu_changelist'), {'q': 'Menu'}),
+        ]
+        self._add_rows(5)
+        small = [self._queries(url, params) for url, params in urls]
+        self._add_rows(55)
+
+        self.assertEqual(
+            [self._queries(url, params) for url, params in urls], small)
+
+    def test_search_skips_full_count(self):
+        """Test searching does not count the whole table."""
+        self._add_rows(3)
+        url = reverse('admin:menu_dish_changelist')
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url, {'q': 'Dish 1'})
+
+        counts = [query['sql'] for query in context.captured_queries
+                  if 'COUNT(' in query['sql'].upper()]
+        self.assertEqual(len(counts), 1)
+
+    def test_menu_change_form_does_not_list_all_dishes(self):
+        """Test dish selection uses autocomplete instead of options."""
+        menu = self._add_rows(20)
+        url = reverse('admin:menu_menu_change', args=[menu.id])
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'admin-autocomplete')
+        self.assertNotContains(res, 'Dish 10')
+
+    def test_dish_autocomplete(self):
+        """Test the autocomplete view searches dishes by title."""
+        self._add_rows(3)
+        url = reverse('admin:autocomplete')
+        params = {
+            'term': 'Dish 2',
+            'app_label': 'menu',
+            'model_name': 'menudish',
+            'field_name': 'dish',
+        }
+
+        res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            [item['text'] for item in res.json()['results']], ['Dish 2'])
@@ -0,0 +1,156 @@
+"""
+Tests for the API response cache and cache warming.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from menu.cache import flush_access_stats, record_access
+from menu.models import AccessStat
+from menu.tests.creates import create_dish, create_menu
+
+DISHES_URL = reverse('menu:dish-list')
+
+
+def menu_detail_url(menu_id):
+    """Create and return a menu detail URL."""
+    return reverse('menu:menu-detail', args=[menu_id])
+
+
+class ResponseCacheTests(TestCase):
+    """Test caching of menu and dish responses."""
+
+    def setUp(self):
+        cache.clear()
+        flush_access_stats()
+        AccessStat.objects.all().delete()
+        self.client = APIClient()
+        self.menu = create_menu()
+        self.menu.append_dishes([create_dish(title='Soup')])
+
+    def test_cached_response_skips_database(self):
+        """Test a repeated GET is served without queries."""
+        url = menu_detail_url(self.menu.id)
+        first = self.client.get(url)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+
+    def test_model_change_invalidates_cache(self):
+        """Test saving a dish drops cached responses."""
+        self.client.get(DISHES_URL)
+
+        create_dish(title='Cake')
+        res = self.client.get(DISHES_URL)
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_api_write_invalidates_cache(self):
+        """Test a successful write through the API drops cached responses."""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.client.get(DISHES_URL)
+
+        self.client.force_authenticate(user=user)
+        self.client.post(DISHES_URL, {
+            'title': 'Cake', 'price': '3.00',
+            'time_minutes': 5, 'vegetarian': True,
+        })
+        self.client.force_authenticate(user=None)
+        res = self.client.get(DISHES_URL)
+
+        self.assertEqual(len(res.data), 2)
+
+
+class WarmCacheTests(TestCase):
+    """Test warming cache from access statistics."""
+
+    def setUp(self):
+        cache.clear()
+        flush_access_stats()
+        AccessStat.objects.all().delete()
+        self.client = APIClient()
+        self.menu = create_menu()
+        self.menu.append_dishes([create_dish(title='Soup')])
+
+    @override_settings(ACCESS_STATS_FLUSH_EVERY=2)
+    def test_access_stats_recorded(self):
+        """Test requests are counted per URI."""
+        url = menu_detail_url(self.menu.id)
+        self.client.get(url)
+        self.client.get(url)
+
+        stat = AccessStat.objects.get()
+        self.assertTrue(stat.uri.endswith(url))
+        self.assertEqual(stat.hits, 2)
+
+    @override_settings(ACCESS_STATS_FLUSH_EVERY=3)
+    def test_access_stats_normalized(self):
+        """Test parameters not changing the response share one entry."""
+        self.client.get(DISHES_URL, {'title': 'Soup', 'vegetarian': 'true'})
+        self.client.get(DISHES_URL, {'vegetarian': 'true', 'title': 'Soup'})
+        self.client.get(
+            DISHES_URL, {'title': 'Soup', 'vegetarian': 'true', 'x': '1'})
+
+        stat = AccessStat.objects.get()
+        self.assertTrue(
+            stat.uri.endswith(f'{DISHES_URL}?title=Soup&vegetarian=true'))
+        self.assertEqual(stat.hits, 3)
+
+    @override_settings(ACCESS_STATS_FLUSH_EVERY=1)
+    def test_access_stats_written_after_response(self):
+        """Test counting runs no queries, counts are written afterwards."""
+        url = menu_detail_url(self.menu.id)
+
+        with self.assertNumQueries(0):
+            record_access(f'http://testserver{url}')
+            record_access(f'http://testserver{url}')
+        self.client.get(url)
+
+        self.assertEqual(AccessStat.objects.get().hits, 3)
+
+    def test_flush_adds_to_existing_counts(self):
+        """Test flushing adds counts to rows written by other processes."""
+        record_access('http://testserver/api/menu/dishes/')
+        flush_access_stats()
+        record_access('http://testserver/api/menu/dishes/')
+        record_access('http://testserver/api/menu/dishes/')
+        record_access('http://testserver/api/menu/menus/')
+
+        with self.assertNumQueries(1):
+            flush_access_stats()
+
+        self.assertEqual(
+            dict(AccessStat.objects.values_list('uri', 'hits')), {
+                'http://testserver/api/menu/dishes/': 3,
+                'http://testserver/api/menu/menus/': 1,
+            })
+
+    def test_long_uri_not_recorded(self):
+        """Test URIs too long for the statistics table are skipped."""
+        self.client.get(DISHES_URL, {'title': 'x' * 2100})
+        flush_access_stats()
+
+        self.assertFalse(AccessStat.objects.exists())
+
+    def test_warm_cache_command(self):
+        """Test command primes most requested responses."""
+        url = menu_detail_url(self.menu.id)
+        self.client.get(url)
+        flush_access_stats()
+        cache.clear()
+
+        call_command('warm_cache', concurrency=1)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(AccessStat.objects.get().hits, 1)
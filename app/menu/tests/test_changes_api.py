@@ -0,0 +1,125 @@
+"""
+Tests for the menu change feed API.
+"""
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from menu.models import Change
+from menu.tests.creates import create_dish, create_menu
+
+CHANGES_URL = reverse('menu:change-list')
+
+
+@override_settings(CHANGE_FEED_SAFETY_SECONDS=0)
+class ChangeFeedApiTests(TestCase):
+    """Test the change feed."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _cursor(self):
+        return self.client.get(CHANGES_URL).data['cursor']
+
+    def test_feed_returns_upserts(self):
+        """Test created objects are returned as upserts."""
+        menu = create_menu()
+        dish = create_dish()
+        menu.dishes.add(dish)
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['menus']['upserts']], [menu.id])
+        self.assertEqual(res.data['menus']['upserts'][0]['dishes'], [dish.id])
+        self.assertEqual(
+            [item['id'] for item in res.data['dishes']['upserts']], [dish.id])
+        self.assertFalse(res.data['more'])
+
+    def test_feed_since_cursor(self):
+        """Test only objects changed after the cursor are returned."""
+        create_dish(title='Old')
+        cursor = self._cursor()
+        dish = create_dish(title='New')
+
+        res = self.client.get(CHANGES_URL, {'since': cursor})
+
+        self.assertEqual(
+            [item['title'] for item in res.data['dishes']['upserts']],
+            ['New'])
+        self.assertGreater(res.data['cursor'], cursor)
+
+        res = self.client.get(CHANGES_URL, {'since': res.data['cursor']})
+
+        self.assertEqual(res.data['dishes']['upserts'], [])
+        self.assertNotIn(dish.id, res.data['dishes']['deleted'])
+
+    def test_feed_returns_tombstones(self):
+        """Test deleted objects are returned as tombstones."""
+        menu = create_menu()
+        dish = create_dish()
+        menu.dishes.add(dish)
+        cursor = self._cursor()
+        dish_id = dish.id
+        dish.delete()
+
+        res = self.client.get(CHANGES_URL, {'since': cursor})
+
+        self.assertEqual(res.data['dishes']['deleted'], [dish_id])
+        self.assertEqual(res.data['dishes']['upserts'], [])
+        self.assertEqual(res.data['menus']['upserts'][0]['dishes'], [])
+
+    def test_feed_pagination(self):
+        """Test limit splits the feed into pages."""
+        for i in range(3):
+            create_dish(title=f'Dish {i}')
+
+        res = self.client.get(CHANGES_URL, {'limit': 2})
+
+        self.assertTrue(res.data['more'])
+        self.assertEqual(len(res.data['dishes']['upserts']), 2)
+
+    def test_compaction_keeps_latest_entry(self):
+        """Test compaction collapses entries to the latest per object."""
+        dish = create_dish()
+        dish.title = 'Renamed'
+        dish.save()
+        dish.save()
+        self.assertEqual(
+            Change.objects.filter(kind=Change.DISH).count(), 3)
+
+        call_command('compact_changes', days=-1)
+
+        entries = Change.objects.filter(kind=Change.DISH)
+        self.assertEqual(entries.count(), 1)
+        res = self.client.get(CHANGES_URL)
+        self.assertEqual(
+            res.data['dishes']['upserts'][0]['title'], 'Renamed')
+
+
+class ChangeFeedSafetyWindowTests(TestCase):
+    """Test recent entries are held back."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    @override_settings(CHANGE_FEED_SAFETY_SECONDS=60)
+    def test_recent_entries_held_back(self):
+        """Test the cursor does not pass entries inside the window."""
+        old = create_dish(title='Old')
+        Change.objects.update(
+            created=timezone.now() - timezone.timedelta(minutes=5))
+        create_dish(title='New')
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(
+            [item['id'] for item in res.data['dishes']['upserts']], [old.id])
+        self.assertEqual(
+            res.data['cursor'],
+            Change.objects.filter(object_id=old.id).latest('id').id)
@@ -0,0 +1,219 @@
+"""
+Tests for digest subscriptions and stored digests.
+"""
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import OutboxMessage
+from menu import digests
+from menu.models import Digest, DigestSubscription, Dish, MenuDish
+from menu.tests.creates import create_dish, create_menu
+
+SUBSCRIPTION_URL = reverse('menu:digest-subscription')
+
+# 2023-05-01 is a Monday.
+MONDAY = date(2023, 5, 1)
+
+
+def digest_url(day):
+    return reverse('menu:digest', args=[day.isoformat()])
+
+
+def subscribe(email, **params):
+    """Create a user with an enabled digest subscription."""
+    menus = params.pop('menus', [])
+    user = get_user_model().objects.create_user(email, 'testpass123')
+    subscription = DigestSubscription.objects.create(
+        user=user, enabled=True, **params)
+    subscription.menus.set(menus)
+
+    return user
+
+
+def queued_emails():
+    return {
+        message.payload['to'][0]: message.payload
+        for message in OutboxMessage.objects.filter(
+            kind=OutboxMessage.EMAIL)
+    }
+
+
+class SendDigestTests(TestCase):
+    """Test selecting subscribers and rendering digests per variant."""
+
+    def setUp(self):
+        self.soup = create_dish(title='Soup', vegetarian=True)
+        self.steak = create_dish(title='Steak')
+        self.old = create_dish(title='Old pie')
+        Dish.objects.update(created_date=MONDAY - timedelta(days=1),
+                            modified_date=MONDAY - timedelta(days=1))
+        Dish.objects.filter(id=self.old.id).update(
+            created_date=MONDAY - timedelta(days=5),
+            modified_date=MONDAY - timedelta(days=5))
+
+    def test_only_subscribers_receive_digest(self):
+        """Test users without an enabled subscription get no email."""
+        subscribe('sub@example.com')
+        get_user_model().objects.create_user('user@example.com', 'pass123')
+        disabled = subscribe('off@example.com')
+        disabled.digest_subscription.enabled = False
+        disabled.digest_subscription.save()
+        inactive = subscribe('gone@example.com')
+        inactive.is_active = False
+        inactive.save()
+
+        queued = digests.send_digests(MONDAY)
+
+        self.assertEqual(queued, 1)
+        self.assertEqual(list(queued_emails()), ['sub@example.com'])
+
+    def test_variant_rendered_once(self):
+        """Test recipients of a variant share one rendered digest."""
+        subscribe('a@example.com')
+        subscribe('b@example.com')
+        subscribe('veg@example.com', vegetarian_only=True)
+
+        with patch('menu.digests.render_to_string',
+                   wraps=digests.render_to_string) as render:
+            digests.send_digests(MONDAY)
+
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(Digest.objects.count(), 2)
+        emails = queued_emails()
+        self.assertEqual(emails['a@example.com']['body'],
+                         emails['b@example.com']['body'])
+        self.assertIn('Steak', emails['a@example.com']['body'])
+        self.assertIn('Soup', emails['veg@example.com']['body'])
+        self.assertNotIn('Steak', emails['veg@example.com']['body'])
+        self.assertNotIn('Old pie', emails['a@example.com']['body'])
+
+    def test_menu_filter(self):
+        """Test a digest limited to menus lists only their dishes."""
+        menu = create_menu(title='Lunch')
+        MenuDish.objects.create(menu=menu, dish=self.steak)
+        subscribe('lunch@example.com', menus=[menu])
+
+        digests.send_digests(MONDAY)
+
+        body = queued_emails()['lunch@example.com']['body']
+        self.assertIn('Steak', body)
+        self.assertNotIn('Soup', body)
+        self.assertEqual(
+            Digest.objects.exclude(menu_ids='').get().menus, [menu.id])
+
+    def test_many_menus(self):
+        """Test variants limited to many menus are stored and found."""
+        variant = (DigestSubscription.DAILY, False, tuple(range(1000, 1300)))
+
+        digest = digests.get_digest(MONDAY, variant)
+
+        self.assertEqual(digests.find_digest(MONDAY, variant), digest)
+        self.assertEqual(len(digest.menus), 300)
+
+    def test_weekly_digest_on_mondays(self):
+        """Test weekly subscribers get a digest of the week on Mondays."""
+        subscribe('weekly@example.com', frequency=DigestSubscription.WEEKLY)
+
+        digests.send_digests(MONDAY + timedelta(days=1))
+        self.assertEqual(queued_emails(), {})
+
+        digests.send_digests(MONDAY)
+        payload = queued_emails()['weekly@example.com']
+        self.assertEqual(payload['subject'],
+                         '24-04-2023 - 30-04-2023 menu update')
+        self.assertIn('Old pie', payload['body'])
+
+    def test_no_new_dishes(self):
+        """Test the digest says so when nothing changed."""
+        subscribe('sub@example.com')
+
+        digests.send_digests(MONDAY + timedelta(days=30))
+
+        self.assertIn('No new dishes',
+                      queued_emails()['sub@example.com']['body'])
+
+
+class DigestApiTests(TestCase):
+    """Test digest API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.today = timezone.localdate()
+        create_dish(title='Soup', vegetarian=True)
+        create_dish(title='Steak')
+        Dish.objects.update(created_date=self.today - timedelta(days=1))
+
+    def test_digest_stored_and_reused(self):
+        """Test the API serves the digest stored by the task."""
+        digests.send_digests(self.today)
+
+        res = self.client.get(digest_url(self.today))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Steak', res.data['body'])
+        digest = Digest.objects.get()
+        self.assertEqual(res.data['body'], digest.body)
+        self.assertEqual(res.data['frequency'], DigestSubscription.DAILY)
+
+        with self.assertNumQueries(1):
+            self.client.get(digest_url(self.today))
+
+    def test_digest_of_subscription_variant(self):
+        """Test a subscriber gets the digest variant of their preferences."""
+        user = subscribe('veg@example.com', vegetarian_only=True)
+        digests.send_digests(self.today)
+        self.client.force_authenticate(user=user)
+
+        res = self.client.get(digest_url(self.today))
+
+        self.assertTrue(res.data['vegetarian_only'])
+        self.assertIn('Soup', res.data['body'])
+        self.assertNotIn('Steak', res.data['body'])
+
+    def test_digest_not_rendered_on_request(self):
+        """Test digests the task did not store are not found or created."""
+        res = self.client.get(digest_url(self.today - timedelta(days=30)))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Digest.objects.exists())
+
+    def test_future_or_invalid_date(self):
+        """Test digests of future dates or invalid dates are not found."""
+        future = self.client.get(digest_url(self.today + timedelta(days=1)))
+        invalid = self.client.get(reverse('menu:digest', args=['2023-13-01']))
+
+        self.assertEqual(future.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(invalid.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_manage_subscription(self):
+        """Test opting in and setting digest preferences."""
+        user = get_user_model().objects.create_user('u@example.com', 'pass')
+        menu = create_menu(title='Lunch')
+        self.client.force_authenticate(user=user)
+
+        res = self.client.get(SUBSCRIPTION_URL)
+        self.assertFalse(res.data['enabled'])
+        self.assertFalse(DigestSubscription.objects.exists())
+
+        res = self.client.patch(SUBSCRIPTION_URL, {
+            'enabled': True, 'frequency': 'weekly', 'menus': [menu.id],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        subscription = user.digest_subscription
+        self.assertTrue(subscription.enabled)
+        self.assertEqual(subscription.frequency, DigestSubscription.WEEKLY)
+        self.assertEqual(list(subscription.menus.all()), [menu])
+
+    def test_subscription_requires_auth(self):
+        """Test managing a subscription requires authentication."""
+        res = self.client.get(SUBSCRIPTION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
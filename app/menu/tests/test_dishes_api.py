@@ -14,8 +14,8 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from menu.models import Dish
-from menu.serializers import DishSerializer
+from menu.models import Dish, DishFlag
+from menu.serializers import DishSerializer, VersionConflict
 from menu.tests.creates import create_dish
 
 DISHES_URL = reverse('menu:dish-list')
@@ -26,6 +26,9 @@ def detail_url(dish_id):
     return reverse('menu:dish-detail', args=[dish_id])
 
 
+BULK_PRICE_URL = reverse('menu:dish-bulk-price')
+
+
 def image_upload_url(dish_id):
     """Create and return an image upload URL."""
     return reverse('menu:dish-upload-image', args=[dish_id])
@@ -140,6 +143,172 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Dish.objects.all().exists())
 
+    def test_update_dish_bumps_version(self):
+        """Test updating a dish increments its version."""
+        dish = create_dish()
+
+        res = self.client.patch(detail_url(dish.id), {'title': 'New title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        dish.refresh_from_db()
+        self.assertEqual(dish.version, 1)
+        self.assertEqual(res.data['version'], 1)
+
+    def test_update_dish_concurrent_change(self):
+        """Test an update of a dish changed since it was read conflicts."""
+        dish = create_dish()
+        Dish.objects.filter(id=dish.id).update(version=1, title='Other')
+
+        serializer = DishSerializer(
+            dish, data={'title': 'New title'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with self.assertRaises(VersionConflict):
+            serializer.save()
+
+        dish.refresh_from_db()
+        self.assertEqual(dish.title, 'Other')
+        self.assertEqual(dish.version, 1)
+
+    def test_update_stale_version_conflicts(self):
+        """Test an update sent with an outdated version conflicts."""
+        dish = create_dish()
+        Dish.objects.filter(id=dish.id).update(version=1)
+
+        res = self.client.patch(
+            detail_url(dish.id), {'title': 'New title', 'version': 0})
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        dish.refresh_from_db()
+        self.assertEqual(dish.title, 'Some dish')
+
+        res = self.client.patch(
+            detail_url(dish.id), {'title': 'New title', 'version': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['version'], 2)
+
+    def test_create_dish_with_flags(self):
+        """Test dietary and allergen names are stored as bits."""
+        payload = {
+            'title': 'Pesto pasta',
+            'price': '9.00',
+            'time_minutes': 15,
+            'vegetarian': True,
+            'dietary': ['vegetarian', 'nut_free'],
+            'allergens': ['gluten', 'milk'],
+        }
+
+        res = self.client.post(DISHES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        dish = Dish.objects.get(id=res.data['id'])
+        self.assertEqual(
+            dish.flags,
+            DishFlag.VEGETARIAN | DishFlag.NUT_FREE
+            | DishFlag.GLUTEN | DishFlag.MILK)
+        self.assertTrue(dish.vegetarian)
+        self.assertEqual(res.data['dietary'], ['vegetarian', 'nut_free'])
+        self.assertEqual(res.data['allergens'], ['gluten', 'milk'])
+
+    def test_create_dish_contradictory_vegetarian(self):
+        """Test vegetarian contradicting dietary flags is rejected."""
+        payload = {
+            'title': 'Tofu bowl',
+            'price': '9.00',
+            'time_minutes': 15,
+            'vegetarian': True,
+            'dietary': ['vegan'],
+        }
+
+        res = self.client.post(DISHES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('vegetarian', res.data)
+        self.assertFalse(Dish.objects.exists())
+
+    def test_update_vegetarian_sets_flag(self):
+        """Test the vegetarian field keeps its flag in sync."""
+        dish = create_dish(allergens=DishFlag.EGGS)
+
+        res = self.client.patch(detail_url(dish.id), {'vegetarian': True})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['dietary'], ['vegetarian'])
+        self.assertEqual(res.data['allergens'], ['eggs'])
+
+
+class BulkPriceApiTests(TestCase):
+    """Tests for the bulk price/availability API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_auth_required(self):
+        """Test auth is required for bulk price update."""
+        self.client.force_authenticate(user=None)
+        res = self.client.patch(BULK_PRICE_URL, {'items': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_price_update(self):
+        """Test updating many dishes in one request."""
+        dish1 = create_dish(title='Soup')
+        dish2 = create_dish(title='Steak')
+        payload = {'items': [
+            {'id': dish1.id, 'price': '7.50', 'version': 0},
+            {'id': dish2.id, 'available': False, 'version': 0},
+        ]}
+
+        with self.assertNumQueries(8):
+            res = self.client.patch(BULK_PRICE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['conflicts'], [])
+        self.assertEqual(len(res.data['updated']), 2)
+        dish1.refresh_from_db()
+        dish2.refresh_from_db()
+        self.assertEqual(dish1.price, Decimal('7.50'))
+        self.assertEqual(dish1.version, 1)
+        self.assertFalse(dish2.available)
+        self.assertEqual(dish2.price, Decimal('5.00'))
+
+    def test_bulk_price_version_conflict(self):
+        """Test stale versions are reported and not applied."""
+        dish1 = create_dish(title='Soup')
+        dish2 = create_dish(title='Steak', version=3)
+        payload = {'items': [
+            {'id': dish1.id, 'price': '7.50', 'version': 0},
+            {'id': dish2.id, 'price': '9.00', 'version': 2},
+            {'id': dish2.id + 100, 'price': '1.00', 'version': 0},
+        ]}
+
+        res = self.client.patch(BULK_PRICE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], [{'id': dish1.id, 'version': 1}])
+        self.assertEqual(
+            res.data['conflicts'], [{'id': dish2.id, 'version': 3}])
+        self.assertEqual(res.data['not_found'], [dish2.id + 100])
+        dish2.refresh_from_db()
+        self.assertEqual(dish2.price, Decimal('5.00'))
+
+    def test_bulk_price_duplicate_ids(self):
+        """Test the same dish cannot be sent twice."""
+        dish = create_dish()
+        payload = {'items': [
+            {'id': dish.id, 'price': '7.50', 'version': 0},
+            {'id': dish.id, 'price': '8.50', 'version': 0},
+        ]}
+
+        res = self.client.patch(BULK_PRICE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class ImageUploadTests(TestCase):
     """Tests for the image upload API."""
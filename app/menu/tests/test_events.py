@@ -0,0 +1,159 @@
+"""
+Tests for the Server-Sent Events channel.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+
+from menu import events
+from menu.models import Change
+from menu.tests.creates import create_dish
+
+
+class FakeConnection:
+    """ASGI receive/send pair collecting sent body chunks."""
+
+    def __init__(self):
+        self.bodies = []
+        self.disconnected = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.body' and message['body']:
+            self.bodies.append(message['body'].decode())
+
+
+class RequestFirstConnection(FakeConnection):
+    """Connection sending the request body before disconnecting."""
+
+    def __init__(self):
+        super().__init__()
+        self.requested = False
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        return await super().receive()
+
+
+def scope(last_event_id=None):
+    headers = []
+    if last_event_id is not None:
+        headers.append((b'last-event-id', str(last_event_id).encode()))
+    return {'type': 'http', 'path': '/api/menu/events/', 'headers': headers}
+
+
+def event_ids(bodies):
+    return [json.loads(body.split('data: ')[1])['id']
+            for body in bodies if body.startswith('id:')]
+
+
+@override_settings(EVENTS_REDIS_URL=None)
+class EventStreamTests(TestCase):
+    """Test streaming change events."""
+
+    def _create_dishes(self):
+        """Create dishes, return cursor before the last two and their ids."""
+        create_dish(title='Old')
+        last_id = Change.objects.latest('id').id
+        create_dish(title='New')
+        create_dish(title='Newer')
+        expected = list(Change.objects.filter(
+            id__gt=last_id).values_list('id', flat=True))
+
+        return last_id, expected
+
+    async def _run(self, connection, scope, until):
+        task = asyncio.ensure_future(
+            events.sse_app(scope, connection.receive, connection.send))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if until():
+                break
+        connection.disconnected.set()
+        await asyncio.wait_for(task, 1)
+
+    async def test_live_events_are_streamed(self):
+        """Test published events reach connected clients."""
+        connection = FakeConnection()
+        entries = [Change(id=7, kind=Change.DISH, object_id=3)]
+
+        async def publish_later():
+            await asyncio.sleep(0.05)
+            events.publish(entries)
+        asyncio.ensure_future(publish_later())
+
+        await self._run(connection, scope(),
+                        lambda: event_ids(connection.bodies))
+
+        self.assertEqual(event_ids(connection.bodies), [7])
+        self.assertEqual(events.broadcaster._subscribers, set())
+
+    async def test_request_message_keeps_stream_open(self):
+        """Test the initial http.request message does not end the stream."""
+        connection = RequestFirstConnection()
+        entries = [Change(id=7, kind=Change.DISH, object_id=3)]
+
+        async def publish_later():
+            await asyncio.sleep(0.05)
+            events.publish(entries)
+        asyncio.ensure_future(publish_later())
+
+        await self._run(connection, scope(),
+                        lambda: event_ids(connection.bodies))
+
+        self.assertTrue(connection.requested)
+        self.assertEqual(event_ids(connection.bodies), [7])
+
+    async def test_replayed_events_deduplicated(self):
+        """Test replayed ids are skipped live, lower late ids are not."""
+        last_id, expected = await sync_to_async(self._create_dishes)()
+        connection = FakeConnection()
+        late = Change(id=last_id, kind=Change.DISH, object_id=3)
+        replayed = await sync_to_async(Change.objects.get)(id=expected[0])
+
+        async def publish_later():
+            await asyncio.sleep(0.05)
+            events.publish([replayed, late])
+        asyncio.ensure_future(publish_later())
+
+        await self._run(connection, scope(last_id),
+                        lambda: len(event_ids(connection.bodies)) == 3)
+
+        self.assertEqual(event_ids(connection.bodies), expected + [last_id])
+
+    async def test_resume_from_last_event_id(self):
+        """Test missed events are replayed after Last-Event-ID."""
+        last_id, expected = await sync_to_async(self._create_dishes)()
+        connection = FakeConnection()
+
+        await self._run(connection, scope(last_id),
+                        lambda: len(event_ids(connection.bodies)) == 2)
+
+        self.assertEqual(event_ids(connection.bodies), expected)
+
+    @override_settings(EVENTS_REPLAY_LIMIT=1)
+    async def test_reset_when_too_far_behind(self):
+        """Test clients too far behind are told to resync."""
+        await sync_to_async(self._create_dishes)()
+        connection = FakeConnection()
+
+        await self._run(connection, scope(0), lambda: True)
+
+        self.assertEqual(connection.bodies, ['event: reset\ndata: {}\n\n'])
+
+    @override_settings(EVENTS_HEARTBEAT_SECONDS=0.01)
+    async def test_heartbeat(self):
+        """Test idle streams send heartbeat comments."""
+        connection = FakeConnection()
+
+        await self._run(connection, scope(),
+                        lambda: connection.bodies)
+
+        self.assertEqual(connection.bodies[0], ': heartbeat\n\n')
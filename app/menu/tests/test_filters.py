@@ -1,12 +1,19 @@
+from decimal import Decimal
+from unittest import skipUnless
+
 from rest_framework.test import APITestCase, APIClient
 
+from django.db import connection, transaction
 from django.urls import reverse
 from django.utils.timezone import now, timedelta
 
+from menu.filters import DishFilter
+from menu.models import ALLERGEN_FLAGS, Dish, DishFlag
 from menu.serializers import MenuSerializer
 from menu.tests.creates import create_dish, create_menu
 
 MENU_URL = reverse('menu:menu-list')
+DISHES_URL = reverse('menu:dish-list')
 
 
 class MenuApiFilterTests(APITestCase):
@@ -126,3 +133,137 @@ class MenuApiFilterTests(APITestCase):
         self.assertEqual(res.data[0]['id'], self.menu3.id)
         self.assertEqual(res.data[1]['id'], self.menu1.id)
         self.assertEqual(res.data[2]['id'], self.menu2.id)
+
+
+class DishApiFilterTests(APITestCase):
+    """Test filtering and sorting dishes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.soup = create_dish(title='Tomato soup', price=Decimal('4.00'),
+                                time_minutes=15, vegetarian=True)
+        self.steak = create_dish(title='Steak', price=Decimal('19.00'),
+                                 time_minutes=25, vegetarian=False)
+        self.salad = create_dish(title='Salad', price=Decimal('7.00'),
+                                 time_minutes=5, vegetarian=True)
+        self.menu = create_menu()
+        self.menu.dishes.add(self.soup, self.steak)
+
+    def _titles(self, params):
+        res = self.client.get(DISHES_URL, params)
+        self.assertEqual(res.status_code, 200)
+        return [dish['title'] for dish in res.data]
+
+    def test_filter_vegetarian_under_price(self):
+        """Test filtering vegetarian dishes by price range."""
+        titles = self._titles({'vegetarian': 'true', 'price_max': '5.00'})
+
+        self.assertEqual(titles, ['Tomato soup'])
+
+    def test_filter_time_range(self):
+        """Test filtering dishes by preparation time."""
+        titles = self._titles({'time_min': 10, 'time_max': 20})
+
+        self.assertEqual(titles, ['Tomato soup'])
+
+    def test_filter_title_and_menu(self):
+        """Test filtering dishes by title and menu membership."""
+        self.assertEqual(self._titles({'title': 'SOUP'}), ['Tomato soup'])
+        self.assertEqual(
+            self._titles({'menu': self.menu.id}), ['Steak', 'Tomato soup'])
+
+    def test_filter_dates(self):
+        """Test filtering dishes by created date."""
+        tomorrow = (now() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+        self.assertEqual(self._titles({'created_from': tomorrow}), [])
+
+    def test_filter_flags(self):
+        """Test filtering by dietary flags and excluded allergens."""
+        self.soup.dietary = DishFlag.VEGETARIAN | DishFlag.VEGAN
+        self.soup.allergens = DishFlag.CELERY
+        self.soup.save()
+        self.salad.allergens = DishFlag.NUTS | DishFlag.MILK
+        self.salad.save()
+
+        self.assertEqual(
+            self._titles({'dietary': ['vegetarian', 'vegan']}),
+            ['Tomato soup'])
+        self.assertEqual(
+            self._titles({'dietary': 'vegetarian'}), ['Salad', 'Tomato soup'])
+        self.assertEqual(
+            self._titles({'allergen_free': ['nuts', 'celery']}), ['Steak'])
+        self.assertEqual(
+            self._titles({'allergen_free': 'milk'}), ['Steak', 'Tomato soup'])
+
+    def test_filter_unknown_flag(self):
+        """Test unknown flag names are rejected."""
+        res = self.client.get(DISHES_URL, {'allergen_free': 'chocolate'})
+
+        self.assertEqual(res.status_code, 400)
+
+    def test_ordering(self):
+        """Test sorting dishes by price and preparation time."""
+        self.assertEqual(
+            self._titles({'ordering': '-price'}),
+            ['Steak', 'Salad', 'Tomato soup'])
+        self.assertEqual(
+            self._titles({'ordering': 'time_minutes'}),
+            ['Salad', 'Tomato soup', 'Steak'])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN plans of PostgreSQL')
+class DishFilterIndexTests(APITestCase):
+    """Test common dish filters are answered from indexes."""
+
+    def setUp(self):
+        for i in range(50):
+            create_dish(title=f'Dish {i}', price=Decimal(i),
+                        time_minutes=i, vegetarian=i % 2 == 0)
+
+    def explain(self, queryset):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def assertUsesIndex(self, queryset, index_name):
+        self.assertIn(index_name, self.explain(queryset))
+
+    def test_vegetarian_price_uses_partial_index(self):
+        """Test vegetarian price filter uses the partial index."""
+        queryset = Dish.objects.filter(vegetarian=True, price__lte=10)
+
+        self.assertUsesIndex(queryset, 'menu_dish_veg_price_idx')
+
+    def test_price_ordering_uses_index(self):
+        """Test price range with price ordering uses the price index."""
+        queryset = Dish.objects.filter(
+            price__gte=5, price__lte=10).order_by('price')
+
+        self.assertUsesIndex(queryset, 'menu_dish_price_idx')
+
+    def test_time_range_uses_index(self):
+        """Test preparation time range uses the composite index."""
+        queryset = Dish.objects.filter(time_minutes__lte=10)
+
+        self.assertUsesIndex(queryset, 'menu_dish_time_price_idx')
+
+    def test_allergen_free_uses_bit_indexes(self):
+        """Test "free of" filters use the index of each allergen bit."""
+        for allergens in (['nuts'], ['milk', 'sesame'],
+                          [flag.name.lower() for flag in ALLERGEN_FLAGS]):
+            queryset = DishFilter(
+                {'allergen_free': allergens},
+                queryset=Dish.objects.all()).qs
+            plan = self.explain(queryset)
+
+            self.assertTrue(
+                any(f'menu_dish_{name}_idx' in plan for name in allergens),
+                plan)
+
+    def test_title_search_uses_trigram_index(self):
+        """Test case-insensitive title search uses the trigram index."""
+        queryset = Dish.objects.filter(title__icontains='dish 1')
+
+        self.assertUsesIndex(queryset, 'menu_dish_title_trgm_idx')
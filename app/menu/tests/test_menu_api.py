@@ -4,13 +4,15 @@ Tests for menu API.
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from menu.models import Menu, Dish
+from menu.models import Change, Menu, Dish, MenuDish, MenuStats
 
 from menu.serializers import MenuSerializer, MenuDetailSerializer
 
@@ -25,6 +27,21 @@ def detail_url(menu_id):
     return reverse('menu:menu-detail', args=[menu_id])
 
 
+def menu_dishes_url(menu_id):
+    """Create and return a URL for adding dishes to a menu."""
+    return reverse('menu:menu-add-dish', args=[menu_id])
+
+
+def clone_url(menu_id):
+    """Create and return a menu clone URL."""
+    return reverse('menu:menu-clone', args=[menu_id])
+
+
+def menu_dish_url(menu_id, dish_id):
+    """Create and return a URL for moving or removing a menu dish."""
+    return reverse('menu:menu-arrange-dish', args=[menu_id, dish_id])
+
+
 class PublicMenuApiTests(TestCase):
     """Test unauthenticated API requests."""
 
@@ -270,3 +287,219 @@ class PrivateMenuApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(menu.dishes.count(), 0)
+
+
+class MenuDishOrderingApiTests(TestCase):
+    """Test ordering dishes within a menu."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.menu = create_menu()
+        self.soup = create_dish(title='Soup')
+        self.steak = create_dish(title='Steak')
+        self.cake = create_dish(title='Cake')
+        self.menu.append_dishes([self.soup, self.steak, self.cake])
+
+    def _detail_titles(self):
+        res = self.client.get(detail_url(self.menu.id))
+        return [dish['title'] for dish in res.data['dishes']]
+
+    def test_detail_returns_dishes_in_position_order(self):
+        """Test menu detail lists dishes by position."""
+        res = self.client.get(detail_url(self.menu.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [dish['title'] for dish in res.data['dishes']],
+            ['Soup', 'Steak', 'Cake'],
+        )
+        positions = [dish['position'] for dish in res.data['dishes']]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_add_dish_before(self):
+        """Test inserting a dish before another one."""
+        salad = create_dish(title='Salad')
+        payload = {'dish': salad.id, 'before': self.soup.id,
+                   'section': 'Starters'}
+
+        res = self.client.post(menu_dishes_url(self.menu.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['section'], 'Starters')
+        self.assertEqual(
+            self._detail_titles(), ['Salad', 'Soup', 'Steak', 'Cake'])
+
+    def test_move_dish_writes_single_row(self):
+        """Test moving a dish updates only its own link."""
+        url = menu_dish_url(self.menu.id, self.cake.id)
+        other_positions = dict(MenuDish.objects.exclude(
+            dish=self.cake).values_list('dish_id', 'position'))
+
+        res = self.client.patch(url, {'after': self.soup.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._detail_titles(), ['Soup', 'Cake', 'Steak'])
+        self.assertEqual(other_positions, dict(MenuDish.objects.exclude(
+            dish=self.cake).values_list('dish_id', 'position')))
+
+    def test_move_dish_unknown_anchor(self):
+        """Test moving next to a dish outside the menu fails."""
+        other = create_dish(title='Other')
+        url = menu_dish_url(self.menu.id, self.cake.id)
+
+        res = self.client.patch(url, {'after': other.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_remove_dish(self):
+        """Test removing a dish from a menu."""
+        url = menu_dish_url(self.menu.id, self.steak.id)
+
+        res = self.client.delete(url)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._detail_titles(), ['Soup', 'Cake'])
+        self.assertTrue(Dish.objects.filter(id=self.steak.id).exists())
+
+        res = self.client.delete(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_keeps_positions_of_remaining_dishes(self):
+        """Test updating dishes does not rewrite kept links."""
+        soup_link = MenuDish.objects.get(menu=self.menu, dish=self.soup)
+        payload = {'dishes': [
+            {'title': 'Soup', 'price': Decimal('5.00'),
+             'time_minutes': 30, 'vegetarian': False},
+            {'title': 'Pie', 'price': Decimal('4.00'),
+             'time_minutes': 10, 'vegetarian': True},
+        ]}
+
+        res = self.client.patch(
+            detail_url(self.menu.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._detail_titles(), ['Soup', 'Pie'])
+        self.assertEqual(
+            MenuDish.objects.get(menu=self.menu, dish=self.soup).position,
+            soup_link.position,
+        )
+
+    def test_update_reorders_dishes(self):
+        """Test updating dishes puts them in the given order."""
+        payload = {'dishes': [
+            {'title': title, 'price': Decimal('5.00'),
+             'time_minutes': 30, 'vegetarian': False}
+            for title in ('Cake', 'Pie', 'Soup')
+        ]}
+
+        res = self.client.patch(
+            detail_url(self.menu.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [dish['title'] for dish in res.data['dishes']],
+            ['Cake', 'Pie', 'Soup'])
+        self.assertEqual(self._detail_titles(), ['Cake', 'Pie', 'Soup'])
+
+    def test_update_removes_dishes_in_constant_queries(self):
+        """Test removing many dishes runs as many queries as removing one."""
+        def update_queries(menu):
+            payload = {'dishes': [
+                {'title': title, 'price': Decimal('5.00'),
+                 'time_minutes': 30, 'vegetarian': False}
+                for title in ('Soup', 'Steak')
+            ]}
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.patch(
+                    detail_url(menu.id), payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len(context)
+
+        big = create_menu(title='Big')
+        big.append_dishes([self.soup, self.steak] + [
+            create_dish(title=f'Dish {i}') for i in range(18)])
+        changes = Change.objects.count()
+
+        self.assertEqual(update_queries(self.menu), update_queries(big))
+        self.assertEqual(Change.objects.count() - changes, 4)
+        self.assertEqual(MenuStats.objects.get(menu=big).dish_count, 2)
+
+
+class MenuCloneApiTests(TestCase):
+    """Test cloning menus."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.menu = create_menu(title='Summer', description='Light food')
+        self.soup = create_dish(title='Soup')
+        self.cake = create_dish(title='Cake')
+        self.menu.append_dishes([self.soup, self.cake])
+        self.menu.place_dish(self.cake, before=self.soup.id, section='Sweet')
+
+    def test_clone_menu_links_same_dishes(self):
+        """Test clone copies the menu and its dish order and sections."""
+        res = self.client.post(clone_url(self.menu.id), {'title': 'Autumn'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        clone = Menu.objects.get(title='Autumn')
+        self.assertEqual(res.data['id'], clone.id)
+        self.assertEqual(clone.description, 'Light food')
+        self.assertEqual(
+            [(dish['id'], dish['section']) for dish in res.data['dishes']],
+            [(self.cake.id, 'Sweet'), (self.soup.id, '')])
+        self.assertEqual(Dish.objects.count(), 2)
+
+    def test_deep_clone_copies_dishes(self):
+        """Test deep clone links copies of the dishes."""
+        payload = {'title': 'Autumn', 'description': 'Warm', 'deep': True}
+
+        res = self.client.post(clone_url(self.menu.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['description'], 'Warm')
+        self.assertEqual(
+            [dish['title'] for dish in res.data['dishes']], ['Cake', 'Soup'])
+        self.assertNotIn(self.soup.id,
+                         [dish['id'] for dish in res.data['dishes']])
+        self.assertEqual(Dish.objects.count(), 4)
+
+    def test_clone_query_count_independent_of_size(self):
+        """Test cloning runs a constant number of queries."""
+        def clone_queries(menu, deep):
+            with CaptureQueriesContext(connection) as context:
+                menu.clone(title=f'{menu.title} {deep}', deep=deep)
+            return len(context)
+
+        big = create_menu(title='Big')
+        big.append_dishes(
+            [create_dish(title=f'Dish {i}') for i in range(20)])
+
+        for deep in (False, True):
+            self.assertEqual(
+                clone_queries(self.menu, deep), clone_queries(big, deep))
+
+    def test_clone_duplicate_title(self):
+        """Test cloning to an existing title fails."""
+        res = self.client.post(clone_url(self.menu.id), {'title': 'Summer'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Menu.objects.count(), 1)
+
+    def test_clone_auth_required(self):
+        """Test cloning requires authentication."""
+        self.client.force_authenticate(user=None)
+
+        res = self.client.post(clone_url(self.menu.id), {'title': 'Autumn'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
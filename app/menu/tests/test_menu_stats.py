@@ -0,0 +1,215 @@
+"""
+Tests for incrementally maintained menu statistics.
+"""
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from menu.models import Dish, Menu, MenuDish, MenuStats
+from menu.tests.creates import create_dish, create_menu
+
+ANALYTICS_URL = reverse('menu:menu-analytics-list')
+STATS_FIELDS = ['dish_count', 'price_sum', 'min_price', 'max_price',
+                'time_minutes_sum', 'vegetarian_count']
+
+
+def analytics_url(menu_id):
+    """Create and return a menu analytics URL."""
+    return reverse('menu:menu-analytics', args=[menu_id])
+
+
+def stats_rows():
+    return {
+        row['menu_id']: row
+        for row in MenuStats.objects.values('menu_id', *STATS_FIELDS)
+    }
+
+
+class MenuStatsTests(TestCase):
+    """Test statistics stay equal to a full rebuild after writes."""
+
+    def setUp(self):
+        self.menu = create_menu(title='Lunch')
+        self.soup = create_dish(title='Soup', price=Decimal('4.00'),
+                                time_minutes=10, vegetarian=True)
+        self.steak = create_dish(title='Steak', price=Decimal('20.00'),
+                                 time_minutes=25)
+        self.cake = create_dish(title='Cake', price=Decimal('6.50'),
+                                time_minutes=40, vegetarian=True)
+
+    def assertMatchesRebuild(self):
+        incremental = stats_rows()
+        MenuStats.rebuild()
+        self.assertEqual(incremental, stats_rows())
+
+    def test_new_menu_starts_empty(self):
+        """Test a new menu gets empty statistics."""
+        stats = self.menu.stats
+
+        self.assertEqual(stats.dish_count, 0)
+        self.assertIsNone(stats.min_price)
+        self.assertIsNone(stats.avg_price)
+
+    def test_links_added_and_removed(self):
+        """Test adding and removing dishes keeps statistics exact."""
+        self.menu.dishes.add(self.soup, self.steak)
+        MenuDish.objects.create(menu=self.menu, dish=self.cake)
+        self.menu.refresh_from_db()
+
+        stats = MenuStats.objects.get(menu=self.menu)
+        self.assertEqual(stats.dish_count, 3)
+        self.assertEqual(stats.min_price, Decimal('4.00'))
+        self.assertEqual(stats.max_price, Decimal('20.00'))
+        self.assertEqual(stats.avg_price, Decimal('10.17'))
+        self.assertEqual(stats.time_minutes_sum, 75)
+        self.assertEqual(stats.vegetarian_share, 0.6667)
+        self.assertMatchesRebuild()
+
+        self.menu.remove_dish(self.steak.id)
+        self.assertEqual(
+            MenuStats.objects.get(menu=self.menu).max_price, Decimal('6.50'))
+        self.assertMatchesRebuild()
+
+        self.menu.dishes.clear()
+        self.assertMatchesRebuild()
+
+    def test_bulk_removal(self):
+        """Test removing many links updates each menu once."""
+        other = create_menu(title='Dinner')
+        self.menu.dishes.add(self.soup, self.steak, self.cake, *[
+            create_dish(title=f'Dish {i}', price=Decimal('9.00'))
+            for i in range(10)])
+        other.dishes.add(self.soup, self.steak)
+
+        with self.assertNumQueries(10):
+            removed = MenuDish.objects.exclude(dish=self.cake).remove()
+
+        self.assertEqual(removed, 14)
+        stats = MenuStats.objects.get(menu=self.menu)
+        self.assertEqual(stats.dish_count, 1)
+        self.assertEqual(stats.min_price, Decimal('6.50'))
+        self.assertEqual(stats.max_price, Decimal('6.50'))
+        self.assertMatchesRebuild()
+
+    def test_dish_changes(self):
+        """Test price, time and diet changes of a dish reach its menus."""
+        other = create_menu(title='Dinner')
+        self.menu.dishes.add(self.soup, self.steak)
+        other.dishes.add(self.steak, self.cake)
+
+        self.steak.price = Decimal('2.00')
+        self.steak.vegetarian = True
+        self.steak.save()
+        self.assertEqual(
+            MenuStats.objects.get(menu=other).min_price, Decimal('2.00'))
+        self.assertMatchesRebuild()
+
+        steak = Dish.objects.get(id=self.steak.id)
+        steak.price = Decimal('30.00')
+        steak.save()
+        self.assertMatchesRebuild()
+
+        self.cake.delete()
+        self.assertMatchesRebuild()
+
+    def test_unchanged_dish_save(self):
+        """Test saving a dish without relevant changes skips statistics."""
+        self.menu.dishes.add(self.soup)
+        soup = Dish.objects.get(id=self.soup.id)
+        soup.title = 'Tomato soup'
+
+        with self.assertNumQueries(3):
+            soup.save()
+
+    def test_api_writes(self):
+        """Test menu and dish API writes keep statistics exact."""
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'))
+
+        res = client.post(reverse('menu:menu-list'), {
+            'title': 'Brunch',
+            'dishes': [{'title': 'Eggs', 'price': '8.00',
+                        'time_minutes': 15, 'vegetarian': True}],
+        }, format='json')
+        menu_id = res.data['id']
+        client.post(reverse('menu:menu-add-dish', args=[menu_id]),
+                    {'dish': self.steak.id})
+        client.patch(reverse('menu:dish-bulk-price'), {'items': [
+            {'id': self.steak.id, 'price': '1.00', 'version': 0},
+        ]}, format='json')
+        client.post(reverse('menu:menu-clone', args=[menu_id]),
+                    {'title': 'Brunch copy', 'deep': True})
+
+        self.assertEqual(Menu.objects.get(title='Brunch copy').stats.min_price,
+                         Decimal('1.00'))
+        self.assertMatchesRebuild()
+
+    def test_rebuild_command(self):
+        """Test the command repairs statistics."""
+        self.menu.dishes.add(self.soup)
+        MenuStats.objects.update(dish_count=0, price_sum=0)
+        out = StringIO()
+
+        call_command('rebuild_menu_stats', stdout=out)
+
+        self.assertEqual(MenuStats.objects.get(
+            menu=self.menu).dish_count, 1)
+        self.assertIn('Rebuilt statistics of 1 menus.', out.getvalue())
+
+
+class MenuAnalyticsApiTests(TestCase):
+    """Test menu analytics API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.lunch = create_menu(title='Lunch')
+        self.dinner = create_menu(title='Dinner')
+        self.lunch.dishes.add(
+            create_dish(title='Soup', price=Decimal('4.00'), vegetarian=True),
+            create_dish(title='Steak', price=Decimal('20.00')),
+        )
+
+    def test_menu_analytics(self):
+        """Test statistics of one menu."""
+        res = self.client.get(analytics_url(self.lunch.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['dish_count'], 2)
+        self.assertEqual(res.data['min_price'], '4.00')
+        self.assertEqual(res.data['max_price'], '20.00')
+        self.assertEqual(res.data['avg_price'], '12.00')
+        self.assertEqual(res.data['total_time_minutes'], 60)
+        self.assertEqual(res.data['vegetarian_share'], 0.5)
+
+    def test_menu_analytics_not_found(self):
+        """Test statistics of a missing menu."""
+        res = self.client.get(analytics_url(0))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_analytics_list(self):
+        """Test statistics of all menus, empty ones included."""
+        res = self.client.get(ANALYTICS_URL)
+
+        self.assertEqual([row['title'] for row in res.data],
+                         ['Dinner', 'Lunch'])
+        self.assertEqual(res.data[0]['dish_count'], 0)
+        self.assertIsNone(res.data[0]['avg_price'])
+
+    def test_analytics_list_filtered(self):
+        """Test statistics of menus matching the menu filters."""
+        res = self.client.get(ANALYTICS_URL, {'title': 'Lun'})
+
+        self.assertEqual([row['id'] for row in res.data], [self.lunch.id])
+
+    def test_analytics_list_independent_of_dishes(self):
+        """Test the list reads statistics, not dishes."""
+        with self.assertNumQueries(1):
+            self.client.get(ANALYTICS_URL)
@@ -7,7 +7,8 @@ from unittest.mock import patch
 
 from django.test import TestCase
 
-from menu.models import Menu, Dish, dish_image_file_path
+from menu.models import Menu, Dish, MenuDish, dish_image_file_path
+from menu.tests.creates import create_dish, create_menu
 
 
 class ModelTest(TestCase):
@@ -40,3 +41,19 @@ class ModelTest(TestCase):
         file_path = dish_image_file_path(None, 'example.jpg')
 
         self.assertEqual(file_path, f'uploads/dish/{uuid}.jpg')
+
+    def test_place_dish_renumbers_when_gap_exhausted(self):
+        """Test placing a dish spreads positions when there is no gap."""
+        menu = create_menu()
+        first = create_dish(title='First')
+        second = create_dish(title='Second')
+        new = create_dish(title='New')
+        MenuDish.objects.create(menu=menu, dish=first, position=1)
+        MenuDish.objects.create(menu=menu, dish=second, position=2)
+
+        menu.place_dish(new, after=first.id)
+
+        self.assertEqual(
+            [dish.title for dish in menu.ordered_dishes()],
+            ['First', 'New', 'Second'],
+        )
@@ -0,0 +1,201 @@
+"""
+Tests for dish price history.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from menu.models import Dish, DishPrice
+from menu.tests.creates import create_dish
+
+
+def history_url(dish_id):
+    """Create and return a dish price history URL."""
+    return reverse('menu:dish-price-history', args=[dish_id])
+
+
+def local(*args):
+    """Return an aware datetime in the current time zone."""
+    return timezone.make_aware(datetime(*args))
+
+
+class PriceHistoryModelTests(TestCase):
+    """Test recording and downsampling price history."""
+
+    def setUp(self):
+        self.dish = create_dish(title='Soup', price=Decimal('4.00'))
+
+    def prices(self):
+        return list(DishPrice.objects.filter(dish=self.dish).order_by(
+            'id').values_list('price', flat=True))
+
+    def test_price_changes_recorded(self):
+        """Test new dishes and price changes append to the history."""
+        dish = Dish.objects.get(id=self.dish.id)
+        dish.title = 'Tomato soup'
+        dish.save()
+        dish.price = Decimal('4.50')
+        dish.save()
+
+        self.assertEqual(self.prices(), [Decimal('4.00'), Decimal('4.50')])
+
+    def test_bulk_price_recorded(self):
+        """Test bulk price updates append to the history."""
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'))
+
+        client.patch(reverse('menu:dish-bulk-price'), {'items': [
+            {'id': self.dish.id, 'price': '5.00', 'version': 0},
+        ]}, format='json')
+
+        self.assertEqual(self.prices(), [Decimal('4.00'), Decimal('5.00')])
+
+    def test_daily_buckets(self):
+        """Test changes are summarized per day."""
+        DishPrice.objects.all().delete()
+        for when, price in [
+            (local(2023, 4, 30, 12), '3.00'),
+            (local(2023, 5, 1, 9), '4.00'),
+            (local(2023, 5, 1, 15), '6.00'),
+            (local(2023, 5, 1, 18), '5.00'),
+            (local(2023, 5, 3, 10), '5.50'),
+        ]:
+            DishPrice.objects.create(
+                dish=self.dish, price=Decimal(price), changed_at=when)
+
+        initial, points = DishPrice.history(
+            self.dish.id, local(2023, 5, 1), local(2023, 5, 8), 'day')
+
+        self.assertEqual(initial, Decimal('3.00'))
+        self.assertEqual(points, [
+            {'time': local(2023, 5, 1), 'min_price': Decimal('4.00'),
+             'max_price': Decimal('6.00'), 'close_price': Decimal('5.00'),
+             'changes': 3},
+            {'time': local(2023, 5, 3), 'min_price': Decimal('5.50'),
+             'max_price': Decimal('5.50'), 'close_price': Decimal('5.50'),
+             'changes': 1},
+        ])
+
+    def test_backdated_change_not_closing(self):
+        """Test the closing price is the latest by time, not by id."""
+        DishPrice.objects.all().delete()
+        for when, price in [
+            (local(2023, 5, 1, 18), '5.00'),
+            (local(2023, 5, 1, 9), '4.00'),
+        ]:
+            DishPrice.objects.create(
+                dish=self.dish, price=Decimal(price), changed_at=when)
+
+        _initial, points = DishPrice.history(
+            self.dish.id, local(2023, 5, 1), local(2023, 5, 8), 'day')
+
+        self.assertEqual(points[0]['close_price'], Decimal('5.00'))
+
+    def test_unchanged_price_not_recorded(self):
+        """Test saving a dish without a loaded price change records none."""
+        DishPrice.objects.all().delete()
+        dish = Dish.objects.only('id', 'title').get(id=self.dish.id)
+        dish.title = 'Renamed'
+        dish.save()
+
+        self.assertEqual(self.prices(), [])
+
+    def test_weekly_buckets(self):
+        """Test changes are summarized per week starting on Monday."""
+        DishPrice.objects.all().delete()
+        for when, price in [
+            (local(2023, 5, 1, 9), '4.00'),
+            (local(2023, 5, 7, 9), '6.00'),
+            (local(2023, 5, 8, 9), '5.00'),
+        ]:
+            DishPrice.objects.create(
+                dish=self.dish, price=Decimal(price), changed_at=when)
+
+        initial, points = DishPrice.history(
+            self.dish.id, local(2023, 5, 1), local(2023, 5, 15), 'week')
+
+        self.assertIsNone(initial)
+        self.assertEqual([(p['time'], p['close_price'], p['changes'])
+                          for p in points], [
+            (local(2023, 5, 1), Decimal('6.00'), 2),
+            (local(2023, 5, 8), Decimal('5.00'), 1),
+        ])
+
+
+class PriceHistoryApiTests(TestCase):
+    """Test price history API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.dish = create_dish(title='Soup', price=Decimal('4.00'))
+
+    def test_default_range(self):
+        """Test recent history in daily buckets by default."""
+        res = self.client.get(history_url(self.dish.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['bucket'], 'day')
+        self.assertIsNone(res.data['initial_price'])
+        self.assertEqual(len(res.data['points']), 1)
+        self.assertEqual(res.data['points'][0]['close_price'], '4.00')
+
+    def test_range_and_bucket(self):
+        """Test requesting a range in weekly buckets."""
+        end = timezone.now() + timedelta(days=1)
+        start = end - timedelta(days=30)
+
+        res = self.client.get(history_url(self.dish.id), {
+            'start': start.isoformat(), 'end': end.isoformat(),
+            'bucket': 'week',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['bucket'], 'week')
+        self.assertEqual(res.data['points'][0]['changes'], 1)
+
+    def test_invalid_query(self):
+        """Test an inverted range or unknown bucket is rejected."""
+        now = timezone.now()
+        inverted = self.client.get(history_url(self.dish.id), {
+            'start': now.isoformat(),
+            'end': (now - timedelta(days=1)).isoformat(),
+        })
+        bucket = self.client.get(
+            history_url(self.dish.id), {'bucket': 'hour'})
+
+        self.assertEqual(inverted.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(bucket.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_dish(self):
+        """Test history of a missing dish is not found."""
+        res = self.client.get(history_url(0))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL partitioning')
+class PricePartitionTests(TestCase):
+    """Test the price history table is partitioned by month."""
+
+    def test_partitions_created_ahead(self):
+        """Test monthly partitions exist for the coming months."""
+        DishPrice.create_partitions(2)
+        month = timezone.now().date().replace(day=1)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'menu_dishprice'::regclass")
+            partitions = {row[0] for row in cursor.fetchall()}
+
+        self.assertIn(f'menu_dishprice_{month:%Y_%m}', partitions)
+        self.assertIn('menu_dishprice_default', partitions)
@@ -0,0 +1,161 @@
+"""
+Tests for menu validity windows and weekly schedules.
+"""
+from datetime import datetime, time, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from menu.models import Menu, MenuSchedule
+from menu.tests.creates import create_dish, create_menu
+from menu.views import MenuViewSet
+
+MENU_URL = reverse('menu:menu-list')
+
+
+def local(*args):
+    """Return an aware datetime in the current time zone."""
+    return timezone.make_aware(datetime(*args))
+
+
+# 2023-05-01 is a Monday.
+MONDAY_NOON = local(2023, 5, 1, 12, 0)
+
+
+class MenuScheduleModelTests(TestCase):
+    """Test active menu lookup and schedule boundaries."""
+
+    def setUp(self):
+        self.always = create_menu(title='Always')
+        self.spring = create_menu(
+            title='Spring', valid_from=local(2023, 3, 21),
+            valid_to=local(2023, 6, 21))
+        self.lunch = create_menu(title='Lunch')
+        MenuSchedule.objects.create(
+            menu=self.lunch, weekday=MenuSchedule.MONDAY,
+            start_time=time(11), end_time=time(15))
+
+    def _active(self, when):
+        return set(Menu.objects.active_at(when).values_list(
+            'title', flat=True))
+
+    def test_active_at(self):
+        """Test validity window and time slots are applied."""
+        self.assertEqual(
+            self._active(MONDAY_NOON), {'Always', 'Spring', 'Lunch'})
+        self.assertEqual(
+            self._active(local(2023, 5, 1, 15, 0)), {'Always', 'Spring'})
+        self.assertEqual(
+            self._active(local(2023, 5, 2, 12, 0)), {'Always', 'Spring'})
+        self.assertEqual(
+            self._active(local(2023, 6, 21)), {'Always'})
+
+    def test_next_boundary(self):
+        """Test the nearest upcoming bound or slot edge is returned."""
+        self.assertEqual(
+            Menu.next_boundary(MONDAY_NOON), local(2023, 5, 1, 15, 0))
+        self.assertEqual(
+            Menu.next_boundary(local(2023, 5, 1, 15, 0)),
+            local(2023, 5, 8, 11, 0))
+        self.assertEqual(
+            Menu.next_boundary(local(2023, 6, 20, 12, 0)),
+            local(2023, 6, 21))
+
+    def test_no_boundary(self):
+        """Test None is returned for menus without schedules or bounds."""
+        Menu.objects.exclude(pk=self.always.pk).delete()
+
+        self.assertIsNone(Menu.next_boundary(MONDAY_NOON))
+
+
+class MenuScheduleApiTests(TestCase):
+    """Test scheduling menus through the API."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123')
+        self.client.force_authenticate(user=user)
+        self.dish = create_dish()
+
+    def _create_menu(self, **params):
+        menu = create_menu(**params)
+        menu.append_dishes([self.dish])
+        return menu
+
+    def test_active_filter(self):
+        """Test filtering menus active now or at a given time."""
+        self._create_menu(title='Current')
+        self._create_menu(
+            title='Expired', valid_from=timezone.now() - timedelta(days=2),
+            valid_to=timezone.now() - timedelta(days=1))
+        breakfast = self._create_menu(title='Breakfast')
+        MenuSchedule.objects.create(
+            menu=breakfast, weekday=MenuSchedule.MONDAY,
+            start_time=time(7), end_time=time(10))
+
+        res = self.client.get(MENU_URL, {'active': 'true'})
+        titles = {menu['title'] for menu in res.data}
+        self.assertIn('Current', titles)
+        self.assertNotIn('Expired', titles)
+
+        res = self.client.get(MENU_URL, {'active': 'false'})
+        self.assertIn('Expired', {menu['title'] for menu in res.data})
+
+        res = self.client.get(
+            MENU_URL, {'active_at': local(2023, 5, 1, 8, 0).isoformat()})
+        self.assertEqual(
+            {menu['title'] for menu in res.data}, {'Current', 'Breakfast'})
+
+    def test_create_menu_with_schedules(self):
+        """Test schedules are written with the menu."""
+        payload = {
+            'title': 'Lunch',
+            'valid_from': '2023-05-01T00:00:00+02:00',
+            'schedules': [
+                {'weekday': 0, 'start_time': '11:00', 'end_time': '15:00'},
+                {'weekday': 4, 'start_time': '11:00', 'end_time': '16:00'},
+            ],
+        }
+
+        res = self.client.post(MENU_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        menu = Menu.objects.get(title='Lunch')
+        self.assertEqual(menu.schedules.count(), 2)
+        self.assertEqual(res.data['schedules'][1]['end_time'], '16:00:00')
+
+    def test_invalid_windows_rejected(self):
+        """Test empty validity windows and slots are rejected."""
+        payloads = [
+            {'title': 'A', 'valid_from': '2023-05-02T00:00:00Z',
+             'valid_to': '2023-05-01T00:00:00Z'},
+            {'title': 'B', 'schedules': [
+                {'weekday': 0, 'start_time': '15:00', 'end_time': '11:00'}]},
+        ]
+        for payload in payloads:
+            res = self.client.post(MENU_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cache_expires_at_next_boundary(self):
+        """Test cached menu responses expire when a menu turns on or off."""
+        self._create_menu(
+            title='Ending', valid_to=timezone.now() + timedelta(seconds=30))
+
+        timeout = MenuViewSet().get_cache_timeout()
+
+        self.assertIn(timeout, range(29, 32))
+        with patch('menu.cache.cache.set') as mock_set:
+            self.client.get(MENU_URL)
+        timeouts = [args[2] for args, _kwargs in mock_set.call_args_list
+                    if args[0].startswith('menu:response:')]
+        self.assertTrue(timeouts)
+        self.assertLessEqual(max(timeouts), 31)
@@ -0,0 +1,112 @@
+"""
+Contract tests for values() based list serializers.
+"""
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from menu import serializers
+from menu.models import Dish, DishFlag, Menu
+from menu.tests.creates import create_dish, create_menu
+
+DISHES_URL = reverse('menu:dish-list')
+MENUS_URL = reverse('menu:menu-list')
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class ValuesSerializerContractTests(TestCase):
+    """Test values() serializers produce the ModelSerializer output."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.context = {'request': APIRequestFactory().get(DISHES_URL)}
+        self.soup = create_dish(title='Soup', price=Decimal('4.5'),
+                                description='', vegetarian=True)
+        self.steak = create_dish(title='Steak', price=Decimal('29.99'),
+                                 description='Żeberka', time_minutes=45)
+        self.steak.image = 'uploads/dish/steak.jpg'
+        self.steak.dietary = DishFlag.GLUTEN_FREE
+        self.steak.allergens = DishFlag.MUSTARD | DishFlag.SULPHITES
+        self.steak.save()
+        self.pie = create_dish(title='Pie', available=False)
+        self.menu = create_menu(title='Lunch')
+        self.menu.append_dishes([self.soup, self.steak, self.pie])
+        self.menu.place_dish(self.pie, before=self.soup.id)
+        create_menu(title='Empty')
+
+    def test_dish_output_identical(self):
+        """Test dish rows match DishSerializer byte for byte."""
+        for context in ({}, self.context):
+            queryset = Dish.objects.order_by('title')
+
+            self.assertEqual(
+                render(serializers.DishValuesSerializer(
+                    queryset, context=context).data),
+                render(serializers.DishSerializer(
+                    queryset, many=True, context=context).data))
+
+    def test_menu_output_identical(self):
+        """Test menu rows match MenuSerializer, dishes in menu order."""
+        queryset = Menu.objects.order_by('title')
+
+        data = serializers.MenuValuesSerializer(queryset).data
+
+        self.assertEqual(
+            render(data),
+            render(serializers.MenuSerializer(queryset, many=True).data))
+        self.assertEqual(data[1]['dishes'],
+                         [self.pie.id, self.soup.id, self.steak.id])
+        self.assertEqual(data[0]['dishes'], [])
+
+    def test_default_related_ids(self):
+        """Test many fields default to through table order."""
+        class MenuRowsSerializer(serializers.ValuesListSerializer):
+            serializer_class = serializers.MenuSerializer
+
+        data = MenuRowsSerializer(Menu.objects.order_by('title')).data
+
+        self.assertEqual(data[1]['dishes'],
+                         [self.soup.id, self.steak.id, self.pie.id])
+        self.assertEqual(data[0]['dishes'], [])
+
+    def test_api_lists_identical(self):
+        """Test list endpoints return the same bytes on both paths."""
+        urls = [
+            DISHES_URL,
+            f'{DISHES_URL}?ordering=-price&vegetarian=false',
+            MENUS_URL,
+            f'{MENUS_URL}?ordering=-dish_count',
+        ]
+        for url in urls:
+            cache.clear()
+            fast = self.client.get(url)
+            cache.clear()
+            with override_settings(FAST_READ_SERIALIZERS=False):
+                slow = self.client.get(url)
+
+            self.assertEqual(fast.status_code, 200)
+            self.assertEqual(fast.content, slow.content, url)
+
+    def test_menu_list_query_count(self):
+        """Test menu list needs one query for menus and one for dishes."""
+        with self.assertNumQueries(2):
+            serializers.MenuValuesSerializer(Menu.objects.all()).data
+
+    def test_benchmark_command(self):
+        """Test benchmark compares both serializers on the same rows."""
+        out = StringIO()
+
+        call_command('benchmark_serializers', rows=20, repeat=1, stdout=out)
+
+        self.assertEqual(out.getvalue().count('identical: yes'), 2)
+        self.assertFalse(Dish.objects.filter(
+            title__startswith='Benchmark').exists())
@@ -10,9 +10,13 @@ from menu import views
 router = DefaultRouter()
 router.register('menu', views.MenuViewSet)
 router.register('dish', views.DishViewSet)
+router.register('changes', views.ChangeViewSet, basename='change')
 
 app_name = 'menu'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('digest/subscription/', views.DigestSubscriptionView.as_view(),
+         name='digest-subscription'),
+    path('digest/<str:date>/', views.DigestView.as_view(), name='digest'),
 ]
@@ -1,55 +1,209 @@
 """
 Views for the menu API.
 """
-from django.db.models import Count
+import math
+
+from django.conf import settings
+from django.db.models import Count, Prefetch
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django_filters import rest_framework as filters
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework import viewsets, status
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework import generics, viewsets, status
+from rest_framework.permissions import (
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
+)
 from rest_framework.filters import OrderingFilter
 
-from .filters import MenuFilter
-from menu.models import Menu, Dish
+from .filters import DishFilter, MenuFilter
+from core.budgets import QueryBudget
+from menu.cache import CachedResponseMixin, next_menu_boundary
+from menu.digests import (
+    DEFAULT_VARIANT,
+    find_digest,
+    subscription_variant,
+)
+from menu.models import (
+    Change,
+    DigestSubscription,
+    Dish,
+    DishPrice,
+    Menu,
+    MenuDish,
+    MenuStats,
+)
 from menu import serializers
+from user.authentication import ExpiringTokenAuthentication
+
+
+class ValuesListMixin:
+    """List with a values() based read serializer, unless paginated."""
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_READ_SERIALIZERS or self.paginator is not None:
+            return super().list(request, *args, **kwargs)
 
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.values_serializer_class(
+            queryset, context=self.get_serializer_context())
 
-class MenuViewSet(viewsets.ModelViewSet):
+        return Response(serializer.data)
+
+
+class MenuViewSet(CachedResponseMixin, ValuesListMixin,
+                  viewsets.ModelViewSet):
     """View for manage menu APIs."""
 
     serializer_class = serializers.MenuDetailSerializer
+    values_serializer_class = serializers.MenuValuesSerializer
     queryset = Menu.objects.all().annotate(dish_count=Count('dishes'))
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [ExpiringTokenAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [filters.DjangoFilterBackend, OrderingFilter]
     filterset_class = MenuFilter
     ordering_fields = ['title', 'dish_count']
+    query_budget = QueryBudget(queries=8, time_ms=250, per_action={
+        'create': QueryBudget(queries=50, time_ms=1000),
+        'update': QueryBudget(queries=50, time_ms=1000),
+        'partial_update': QueryBudget(queries=50, time_ms=1000),
+        'destroy': QueryBudget(queries=15, time_ms=500),
+        'add_dish': QueryBudget(queries=20, time_ms=500),
+        'arrange_dish': QueryBudget(queries=20, time_ms=500),
+        'clone': QueryBudget(queries=30, time_ms=1000),
+    })
 
     def get_queryset(self):
         if self.action == 'list':
             return self.queryset.filter(dishes__isnull=False).distinct()
+        if self.action == 'analytics_list':
+            return Menu.objects.all()
 
         return self.queryset
 
+    def get_cache_timeout(self):
+        """Expire cached responses when a menu turns on or off."""
+        timeout = super().get_cache_timeout()
+        now = timezone.now()
+        boundary = next_menu_boundary(now)
+        if boundary is not None:
+            seconds = math.ceil((boundary - now).total_seconds())
+            timeout = min(timeout, max(seconds, 1))
+
+        return timeout
+
     def get_serializer_class(self):
         """Return serializer class for request."""
         if self.action == 'list':
             return serializers.MenuSerializer
+        if self.action in ('add_dish', 'arrange_dish'):
+            return serializers.MenuDishSerializer
+        if self.action == 'clone':
+            return serializers.MenuCloneSerializer
+        if self.action in ('analytics', 'analytics_list'):
+            return serializers.MenuStatsSerializer
 
         return self.serializer_class
 
+    @action(methods=['POST'], detail=True, url_path='dishes')
+    def add_dish(self, request, pk=None):
+        """Insert a dish into a menu at a given place."""
+        menu = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+
+        if serializer.is_valid():
+            serializer.save(menu=menu)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(responses={201: serializers.MenuDetailSerializer})
+    @action(methods=['POST'], detail=True, url_path='clone')
+    def clone(self, request, pk=None):
+        """Copy a menu with its dishes under a new title."""
+        menu = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+
+        if serializer.is_valid():
+            clone = serializer.save(menu=menu)
+            data = serializers.MenuDetailSerializer(
+                clone, context=self.get_serializer_context()).data
+            return Response(data, status=status.HTTP_201_CREATED)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(operation_id='menu_menu_analytics_retrieve')
+    @action(methods=['GET'], detail=True, url_path='analytics',
+            filter_backends=[])
+    def analytics(self, request, pk=None):
+        """Return price and preparation time statistics of a menu."""
+        stats = generics.get_object_or_404(
+            MenuStats.objects.select_related('menu'), menu_id=pk)
+        serializer = self.get_serializer(stats)
+
+        return Response(serializer.data)
+
+    @extend_schema(operation_id='menu_menu_analytics_list')
+    @action(methods=['GET'], detail=False, url_path='analytics',
+            filter_backends=[filters.DjangoFilterBackend])
+    def analytics_list(self, request):
+        """Return statistics of every menu matching the filters."""
+        menus = self.filter_queryset(self.get_queryset())
+        stats = MenuStats.objects.filter(menu__in=menus).select_related(
+            'menu').order_by('menu__title')
+        serializer = self.get_serializer(stats, many=True)
+
+        return Response(serializer.data)
+
+    @extend_schema(parameters=[
+        OpenApiParameter('dish_id', int, OpenApiParameter.PATH),
+    ])
+    @action(methods=['PATCH', 'DELETE'], detail=True,
+            url_path=r'dishes/(?P<dish_id>\d+)')
+    def arrange_dish(self, request, pk=None, dish_id=None):
+        """Move a dish within a menu or remove it from the menu."""
+        menu = self.get_object()
+        if request.method == 'DELETE':
+            if menu.remove_dish(dish_id):
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        link = get_object_or_404(MenuDish, menu=menu, dish_id=dish_id)
+        serializer = self.get_serializer(link, data=request.data, partial=True)
+
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
 
-class DishViewSet(viewsets.ModelViewSet):
+class DishViewSet(CachedResponseMixin, ValuesListMixin,
+                  viewsets.ModelViewSet):
+    """View for manage dish APIs."""
     serializer_class = serializers.DishSerializer
+    values_serializer_class = serializers.DishValuesSerializer
     queryset = Dish.objects.all().order_by('title')
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [ExpiringTokenAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
+    filter_backends = [filters.DjangoFilterBackend, OrderingFilter]
+    filterset_class = DishFilter
+    ordering_fields = ['title', 'price', 'time_minutes']
+    query_budget = QueryBudget(queries=10, time_ms=250, per_action={
+        'bulk_price': QueryBudget(queries=20, time_ms=1000),
+    })
 
     def get_serializer_class(self):
         """Return serializer class for request."""
         if self.action == 'upload_image':
             return serializers.DishImageSerializer
+        if self.action == 'bulk_price':
+            return serializers.DishBulkPriceSerializer
 
         return self.serializer_class
 
@@ -64,3 +218,141 @@ class DishViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(parameters=[serializers.PriceHistoryQuerySerializer],
+                   responses=serializers.PriceHistorySerializer)
+    @action(methods=['GET'], detail=True, url_path='price-history',
+            filter_backends=[])
+    def price_history(self, request, pk=None):
+        """Return the price history of a dish in daily or weekly buckets."""
+        dish = self.get_object()
+        query = serializers.PriceHistoryQuerySerializer(data=request.GET)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        initial, points = DishPrice.history(dish.id, **query.validated_data)
+        serializer = serializers.PriceHistorySerializer({
+            'dish': dish.id,
+            'initial_price': initial,
+            'points': points,
+            **query.validated_data,
+        })
+
+        return Response(serializer.data)
+
+    @action(methods=['PATCH'], detail=False, url_path='bulk-price')
+    def bulk_price(self, request):
+        """Update price and availability of many dishes at once."""
+        serializer = self.get_serializer(data=request.data)
+
+        if serializer.is_valid():
+            result = serializer.save()
+            return Response(result, status=status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ChangeViewSet(viewsets.ViewSet):
+    """Feed of menu and dish changes after a cursor.
+
+    The cursor is the entry id, which is taken at insert but becomes
+    visible at commit, so a slow transaction can commit an id below one
+    already served. Entries younger than CHANGE_FEED_SAFETY_SECONDS are
+    held back so such transactions commit before the cursor passes them;
+    one running longer than the window can still be missed.
+    """
+    authentication_classes = [ExpiringTokenAuthentication]
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    serializer_class = serializers.ChangeFeedSerializer
+
+    @extend_schema(parameters=[serializers.ChangeFeedQuerySerializer])
+    def list(self, request):
+        """Return upserts and tombstones changed after `since`."""
+        query = serializers.ChangeFeedQuerySerializer(data=request.GET)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        since = query.validated_data['since']
+        limit = query.validated_data['limit']
+
+        settled = timezone.now() - timezone.timedelta(
+            seconds=settings.CHANGE_FEED_SAFETY_SECONDS)
+        entries = list(Change.objects.filter(
+            id__gt=since, created__lte=settled).order_by(
+            'id').values_list('id', 'kind', 'object_id', 'deleted')[:limit])
+        latest = {}
+        for _id, kind, object_id, deleted in entries:
+            latest[(kind, object_id)] = deleted
+
+        feed = {}
+        for kind, model in ((Change.MENU, Menu), (Change.DISH, Dish)):
+            ids = {object_id for (entry_kind, object_id), deleted
+                   in latest.items() if entry_kind == kind and not deleted}
+            objects = model.objects.filter(id__in=ids).order_by('id')
+            if model is Menu:
+                objects = objects.prefetch_related(Prefetch(
+                    'dishes', queryset=Dish.objects.order_by(
+                        'menudish__position', 'menudish__id')))
+            objects = list(objects)
+            found = {obj.id for obj in objects}
+            feed[kind] = {
+                'upserts': objects,
+                'deleted': sorted(
+                    object_id for (entry_kind, object_id), deleted
+                    in latest.items()
+                    if entry_kind == kind
+                    and (deleted or object_id not in found)),
+            }
+
+        serializer = self.serializer_class({
+            'cursor': entries[-1][0] if entries else since,
+            'more': len(entries) == limit,
+            'menus': feed[Change.MENU],
+            'dishes': feed[Change.DISH],
+        }, context={'request': request})
+
+        return Response(serializer.data)
+
+
+class DigestSubscriptionView(generics.RetrieveUpdateAPIView):
+    """Manage the digest subscription of the authenticated user."""
+    serializer_class = serializers.DigestSubscriptionSerializer
+    authentication_classes = [ExpiringTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self):
+        """Return the subscription, unsaved until first updated."""
+        user = self.request.user
+        return DigestSubscription.objects.filter(user=user).first() \
+            or DigestSubscription(user=user)
+
+
+class DigestView(generics.RetrieveAPIView):
+    """Digest of new dishes sent on a date.
+
+    Users with a subscription get their variant, others the daily digest
+    of all dishes. Only digests stored by the scheduled task are served.
+    """
+    serializer_class = serializers.DigestSerializer
+    authentication_classes = [ExpiringTokenAuthentication]
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get_object(self):
+        try:
+            date = parse_date(self.kwargs['date'])
+        except ValueError:
+            date = None
+        if date is None or date > timezone.localdate():
+            raise Http404
+
+        variant = DEFAULT_VARIANT
+        if self.request.user.is_authenticated:
+            subscription = DigestSubscription.objects.filter(
+                user=self.request.user).prefetch_related('menus').first()
+            if subscription is not None:
+                variant = subscription_variant(subscription)
+
+        digest = find_digest(date, variant)
+        if digest is None:
+            raise Http404
+
+        return digest
@@ -0,0 +1,41 @@
+"""
+Authentication classes for the API.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from user import tokens
+
+
+class ExpiringTokenAuthentication(TokenAuthentication):
+    """Token authentication rejecting expired tokens, sliding valid ones.
+
+    An expired token is rejected right after the key lookup; a valid one
+    is refreshed at most once per TOKEN_REFRESH_INTERVAL. Sub-requests of
+    a batch carry the user and token of the batch request in
+    `batch_auth` and are not authenticated again.
+    """
+
+    def authenticate(self, request):
+        batch_auth = getattr(request._request, 'batch_auth', None)
+        if batch_auth is not None:
+            return batch_auth
+
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if tokens.is_expired(token):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        tokens.refresh(token)
+
+        return (token.user, token)
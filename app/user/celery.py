@@ -0,0 +1,16 @@
+from celery.schedules import crontab
+from celery.task import periodic_task
+
+from core.locks import hourly_slot, single_run
+from user.tokens import cleanup_expired_sessions, cleanup_expired_tokens
+
+
+@periodic_task(run_every=(
+    crontab(minute=30)),
+    name="cleanup_expired_credentials",
+    ignore_result=True)
+@single_run(slot=hourly_slot, name="cleanup_expired_credentials")
+def cleanup_expired_credentials():
+    """Delete expired auth tokens and sessions in batches."""
+    cleanup_expired_tokens()
+    cleanup_expired_sessions()
@@ -0,0 +1,41 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:30
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+def find_email_collisions(User):
+    """Return lowercased emails used by more than one user."""
+    return list(
+        User.objects.annotate(
+            email_lower=django.db.models.functions.text.Lower('email'))
+        .values('email_lower')
+        .annotate(users=models.Count('id'))
+        .filter(users__gt=1)
+        .order_by('email_lower')
+        .values_list('email_lower', flat=True)
+    )
+
+
+def check_email_collisions(apps, schema_editor):
+    """Stop before the unique index when emails differ only in case."""
+    collisions = find_email_collisions(apps.get_model('user', 'User'))
+    if collisions:
+        raise RuntimeError(
+            'Users share these emails in different case, merge or rename '
+            'them before migrating: ' + ', '.join(collisions))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_email_collisions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='user_user_email_lower_unique'),
+        ),
+    ]
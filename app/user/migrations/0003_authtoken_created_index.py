@@ -0,0 +1,20 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:34
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Index token issue time for the expired token cleanup."""
+
+    dependencies = [
+        ('authtoken', '0003_tokenproxy'),
+        ('user', '0002_email_lower_unique'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX user_authtoken_created_idx '
+            'ON authtoken_token (created);',
+            'DROP INDEX user_authtoken_created_idx;',
+        ),
+    ]
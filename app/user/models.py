@@ -2,6 +2,8 @@
 Database models.
 """
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Lower
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -12,6 +14,14 @@ from django.contrib.auth.models import (
 class UserManager(BaseUserManager):
     """Manager for users."""
 
+    def filter_by_email(self, email):
+        """Return users with the email in any case, via its LOWER index."""
+        return self.alias(email_lower=Lower('email')).filter(
+            email_lower=Lower(Value(email)))
+
+    def get_by_natural_key(self, username):
+        return self.filter_by_email(username).get()
+
     def create_user(self, email, password=None, **extra_fields):
         """Create, save and return a new user."""
         if not email:
@@ -43,3 +53,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                Lower('email'), name='user_user_email_lower_unique'),
+        ]
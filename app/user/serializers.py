@@ -14,6 +14,17 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['email', 'password', 'name']
         extra_kwargs = {'password': {'write_only': True, 'min_length': 8}}
 
+    def validate_email(self, value):
+        """Reject emails registered already in a different case."""
+        users = get_user_model().objects.filter_by_email(value)
+        if self.instance is not None:
+            users = users.exclude(pk=self.instance.pk)
+        if users.exists():
+            msg = _('User with this email already exists.')
+            raise serializers.ValidationError(msg)
+
+        return value
+
     def create(self, validated_data):
         """Create and return a user with encrypted password."""
         return get_user_model().objects.create_user(**validated_data)
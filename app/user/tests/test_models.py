@@ -1,8 +1,14 @@
 """
 Tests for models.
 """
-from django.test import TestCase
+from importlib import import_module
+
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+
+EMAIL_MIGRATION = import_module('user.migrations.0002_email_lower_unique')
 
 
 class ModelTest(TestCase):
@@ -46,3 +52,63 @@ class ModelTest(TestCase):
 
         self.assertTrue(user.is_superuser)
         self.assertTrue(user.is_staff)
+
+    def test_email_unique_in_any_case(self):
+        """Test emails differing only in case violate the unique index."""
+        get_user_model().objects.create_user('test@example.com', 'test123')
+
+        with self.assertRaises(IntegrityError):
+            get_user_model().objects.create_user('TEST@example.com', 'x')
+
+    def test_get_by_natural_key_ignores_case(self):
+        """Test looking up a user by email in another case."""
+        user = get_user_model().objects.create_user(
+            'Test@example.com', 'test123')
+
+        found = get_user_model().objects.get_by_natural_key(
+            'test@EXAMPLE.COM')
+
+        self.assertEqual(found, user)
+
+    def test_migration_check_passes_for_distinct_emails(self):
+        """Test the migration check passes for distinct emails."""
+        get_user_model().objects.create_user('test@example.com', 'test123')
+
+        self.assertEqual(
+            EMAIL_MIGRATION.find_email_collisions(get_user_model()), [])
+
+
+class EmailMigrationTests(TransactionTestCase):
+    """Test the case-insensitive email migration on colliding users."""
+    migrate_from = [('user', '0001_initial')]
+    migrate_to = [('user', '0002_email_lower_unique')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        self.User = executor.loader.project_state(
+            self.migrate_from).apps.get_model('user', 'User')
+
+    def tearDown(self):
+        self.User.objects.all().delete()
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def constraint_names(self):
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(
+                cursor, self.User._meta.db_table)
+
+    def test_collisions_stop_migration(self):
+        """Test emails differing in case are reported, no index added."""
+        self.User.objects.create(email='test@example.com', name='A')
+        self.User.objects.create(email='Test@Example.com', name='B')
+
+        self.assertEqual(EMAIL_MIGRATION.find_email_collisions(self.User),
+                         ['test@example.com'])
+        executor = MigrationExecutor(connection)
+        with self.assertRaisesMessage(RuntimeError, 'test@example.com'):
+            executor.migrate(self.migrate_to)
+
+        self.assertNotIn('user_user_email_lower_unique',
+                         self.constraint_names())
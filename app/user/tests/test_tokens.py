@@ -0,0 +1,112 @@
+"""
+Tests for expiring auth tokens and credential cleanup.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.celery import cleanup_expired_credentials
+from user.tokens import cleanup_expired_tokens
+
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    return get_user_model().objects.create_user(email, password)
+
+
+def age_token(token, **delta):
+    Token.objects.filter(key=token.key).update(
+        created=timezone.now() - timedelta(**delta))
+
+
+class ExpiringTokenTests(TestCase):
+    """Test token expiry and sliding refresh."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+
+    def _get_me(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return self.client.get(ME_URL)
+
+    def test_valid_token_accepted(self):
+        """Test a fresh token authenticates with a single query."""
+        with self.assertNumQueries(1):
+            res = self._get_me()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_expired_token_rejected(self):
+        """Test an expired token is rejected after the key lookup."""
+        age_token(self.token, days=8)
+
+        with self.assertNumQueries(1):
+            res = self._get_me()
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_used_token_slides(self):
+        """Test using an older token moves its expiry forward."""
+        age_token(self.token, days=6)
+
+        res = self._get_me()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.token.refresh_from_db()
+        self.assertGreater(
+            self.token.created, timezone.now() - timedelta(minutes=1))
+
+    def test_login_replaces_expired_token(self):
+        """Test logging in issues a new token for an expired one."""
+        age_token(self.token, days=8)
+        payload = {'email': 'user@example.com', 'password': 'testpass123'}
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], self.token.key)
+        self.assertIn('expires', res.data)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+
+
+class CredentialCleanupTests(TestCase):
+    """Test batched cleanup of expired tokens and sessions."""
+
+    def test_cleanup_expired_tokens_in_batches(self):
+        """Test expired tokens are deleted across several batches."""
+        for i in range(5):
+            token = Token.objects.create(
+                user=create_user(email=f'old{i}@example.com'))
+            age_token(token, days=8)
+        fresh = Token.objects.create(user=create_user())
+
+        with self.assertNumQueries(7):
+            deleted = cleanup_expired_tokens(batch_size=2)
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual(list(Token.objects.all()), [fresh])
+
+    def test_cleanup_task_deletes_expired_sessions(self):
+        """Test the periodic task removes expired sessions too."""
+        for expiry in (-60, 60):
+            session = SessionStore()
+            session.set_expiry(expiry)
+            session.create()
+
+        cleanup_expired_credentials()
+
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertGreater(
+            Session.objects.get().expire_date, timezone.now())
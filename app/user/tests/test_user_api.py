@@ -51,6 +51,19 @@ class PublicUserApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_user_with_email_in_other_case_exists_error(self):
+        """Test emails differing only in case are taken."""
+        create_user(email='test@example.com', password='testpass123')
+        payload = {
+            'email': 'Test@Example.com',
+            'password': 'testpass123',
+            'name': 'Test Name',
+        }
+        res = self.client.post(CREATE_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(get_user_model().objects.count(), 1)
+
     def test_password_to_short(self):
         """Test error returned if password is less than 8 characters."""
         payload = {
@@ -84,6 +97,16 @@ class PublicUserApiTests(TestCase):
         self.assertIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_create_token_email_in_other_case(self):
+        """Test the email matches case-insensitively on login."""
+        create_user(email='Test.User@example.com', password='goodpass123')
+
+        payload = {'email': 'test.user@EXAMPLE.com', 'password': 'goodpass123'}
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertIn('token', res.data)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_create_token_bad_credentials(self):
         """Test returns error if credentials invalid."""
         create_user(email='test@example.com', password='goodpass')
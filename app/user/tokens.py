@@ -0,0 +1,60 @@
+"""
+Auth token lifecycle: expiry, sliding refresh and batched cleanup.
+
+`Token.created` holds the time the token was issued or last refreshed.
+"""
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.db import delete_in_batches
+
+
+def expiry_cutoff():
+    """Return the time before which tokens are expired."""
+    return timezone.now() - settings.TOKEN_TTL
+
+
+def is_expired(token):
+    return token.created < expiry_cutoff()
+
+
+def expires_at(token):
+    return token.created + settings.TOKEN_TTL
+
+
+def refresh(token):
+    """Slide the expiry of a used token, at most once per interval."""
+    now = timezone.now()
+    if token.created < now - settings.TOKEN_REFRESH_INTERVAL:
+        Token.objects.filter(key=token.key).update(created=now)
+        token.created = now
+
+
+def issue_token(user):
+    """Return a valid token of the user, replacing an expired one."""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and is_expired(token):
+        token.delete()
+        token = Token.objects.create(user=user)
+    elif not created:
+        refresh(token)
+
+    return token
+
+
+def cleanup_expired_tokens(batch_size=None):
+    """Delete expired tokens."""
+    return delete_in_batches(
+        Token.objects.filter(created__lt=expiry_cutoff()).order_by(),
+        batch_size or settings.TOKEN_CLEANUP_BATCH_SIZE,
+    )
+
+
+def cleanup_expired_sessions(batch_size=None):
+    """Delete expired database sessions."""
+    return delete_in_batches(
+        Session.objects.filter(expire_date__lt=timezone.now()).order_by(),
+        batch_size or settings.TOKEN_CLEANUP_BATCH_SIZE,
+    )
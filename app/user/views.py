@@ -1,29 +1,47 @@
 """
 Views for the user API.
 """
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from core.budgets import QueryBudget
+from user import tokens
+from user.authentication import ExpiringTokenAuthentication
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system."""
     serializer_class = UserSerializer
+    query_budget = QueryBudget(queries=6, time_ms=500)
 
 
 class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user."""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    query_budget = QueryBudget(queries=8, time_ms=500)
+
+    def post(self, request, *args, **kwargs):
+        """Create an auth token for user, replacing an expired one."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = tokens.issue_token(serializer.validated_data['user'])
+
+        return Response({
+            'token': token.key,
+            'expires': tokens.expires_at(token),
+        })
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [ExpiringTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = QueryBudget(queries=6, time_ms=500)
 
     def get_object(self):
         """Retrieve and return the authenticated user."""